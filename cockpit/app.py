@@ -3,16 +3,17 @@
 cluster. Talks to the Kubernetes API with the pod's ServiceAccount and scrapes
 DCGM exporters directly for live per-GPU telemetry (util/temp/VRAM/power).
 Set HOMELAB_DEMO=1 to run locally with animated fake data."""
-import base64, json, os, random, re, shlex, ssl, subprocess, tempfile, threading, time
+import array, asyncio, atexit, base64, bisect, collections, gzip, hashlib, http.client, io, json, math, os, queue, random, re, shlex, signal, ssl, subprocess, sys, tempfile, threading, time
 import urllib.error, urllib.parse, urllib.request
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 PORT = int(os.environ.get("PORT", "8090"))
 DEMO = os.environ.get("HOMELAB_DEMO") == "1"
-API  = "https://kubernetes.default.svc"
-SA   = "/var/run/secrets/kubernetes.io/serviceaccount"
+API  = os.environ.get("COCKPIT_K8S_API", "https://kubernetes.default.svc")
+SA   = os.environ.get("COCKPIT_SA_DIR", "/var/run/secrets/kubernetes.io/serviceaccount")
+K8S_POOL = int(os.environ.get("COCKPIT_K8S_POOL", "8"))
 JOIN = Path("/var/run/secrets/join")
 SSH_SEC = Path("/var/run/secrets/ssh")
 HTML = Path(__file__).parent / "index.html"
@@ -49,14 +50,1167 @@ fi
 command -v curl >/dev/null 2>&1 || { echo "curl still missing after install attempt" >&2; exit 1; }"""
 
 # ----------------------------------------------------------------- k8s client
+class K8sClient:
+    """Keep-alive HTTP/1.1 client for the API server. Holds a bounded pool of
+    persistent connections, one SSL context, and a token that is re-read only when
+    the projected file changes. Errors surface as urllib.error.HTTPError so callers
+    keep checking e.code exactly as they did with urlopen."""
+    _STALE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+              ConnectionResetError, BrokenPipeError)
+    _IDEMPOTENT = ("GET", "PUT", "DELETE")
+
+    def __init__(self, base=API, sa=SA, pool=K8S_POOL, timeout=15):
+        u = urllib.parse.urlsplit(base)
+        self.base, self.https = base.rstrip("/"), u.scheme == "https"
+        self.host, self.port = u.hostname, u.port or (443 if self.https else 80)
+        self.prefix = u.path.rstrip("/")
+        self.sa, self.timeout = Path(sa), timeout
+        self._ctx, self._tok, self._tok_mtime = None, "", None
+        self._idle, self._lock = [], threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool)
+
+    def _context(self):
+        if self._ctx is None:
+            ca = self.sa / "ca.crt"
+            self._ctx = ssl.create_default_context(cafile=str(ca) if ca.is_file() else None)
+        return self._ctx
+
+    def _token(self):
+        p = self.sa / "token"
+        try:
+            mtime = p.stat().st_mtime_ns
+        except OSError:
+            return ""
+        if mtime != self._tok_mtime:   # kubelet rotates the projected token in place
+            self._tok, self._tok_mtime = p.read_text().strip(), mtime
+        return self._tok
+
+    def _headers(self, content_type):
+        h = {"Content-Type": content_type, "Accept": "application/json"}
+        tok = self._token()
+        if tok:
+            h["Authorization"] = f"Bearer {tok}"
+        return h
+
+    def _connect(self, timeout=None):
+        t = timeout or self.timeout
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=t,
+                                               context=self._context())
+        return http.client.HTTPConnection(self.host, self.port, timeout=t)
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _checkin(self, conn):
+        with self._lock:
+            self._idle.append(conn)
+
+    def _error(self, path, r):
+        return urllib.error.HTTPError(self.base + path, r.status, r.reason, r.headers,
+                                      io.BytesIO(r.read()))
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = self._headers(content_type)
+        with self._slots:
+            for attempt in (0, 1):
+                conn, reused, sent = *self._checkout(), False
+                try:
+                    conn.request(method, self.prefix + path, body=data, headers=headers)
+                    sent = True
+                    r = conn.getresponse()
+                except self._STALE:
+                    conn.close()
+                    # a reused keep-alive socket the server had closed: safe to resend
+                    # if the send itself failed, or if repeating the call can't double it
+                    if reused and attempt == 0 and (not sent or method in self._IDEMPOTENT):
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    raise
+                try:
+                    if r.status >= 400:
+                        raise self._error(path, r)
+                    raw = r.read()
+                except Exception:
+                    conn.close()
+                    raise
+                if r.will_close:
+                    conn.close()
+                else:
+                    self._checkin(conn)
+                return json.loads(raw or b"{}")
+
+    def stream(self, path, timeout=None):
+        """Yield one decoded JSON document per line of a chunked response (watch
+        streams). Uses its own connection so long watches never starve the pool."""
+        conn = self._connect(timeout)
+        try:
+            conn.request("GET", self.prefix + path, headers=self._headers("application/json"))
+            r = conn.getresponse()
+            if r.status >= 400:
+                raise self._error(path, r)
+            buf = b""
+            while True:
+                chunk = r.read1(65536)
+                if not chunk:
+                    break
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+            if buf.strip():
+                yield json.loads(buf)
+        finally:
+            conn.close()
+
+    def exec(self, path, timeout=None):
+        """pods/exec over the v4.channel.k8s.io WebSocket protocol, no stdin.
+        Returns (exit code, stdout+stderr); raises when the API refuses or the
+        command could not start."""
+        conn = self._connect(timeout)
+        try:
+            conn.request("GET", self.prefix + path, headers={
+                **self._headers("application/json"), "Connection": "Upgrade", "Upgrade": "websocket",
+                "Sec-WebSocket-Version": "13", "Sec-WebSocket-Key": base64.b64encode(os.urandom(16)).decode(),
+                "Sec-WebSocket-Protocol": "v4.channel.k8s.io"})
+            r = conn.getresponse()
+            if r.status != 101:
+                raise self._error(path, r)
+            out, status, msg = [], {}, None
+            while True:
+                head = r.fp.read(2)
+                if len(head) < 2:
+                    break
+                fin, op, n = head[0] & 0x80, head[0] & 0x0F, head[1] & 0x7F
+                if n >= 126:
+                    n = int.from_bytes(r.fp.read(2 if n == 126 else 8), "big")
+                mask = r.fp.read(4) if head[1] & 0x80 else b""
+                data = r.fp.read(n)
+                if mask:
+                    data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+                if op == 8:                               # close
+                    break
+                if op == 9:                               # ping: pong back, the message goes on
+                    self._ws_send(conn, 0xA, data)
+                    continue
+                if op >= 8:                               # pong and reserved control frames
+                    continue
+                if op in (1, 2):
+                    msg = bytearray(data)
+                elif msg is not None:                     # continuation of a fragmented message
+                    msg += data
+                if not fin or not msg:
+                    continue
+                chan, payload, msg = msg[0], bytes(msg[1:]), None   # first byte is the channel
+                if chan in (1, 2):
+                    out.append(payload)
+                elif chan == 3 and payload:
+                    status = json.loads(payload)
+        finally:
+            conn.close()
+        text = b"".join(out).decode(errors="replace")
+        if status.get("status", "Success") == "Success":
+            return 0, text
+        for c in status.get("details", {}).get("causes", []):
+            if c.get("reason") == "ExitCode":
+                return int(c.get("message") or 1), text
+        raise RuntimeError(status.get("message") or "exec failed")
+
+    @staticmethod
+    def _ws_send(conn, op, data):
+        """One final client frame (clients must mask); control payloads fit in 125 bytes."""
+        mask = os.urandom(4)
+        conn.sock.sendall(bytes((0x80 | op, 0x80 | len(data))) + mask
+                          + bytes(b ^ mask[i % 4] for i, b in enumerate(data)))
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for c in idle:
+            c.close()
+
+KUBE = K8sClient()
+
+# ----------------------------------------------------------------- timings
+TIMINGS_KEEP = int(os.environ.get("COCKPIT_TIMINGS_KEEP", "50"))
+
+class Trace:
+    """Spans recorded under one root: a request, a stream tick, a DCGM pass."""
+    __slots__ = ("name", "ts", "t0", "ms", "spans")
+    def __init__(self, name):
+        self.name, self.ts, self.t0 = name, time.time(), time.perf_counter()
+        self.ms, self.spans = None, []
+
+    def to_dict(self):
+        return {"name": self.name, "ts": round(self.ts, 3), "ms": self.ms,
+                "spans": [{"name": n, "at_ms": round((a - self.t0) * 1000, 2),
+                           "ms": round((b - a) * 1000, 2), "thread": th, **({"error": err} if err else {})}
+                          for n, a, b, th, err in list(self.spans)]}
+
+class _Span:
+    __slots__ = ("tr", "name", "t")
+    def __init__(self, tr, name):
+        self.tr, self.name = tr, name
+    def __enter__(self):
+        self.t = time.perf_counter()
+        return self
+    def __exit__(self, et, e, tb):
+        self.tr.spans.append((self.name, self.t, time.perf_counter(),
+                              threading.current_thread().name, et.__name__ if et else None))
+
+class _Root(_Span):
+    __slots__ = ("timings",)
+    def __init__(self, timings, name):
+        super().__init__(Trace(name), name)
+        self.timings = timings
+    def __enter__(self):
+        self.timings._tls.trace = self.tr
+        return self
+    def __exit__(self, et, e, tb):
+        self.tr.ms = round((time.perf_counter() - self.tr.t0) * 1000, 2)
+        self.timings._tls.trace = None
+        self.timings.recent.append(self.tr)
+
+class _NoSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, et, e, tb): pass
+
+_NOSPAN = _NoSpan()
+
+class Timings:
+    """Opt-in span recorder (COCKPIT_TIMINGS=1, or POST /api/debug/timings). A
+    root() opens a trace on the current thread, span()s inside it are timed, and
+    the last TIMINGS_KEEP traces are kept. Pool workers join their caller's trace
+    through bind(). Off, span() is one attribute check returning a shared no-op."""
+    def __init__(self, on=False, keep=TIMINGS_KEEP):
+        self.on, self.recent = on, collections.deque(maxlen=keep)
+        self._tls = threading.local()
+
+    def root(self, name):
+        if not self.on: return _NOSPAN
+        if getattr(self._tls, "trace", None) is not None:
+            return self.span(name)                       # nested: just a span
+        return _Root(self, name)
+
+    def span(self, name):
+        tr = getattr(self._tls, "trace", None) if self.on else None
+        return _NOSPAN if tr is None else _Span(tr, name)
+
+    def bind(self, fn):
+        """fn wrapped to run under the calling thread's trace (for pool workers)."""
+        tr = getattr(self._tls, "trace", None) if self.on else None
+        if tr is None: return fn
+        def run(*a, **kw):
+            self._tls.trace = tr
+            try:
+                return fn(*a, **kw)
+            finally:
+                self._tls.trace = None
+        return run
+
+    def report(self):
+        traces = [t.to_dict() for t in list(self.recent)]
+        agg = {}
+        for t in traces:
+            for sp in [{"name": t["name"], "ms": t["ms"] or 0}] + t["spans"]:
+                a = agg.setdefault(sp["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                a["count"] += 1
+                a["total_ms"] += sp["ms"]
+                a["max_ms"] = max(a["max_ms"], sp["ms"])
+        return {"on": self.on, "keep": self.recent.maxlen,
+                "by_span": {k: {**v, "total_ms": round(v["total_ms"], 2)} for k, v in
+                            sorted(agg.items(), key=lambda kv: -kv[1]["total_ms"])},
+                "traces": traces[::-1]}
+
+TIMINGS = Timings(os.environ.get("COCKPIT_TIMINGS") == "1")
+
+_PROFILE_LOCK = threading.Lock()
+def profile(seconds=10, hz=100):
+    """Sample every thread's Python stack at `hz` for `seconds` (wall clock, so
+    idle waits show too) and return them collapsed — "thread;outer;…;inner count"
+    per line, the input flamegraph.pl and speedscope take."""
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        me, counts, end = threading.get_ident(), {}, time.monotonic() + seconds
+        while time.monotonic() < end:
+            names = {t.ident: re.sub(r"[-_ ]?\d+", "", t.name) for t in threading.enumerate()}
+            for tid, f in sys._current_frames().items():
+                if tid == me: continue
+                stack = []
+                while f is not None:
+                    c = f.f_code
+                    stack.append(f"{c.co_name} ({os.path.basename(c.co_filename)}:{c.co_firstlineno})")
+                    f = f.f_back
+                key = ";".join([names.get(tid, "?")] + stack[::-1])
+                counts[key] = counts.get(key, 0) + 1
+            time.sleep(1 / hz)
+    finally:
+        _PROFILE_LOCK.release()
+    return "".join(f"{k} {v}\n" for k, v in sorted(counts.items(), key=lambda kv: -kv[1]))
+
+# ----------------------------------------------------------------- metrics
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+def _prom_labels(names, values):
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{n}="{esc(v)}"' for n, v in zip(names, values))
+
+class Counter:
+    """Prometheus counter family keyed by a tuple of label values."""
+    kind = "counter"
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values, self._lock = {}, threading.Lock()
+
+    def inc(self, key=(), n=1):
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + n
+
+    def forget(self, key):
+        with self._lock: self.values.pop(key, None)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _prom_labels(self.labels, k), v) for k, v in sorted(self.values.items())]
+
+class Histogram(Counter):
+    """Cumulative-bucket histogram family; observe() is one lock and a bisect."""
+    kind = "histogram"
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, key, v):
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            h = self.values.get(key)
+            if h is None:
+                h = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]   # counts…, +Inf, sum
+            h[i] += 1
+            h[-1] += v
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(k, list(h)) for k, h in sorted(self.values.items())]
+        for k, h in items:
+            lab, acc = _prom_labels(self.labels, k), 0
+            for le, n in zip(self.buckets + ("+Inf",), h[:-1]):
+                acc += n
+                out.append((self.name + "_bucket", f'{lab},le="{le}"' if lab else f'le="{le}"', acc))
+            out.append((self.name + "_sum", lab, round(h[-1], 6)))
+            out.append((self.name + "_count", lab, acc))
+        return out
+
+HTTP_SECONDS = Histogram("cockpit_http_request_duration_seconds", "Dashboard API request latency.",
+                         ("route", "method", "code"))
+K8S_SECONDS = Histogram("cockpit_k8s_request_duration_seconds", "Kubernetes API call latency.",
+                        ("verb", "resource"))
+K8S_ERRORS = Counter("cockpit_k8s_request_errors_total", "Kubernetes API calls that failed, by HTTP "
+                     "code (or \"conn\" for transport errors).", ("verb", "resource", "code"))
+DCGM_SECONDS = Histogram("cockpit_dcgm_scrape_duration_seconds", "DCGM exporter scrape latency.", ("node",))
+DCGM_FAILURES = Counter("cockpit_dcgm_scrape_failures_total", "DCGM exporter scrapes that failed.", ("node",))
+JOB_SECONDS = Histogram("cockpit_job_duration_seconds", "Background job run time by final phase.",
+                        ("kind", "phase"), JOB_BUCKETS)
+HTTP_REJECTED = Counter("cockpit_http_rejected_total", "Requests answered 503 because a worker pool "
+                        "and its queue were full.", ("pool",))
+METRICS = [HTTP_SECONDS, K8S_SECONDS, K8S_ERRORS, DCGM_SECONDS, DCGM_FAILURES, JOB_SECONDS, HTTP_REJECTED]
+
+def _k8s_resource(path):
+    """/api/v1/namespaces/x/pods/y/eviction -> "pods/eviction" (bounded label)."""
+    parts = path.split("?")[0].strip("/").split("/")
+    parts = parts[2:] if parts[0] == "api" else parts[3:]       # drop api/v1 or apis/<group>/<ver>
+    if parts[:1] == ["namespaces"] and len(parts) > 2:
+        parts = parts[2:]
+    return "/".join(parts[:1] + parts[2:3]) or "discovery"
+
+def _gauges():
+    """Point-in-time series computed at scrape: snapshot cache, jobs, exporters."""
+    c = SNAPSHOTS.stats()
+    out = [("cockpit_snapshot_cache_requests_total", "counter", "Overview snapshot requests by outcome.",
+            [(f'result="{k}"', c[k]) for k in ("hits", "misses", "coalesced", "errors")]),
+           ("cockpit_snapshot_cache_hit_ratio", "gauge", "Share of overview requests served from cache.",
+            [("", c["hit_ratio"])]),
+           ("cockpit_stream_clients", "gauge", "Open /api/stream connections.", [("", STREAM.clients())])]
+    active = []
+    for kind, (jobs, lock, _, _) in JOBS.kinds.items():
+        with lock:
+            n = sum(1 for j in jobs.values() if j.get("phase") not in JOB_DONE)
+        active.append((f'kind="{kind}"', n))
+    out.append(("cockpit_jobs_active", "gauge", "Background jobs not yet finished.", active))
+    queued = collections.Counter(j["kind"] for j in JOBS.stats()["queued"])
+    out.append(("cockpit_jobs_queued", "gauge", "Background jobs waiting for a worker.",
+                [(f'kind="{k}"', queued[k]) for k in JOBS.kinds]))
+    out.append(("cockpit_dcgm_exporter_up", "gauge", "1 when the node's last DCGM scrape succeeded.",
+                [(_prom_labels(("node",), (n,)), int(not e.fails)) for n, e in exporters()]))
+    if HTTPD:
+        out.append(("cockpit_http_connections", "gauge", "Open client connections.", [("", HTTPD.conns)]))
+        out.append(("cockpit_http_inflight", "gauge", "Requests running or queued per worker pool.",
+                    [(f'pool="{k}"', p.busy) for k, p in HTTPD.pools.items()]))
+    return out
+
+def render_metrics():
+    lines = []
+    for m in METRICS:
+        lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}"]
+        lines += [f"{n}{{{lab}}} {v}" if lab else f"{n} {v}" for n, lab, v in m.samples()]
+    for name, kind, help, samples in _gauges():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{{{lab}}} {v}" if lab else f"{name} {v}" for lab, v in samples]
+    return "\n".join(lines) + "\n"
+
+JOB_DONE = ("done", "error", "timeout", "cancelled", "interrupted")
+
+def _tracked(kind, jobs, key, fn):
+    """fn (a job thread target) wrapped to record its run time and final phase."""
+    def run(*a):
+        t = time.monotonic()
+        try:
+            fn(*a)
+        finally:
+            JOB_SECONDS.observe((kind, (jobs.get(key) or {}).get("phase", "?")), time.monotonic() - t)
+    return run
+
+# ----------------------------------------------------------------- record / replay
+RECORD = os.environ.get("COCKPIT_RECORD", "")
+REPLAY = os.environ.get("COCKPIT_REPLAY", "")
+REPLAY_SPEED = float(os.environ.get("COCKPIT_REPLAY_SPEED", "1"))     # 0 = no waits
+
+REDACTED = base64.b64encode(b"redacted").decode()
+
+def _scrub(path, r):
+    """A secrets response (object, list or watch event) as it may go into a
+    shareable trace: values (the join token, SSH keys) replaced, keys and shape
+    kept so replay still parses."""
+    if "/secrets" not in path.split("?")[0] or not isinstance(r, dict):
+        return r
+    if "items" in r: return {**r, "items": [_scrub(path, i) for i in r["items"]]}
+    if "object" in r: return {**r, "object": _scrub(path, r["object"])}
+    return {**r, **{f: {k: REDACTED for k in r[f]} for f in ("data", "stringData") if r.get(f)}}
+
+class TraceWriter:
+    """Appends every k8s() response, watch event and DCGM scrape, with its start
+    offset and duration, to a gzip JSON-lines trace. One background thread does
+    the writing and flushes whenever its queue drains, so even a killed process
+    leaves a readable prefix. Secret values are redacted and only PATCH request
+    bodies are kept, so a trace can be shared."""
+    def __init__(self, path):
+        self.t0, self.q = time.monotonic(), queue.Queue()
+        self.f = gzip.open(path, "wt")
+        self._put({"trace": 1, "api": API, "started": time.time()})
+        self._thread = threading.Thread(target=self._run, daemon=True, name="trace-writer")
+        self._thread.start()
+
+    def _put(self, entry):
+        self.q.put(json.dumps(entry, separators=(",", ":")) + "\n")   # now, before callers mutate it
+
+    def add(self, kind, key, t, **data):
+        now = time.monotonic()
+        self._put({"t": round(t - self.t0, 4), "k": kind, "p": key,
+                   "ms": round((now - t) * 1000, 2), **data})
+
+    def _run(self):
+        while True:
+            line = self.q.get()
+            if line is None: break
+            self.f.write(line)
+            if self.q.empty(): self.f.flush()
+        self.f.close()
+
+    def close(self):
+        self.q.put(None)
+        self._thread.join(10)
+
+class TraceReplay:
+    """Serves a trace back in place of the cluster. Each (method, path) gets its
+    recorded responses in order, the last one repeating once they run out; DCGM
+    scrapes per exporter IP likewise; watches re-emit their events on the recorded
+    timeline. Recorded durations are waited out, divided by REPLAY_SPEED."""
+    def __init__(self, path, speed=REPLAY_SPEED):
+        self.speed, self.t0 = speed, time.monotonic()
+        self.calls, self.events, self.next = {}, {}, {}
+        self.served, self.missing, self._lock = 0, {}, threading.Lock()
+        with gzip.open(path, "rt") as f:
+            try:
+                for line in f:
+                    e = json.loads(line)
+                    if e.get("k") == "watch": self.events.setdefault(e["p"], []).append(e)
+                    elif "k" in e: self.calls.setdefault((e["k"], e["p"]), []).append(e)
+            except (EOFError, ValueError):
+                pass                                  # truncated tail of a killed recording
+
+    def _sleep(self, secs):
+        if self.speed > 0 and secs > 0: time.sleep(secs / self.speed)
+
+    def _take(self, kind, key):
+        with self._lock:
+            seq = self.calls.get((kind, key))
+            if not seq:
+                self.missing[f"{kind} {key}"] = self.missing.get(f"{kind} {key}", 0) + 1
+                return None
+            i = self.next[(kind, key)] = self.next.get((kind, key), -1) + 1
+            self.served += 1
+            e = seq[min(i, len(seq) - 1)]
+        self._sleep(e["ms"] / 1000)
+        return e
+
+    def k8s(self, method, path):
+        e = self._take("k8s", f"{method} {path}")
+        if e is None or "s" in e:
+            code, reason = (404, "not in trace") if e is None else (e["s"], e.get("e", ""))
+            raise urllib.error.HTTPError(API + path, code, reason, None, io.BytesIO(b"{}"))
+        if "x" in e: raise OSError(e["x"])
+        return json.loads(json.dumps(e["r"]))     # a fresh copy, parsed like a real response
+
+    def dcgm(self, ip):
+        e = self._take("dcgm", ip)
+        if e is None or "x" in e: raise OSError(e["x"] if e else f"{ip}: not in trace")
+        return e["r"].encode()
+
+    def stream(self, key, timeout):
+        end = time.monotonic() + min(timeout, 60)
+        while True:
+            with self._lock:
+                evs, i = self.events.get(key, []), self.next.get(("watch", key), 0)
+                if i >= len(evs): break
+                self.next[("watch", key)] = i + 1
+            self._sleep(evs[i]["t"] - (time.monotonic() - self.t0) * self.speed)
+            yield evs[i]["r"]
+        time.sleep(max(0.0, end - time.monotonic()))      # then an idle watch, like a quiet cluster
+
+    def stats(self):
+        with self._lock:
+            return {"served": self.served, "missing": dict(self.missing),
+                    "watch_events_left": sum(len(v) - self.next.get(("watch", k), 0)
+                                             for k, v in self.events.items())}
+
+REPLAYER = TraceReplay(REPLAY) if REPLAY and not DEMO else None
+RECORDER = TraceWriter(RECORD) if RECORD and not REPLAYER and not DEMO else None
+
+def _traced(kind, key, fn, **extra):
+    """fn(), logged with its timing and result (or error) when recording."""
+    if not RECORDER: return fn()
+    t = time.monotonic()
+    try:
+        r = fn()
+    except urllib.error.HTTPError as e:
+        RECORDER.add(kind, key, t, s=e.code, e=str(e.reason), **extra)
+        raise
+    except Exception as e:
+        RECORDER.add(kind, key, t, x=str(e), **extra)
+        raise
+    RECORDER.add(kind, key, t, r=r.decode(errors="replace") if isinstance(r, bytes) else _scrub(key, r), **extra)
+    return r
+
 def k8s(method, path, body=None, content_type="application/json"):
-    token = Path(f"{SA}/token").read_text().strip()
-    ctx = ssl.create_default_context(cafile=f"{SA}/ca.crt")
-    req = urllib.request.Request(API + path, method=method,
-        headers={"Authorization": f"Bearer {token}", "Content-Type": content_type})
-    data = json.dumps(body).encode() if body is not None else None
-    with urllib.request.urlopen(req, data=data, context=ctx, timeout=15) as r:
-        return json.loads(r.read() or b"{}")
+    key, t = (method, _k8s_resource(path)), time.perf_counter()
+    try:
+        with TIMINGS.span(f"k8s {method} {path.split('?')[0]}"):
+            if REPLAYER: return REPLAYER.k8s(method, path)
+            return _traced("k8s", f"{method} {path}", lambda: KUBE.request(method, path, body, content_type),
+                           **({"b": body} if body is not None and method == "PATCH" else {}))
+    except urllib.error.HTTPError as e:
+        K8S_ERRORS.inc(key + (str(e.code),))
+        raise
+    except Exception:
+        K8S_ERRORS.inc(key + ("conn",))
+        raise
+    finally:
+        K8S_SECONDS.observe(key, time.perf_counter() - t)
+
+def k8s_watch(path, timeout=None):
+    """KUBE.stream() for watches, recorded/replayed under the watched path."""
+    key = path.split("watch=1")[0].rstrip("?&")
+    if REPLAYER:
+        yield from REPLAYER.stream(key, timeout or 330)
+        return
+    for ev in KUBE.stream(path, timeout):
+        if RECORDER: RECORDER.add("watch", key, time.monotonic(), r=_scrub(key, ev))
+        yield ev
+
+def k8s_exec(ns, pod, command, container=None, timeout=30):
+    """Run `command` (argv) in a pod -> (exit code, output). Not recorded: a trace
+    replays the cluster's state, not side effects inside pods — so under replay
+    (and in demo) it refuses rather than reach whatever cluster is configured."""
+    if REPLAYER or DEMO:
+        raise RuntimeError("pod exec is not available in replay or demo mode")
+    q = urllib.parse.urlencode([("command", c) for c in command] + [("stdout", "1"), ("stderr", "1")]
+                               + ([("container", container)] if container else []))
+    key, t = ("POST", "pods/exec"), time.perf_counter()
+    try:
+        return KUBE.exec(f"/api/v1/namespaces/{ns}/pods/{pod}/exec?{q}", timeout)
+    except urllib.error.HTTPError as e:
+        K8S_ERRORS.inc(key + (str(e.code),))
+        raise
+    except OSError:
+        K8S_ERRORS.inc(key + ("conn",))
+        raise
+    finally:
+        K8S_SECONDS.observe(key, time.perf_counter() - t)
+
+# ----------------------------------------------------------------- background jobs
+def _job_limits(raw):
+    out = {"drain": 4, "maintenance": 1, "join": 4, "driver": 2, "rename": 1, "deploy": 2}
+    for kv in filter(None, (s.strip() for s in raw.split(","))):
+        k, _, v = kv.partition("=")
+        out[k.strip()] = int(v)
+    return out
+
+JOB_WORKERS = int(os.environ.get("COCKPIT_JOB_WORKERS", "8"))
+JOB_LIMITS = _job_limits(os.environ.get("COCKPIT_JOB_LIMITS", ""))      # "drain=4,deploy=1" overrides
+JOB_QUEUE = int(os.environ.get("COCKPIT_JOB_QUEUE", "100"))
+JOB_TTL = float(os.environ.get("COCKPIT_JOB_TTL", "86400"))             # finished jobs kept this long (s)
+JOB_KEEP = 50                                                            # …and at most this many per kind
+JOB_STORE = os.environ.get("COCKPIT_JOB_STORE", "off" if DEMO or REPLAY else "configmap")
+JOB_SYNC = float(os.environ.get("COCKPIT_JOB_SYNC", "5"))
+JOB_CM = "/api/v1/namespaces/cockpit/configmaps/cockpit-jobs"
+PRIO_HIGH, PRIO_NORMAL, PRIO_LOW = 0, 1, 2
+JOB_QUEUED = "queued behind other jobs"
+
+class JobStore:
+    """Where job state outlives the process: the cockpit-jobs ConfigMap
+    ("configmap"), a JSON file ("file:<path>"), or nowhere ("off")."""
+    def __init__(self, spec=JOB_STORE):
+        self.spec = spec
+
+    def load(self):
+        if self.spec.startswith("file:"):
+            p = Path(self.spec[5:])
+            return json.loads(p.read_text()) if p.exists() else {}
+        if self.spec == "configmap":
+            try:
+                cm = k8s("GET", JOB_CM)
+            except urllib.error.HTTPError as e:
+                if e.code == 404: return {}
+                raise
+            return json.loads((cm.get("data") or {}).get("jobs.json") or "{}")
+        return {}
+
+    def save(self, raw):
+        if self.spec.startswith("file:"):
+            p = Path(self.spec[5:])
+            tmp = p.with_suffix(p.suffix + ".tmp")
+            tmp.write_text(raw)
+            os.replace(tmp, p)
+        elif self.spec == "configmap":
+            body = {"apiVersion": "v1", "kind": "ConfigMap", "data": {"jobs.json": raw},
+                    "metadata": {"name": JOB_CM.rsplit("/", 1)[1], "namespace": "cockpit"}}
+            try:
+                k8s("PUT", JOB_CM, body)
+            except urllib.error.HTTPError as e:
+                if e.code != 404: raise
+                k8s("POST", JOB_CM.rsplit("/", 1)[0], body)
+
+class JobExecutor:
+    """Runs every background job on JOB_WORKERS threads. Jobs wait in one queue;
+    a free worker takes the most urgent (priority, then age) whose kind is under
+    its JOB_LIMITS share. Each kind keeps its state in its own dict (DRAINS,
+    ADD_JOBS, …), registered here so finished entries expire (JOB_TTL/JOB_KEEP)
+    and the lot is persisted every JOB_SYNC seconds — after a restart, jobs that
+    were in flight resume when their kind can, else read "interrupted".
+    PRIO_HIGH kinds (drains) have their whole limit reserved: other kinds
+    share what is left, so long SSH jobs and node watches can't keep a drain
+    waiting. The pool grows past JOB_WORKERS if that would leave them none."""
+    def __init__(self, workers=JOB_WORKERS, limits=JOB_LIMITS, depth=JOB_QUEUE, store=None):
+        self.workers, self.limits, self.depth = workers, limits, depth
+        self.store, self.store_error, self._saved = store or JobStore(), None, None
+        self.kinds = {}                       # kind -> (jobs, lock, priority, resume)
+        self._queue, self._running, self._seq = [], collections.Counter(), 0
+        self._cond, self._threads = threading.Condition(), []
+
+    def register(self, kind, jobs, lock, priority=PRIO_NORMAL, resume=None):
+        """resume(key, entry) -> (fn, *args) to rerun an interrupted job, or None."""
+        self.kinds[kind] = (jobs, lock, priority, resume)
+
+    def _reserved(self):
+        return sum(self.limits.get(k, 1) for k, (_, _, p, _) in self.kinds.items() if p == PRIO_HIGH)
+
+    def size(self):
+        # two shared workers at least: a maintenance plan holds one while the
+        # driver-install jobs of its hooks need another
+        return max(self.workers, self._reserved() + 2)
+
+    def submit(self, kind, key, fn, *args, priority=None, restored=False):
+        """Queue fn(*args) as job `key` of `kind`. Past JOB_QUEUE waiting jobs new
+        work is refused (RuntimeError); jobs resumed by restore() always get in."""
+        jobs, _, prio, _ = self.kinds[kind]
+        with self._cond:
+            if len(self._queue) >= self.depth and not restored:
+                jobs[key].update(phase="error", msg="job queue full", finished=time.time())
+                raise RuntimeError(f"{self.depth} jobs already queued — try again shortly")
+            while len(self._threads) < self.size():
+                t = threading.Thread(target=self._work, name=f"job-{len(self._threads)}", daemon=True)
+                self._threads.append(t)
+                t.start()
+            ahead = sum(1 for j in self._queue if j[2] == kind)
+            if not jobs[key].get("msg") and (self._running[kind] + ahead >= self.limits.get(kind, 1)
+                                             or sum(self._running.values()) + len(self._queue) >= self.size()):
+                jobs[key]["msg"] = JOB_QUEUED
+            self._seq += 1
+            self._queue.append((prio if priority is None else priority, self._seq, kind, key,
+                                _tracked(kind, jobs, key, fn), args))
+            self._cond.notify_all()
+
+    def _take(self):
+        """Most urgent runnable job, or None (caller holds _cond)."""
+        high = lambda k: self.kinds[k][2] == PRIO_HIGH
+        shared = self.size() - self._reserved() - sum(n for k, n in self._running.items() if not high(k))
+        ready = [j for j in self._queue if self._running[j[2]] < self.limits.get(j[2], 1)
+                 and (high(j[2]) or shared > 0)]
+        if not ready:
+            return None
+        job = min(ready)
+        self._queue.remove(job)
+        self._running[job[2]] += 1
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._take()
+                while job is None:
+                    self._cond.wait()
+                    job = self._take()
+            _, _, kind, key, fn, args = job
+            st = self.kinds[kind][0].get(key) or {}
+            if st.get("msg") == JOB_QUEUED: st["msg"] = ""
+            try:
+                fn(*args)
+            except Exception as e:
+                if st.get("phase") not in JOB_DONE: st.update(phase="error", msg=str(e))
+            finally:
+                st["finished"] = time.time()
+                with self._cond:
+                    self._running[kind] -= 1
+                    self._cond.notify_all()
+                _on_cluster_change()
+
+    def prune(self, now=None):
+        """Forget finished jobs past JOB_TTL, and all but the newest JOB_KEEP per kind."""
+        now = now or time.time()
+        for jobs, lock, _, _ in self.kinds.values():
+            with lock:
+                done = sorted((j.get("finished") or j.get("ts") or 0, k) for k, j in jobs.items()
+                              if j.get("phase") in JOB_DONE)
+                for i, (t, k) in enumerate(done):
+                    if now - t > JOB_TTL or len(done) - i > JOB_KEEP:
+                        del jobs[k]
+
+    def state(self):
+        out = {}
+        for kind, (jobs, lock, _, _) in self.kinds.items():
+            with lock:
+                out[kind] = json.loads(json.dumps(jobs, default=str))
+        return out
+
+    def save(self):
+        try:
+            raw = json.dumps(self.state(), sort_keys=True, separators=(",", ":"))
+            if raw == self._saved:
+                return
+            self.store.save(raw)
+            self._saved, self.store_error = raw, None
+        except Exception as e:
+            self.store_error = f"save: {e}"
+
+    def restore(self):
+        """Load persisted jobs: finished ones come back as history; ones that were
+        queued or running are resubmitted, or marked interrupted."""
+        try:
+            doc = self.store.load()
+        except Exception as e:
+            self.store_error = f"load: {e}"
+            return
+        for kind, entries in doc.items():
+            if kind not in self.kinds:
+                continue
+            jobs, lock, _, resume = self.kinds[kind]
+            for key, st in entries.items():
+                with lock:
+                    if key in jobs: continue
+                    jobs[key] = st
+                if st.get("phase") in JOB_DONE:
+                    continue
+                again = resume(key, st) if resume else None
+                if again:
+                    st["msg"] = "resumed after a cockpit restart"
+                    self.submit(kind, key, *again, restored=True)
+                else:
+                    st.update(phase="interrupted", finished=time.time(),
+                              msg=f"cockpit restarted while {st.get('phase', 'running')} — check and re-run")
+
+    def _sync(self):
+        while True:
+            time.sleep(JOB_SYNC)
+            try:
+                self.prune()
+                if self.store.spec != "off":
+                    self.save()
+            except Exception as e:            # a job dict changed mid-copy; next pass
+                self.store_error = f"prune: {e}"
+
+    def start(self):
+        if self.store.spec != "off":
+            self.restore()
+            atexit.register(self.save)
+        threading.Thread(target=self._sync, name="job-sync", daemon=True).start()
+
+    def stats(self):
+        with self._cond:
+            queued = [{"kind": j[2], "key": j[3], "priority": j[0]} for j in sorted(self._queue)]
+            running = {k: n for k, n in self._running.items() if n}
+        return {"workers": self.size(), "reserved": self._reserved(), "limits": self.limits, "running": running, "queued": queued,
+                "store": self.store.spec, "store_error": self.store_error}
+
+JOBS = JobExecutor()
+
+# ----------------------------------------------------------------- informers
+INFORMERS_ON = (not DEMO and os.environ.get("COCKPIT_INFORMERS", "1") == "1"
+                and (not REPLAYER or bool(REPLAYER.events)))     # replay as recorded
+
+def _obj_key(obj):
+    md = obj.get("metadata", {})
+    return f"{md['namespace']}/{md['name']}" if md.get("namespace") else md.get("name", "")
+
+class Informer:
+    """One list, then a watch from the list's resourceVersion, feeding an in-memory
+    store keyed by ns/name. Disconnects resume from the last resourceVersion seen;
+    410 Gone (history compacted) relists. Subscribers get (type, obj, old) calls."""
+    def __init__(self, name, path):
+        self.name, self.path = name, path
+        self.store, self.rv = {}, ""
+        self.synced = threading.Event()
+        self._lock, self._handlers = threading.Lock(), []
+
+    def items(self, namespace=None):
+        with self._lock:
+            objs = list(self.store.values())
+        if namespace is None:
+            return objs
+        return [o for o in objs if o["metadata"].get("namespace") == namespace]
+
+    def get(self, key):
+        with self._lock:
+            return self.store.get(key)
+
+    def subscribe(self, fn):
+        self._handlers.append(fn)
+
+    def _emit(self, kind, obj, old):
+        for fn in self._handlers:
+            try:
+                fn(kind, obj, old)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _trim(obj):
+        obj.get("metadata", {}).pop("managedFields", None)   # often half the object
+        return obj
+
+    def _list(self):
+        body = k8s("GET", self.path)
+        fresh = {_obj_key(o): self._trim(o) for o in body.get("items", [])}
+        with self._lock:
+            old, self.store = self.store, fresh
+            self.rv = body.get("metadata", {}).get("resourceVersion", "")
+        for k, o in old.items():
+            if k not in fresh:
+                self._emit("DELETED", o, o)
+        for k, o in fresh.items():
+            prev = old.get(k)
+            if prev is None:
+                self._emit("ADDED", o, None)
+            elif prev["metadata"].get("resourceVersion") != o["metadata"].get("resourceVersion"):
+                self._emit("MODIFIED", o, prev)
+        self.synced.set()
+
+    def _watch(self):
+        sep = "&" if "?" in self.path else "?"
+        q = (f"{self.path}{sep}watch=1&allowWatchBookmarks=true&timeoutSeconds=300"
+             f"&resourceVersion={urllib.parse.quote(self.rv)}")
+        for ev in k8s_watch(q, timeout=330):
+            kind, obj = ev.get("type"), ev.get("object") or {}
+            if kind == "ERROR":
+                if obj.get("code") == 410:
+                    self.rv = ""                  # compacted — relist from scratch
+                    return
+                raise RuntimeError(obj.get("message") or "watch error")
+            rv = obj.get("metadata", {}).get("resourceVersion")
+            if kind == "BOOKMARK":
+                self.rv = rv or self.rv
+                continue
+            key = _obj_key(self._trim(obj))
+            with self._lock:
+                old = self.store.get(key)
+                if kind == "DELETED":
+                    self.store.pop(key, None)
+                else:
+                    self.store[key] = obj
+                self.rv = rv or self.rv
+            self._emit(kind, obj, old)
+
+    def _run(self):
+        backoff = 1
+        while True:
+            try:
+                if not self.rv:
+                    self._list()
+                self._watch()
+                backoff = 1
+            except urllib.error.HTTPError as e:
+                if e.code == 410:
+                    self.rv = ""
+                    continue
+                time.sleep(backoff)
+                backoff = min(30, backoff * 2)
+            except Exception:
+                time.sleep(backoff)
+                backoff = min(30, backoff * 2)
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"informer-{self.name}", daemon=True).start()
+        return self
+
+INFORMERS = {}
+def start_informers():
+    if not INFORMERS_ON:
+        return
+    for name, path in (("nodes", "/api/v1/nodes"), ("pods", "/api/v1/pods"),
+                       ("deployments", "/apis/apps/v1/deployments"),
+                       ("replicasets", "/apis/apps/v1/replicasets"),
+                       ("statefulsets", "/apis/apps/v1/statefulsets"),
+                       ("jobs", "/apis/batch/v1/jobs")):
+        INFORMERS[name] = inf = Informer(name, path)
+        inf.subscribe(_informer_changed(name))
+    INFORMERS["pods"].subscribe(_on_exporter_pod)
+    INFORMERS["pods"].subscribe(OWNERS.on_pod)
+    INFORMERS["replicasets"].subscribe(OWNERS.on_replicaset)
+    for inf in INFORMERS.values():
+        inf.start()
+
+# ----------------------------------------------------------------- owner graph
+WORKLOAD_KINDS = ("Deployment", "StatefulSet", "Job")
+
+class OwnerIndex:
+    """pod <-> workload, kept current from pod and ReplicaSet events. Deployment
+    pods are linked through their ReplicaSet's owner; StatefulSet and Job pods
+    directly. Workload keys are (kind, ns, name); pod keys are "ns/name".
+      pods_of(key) -> {pod key: (node, gpus)}     owner_of(pod key) -> key
+    Both are dict lookups. Pods whose ReplicaSet hasn't been seen yet wait in
+    `_orphans` and are linked when it arrives; a deleted ReplicaSet sends its
+    pods back there."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rs_owner = {}            # rs uid -> (ns, deployment)
+        self.owner = {}               # pod key -> workload key
+        self.pods = {}                # workload key -> {pod key: (node, gpus)}
+        self._orphans = {}            # rs uid -> {pod key: (node, gpus)}
+        self._orphan_of = {}          # pod key -> rs uid
+        self._via = {}                # rs uid -> {pod key} linked through it
+        self._via_of = {}             # pod key -> rs uid it was linked through
+
+    def live(self):
+        return _informer("pods") is not None and _informer("replicasets") is not None
+
+    def _unlink(self, pk):
+        key = self.owner.pop(pk, None)
+        if key is not None:
+            pods = self.pods.get(key)
+            if pods is not None:
+                pods.pop(pk, None)
+                if not pods: del self.pods[key]
+        uid = self._orphan_of.pop(pk, None)
+        if uid is not None:
+            pods = self._orphans.get(uid)
+            if pods is not None:
+                pods.pop(pk, None)
+                if not pods: del self._orphans[uid]
+        uid = self._via_of.pop(pk, None)
+        if uid is not None:
+            linked = self._via.get(uid)
+            if linked is not None:
+                linked.discard(pk)
+                if not linked: del self._via[uid]
+
+    def _link(self, key, pk, node, gpus, rs=None):
+        self.owner[pk] = key
+        self.pods.setdefault(key, {})[pk] = (node, gpus)
+        if rs is not None:
+            self._via.setdefault(rs, set()).add(pk)
+            self._via_of[pk] = rs
+
+    def _orphan(self, uid, pk, node, gpus):
+        self._orphans.setdefault(uid, {})[pk] = (node, gpus)
+        self._orphan_of[pk] = uid
+
+    def on_pod(self, kind, pod, old=None):
+        md, ns = pod["metadata"], pod["metadata"].get("namespace", "")
+        pk = f"{ns}/{md['name']}"
+        node = pod.get("spec", {}).get("nodeName")
+        with self._lock:
+            self._unlink(pk)
+            if kind == "DELETED" or not node or \
+                    pod.get("status", {}).get("phase") in ("Succeeded", "Failed"):
+                return
+            gpus = gpu_req(pod)
+            for o in md.get("ownerReferences", []):
+                k = o.get("kind")
+                if k == "ReplicaSet":
+                    dep = self.rs_owner.get(o.get("uid"))
+                    if dep: self._link(("Deployment",) + dep, pk, node, gpus, o.get("uid"))
+                    else: self._orphan(o.get("uid"), pk, node, gpus)
+                elif k in WORKLOAD_KINDS:
+                    self._link((k, ns, o["name"]), pk, node, gpus)
+
+    def on_replicaset(self, kind, rs, old=None):
+        md = rs["metadata"]
+        uid = md.get("uid")
+        with self._lock:
+            if kind == "DELETED":
+                self.rs_owner.pop(uid, None)
+                for pk in self._via.pop(uid, ()):
+                    key = self.owner[pk]
+                    node, gpus = self.pods[key][pk]
+                    self._unlink(pk)
+                    self._orphan(uid, pk, node, gpus)
+                return
+            dep = next((o["name"] for o in md.get("ownerReferences", [])
+                        if o.get("kind") == "Deployment"), None)
+            if dep is None: return
+            self.rs_owner[uid] = (md["namespace"], dep)
+            for pk, (node, gpus) in self._orphans.pop(uid, {}).items():
+                self._orphan_of.pop(pk, None)
+                self._link(("Deployment", md["namespace"], dep), pk, node, gpus, uid)
+
+    @classmethod
+    def build(cls, pods, replicasets):
+        """One-off index from plain lists (informers off or not yet synced)."""
+        idx = cls()
+        for rs in replicasets: idx.on_replicaset("ADDED", rs)
+        for p in pods: idx.on_pod("ADDED", p)
+        return idx
+
+    def pods_of(self, key):
+        with self._lock:
+            return dict(self.pods.get(key, {}))
+
+    def owner_of(self, pod_key):
+        with self._lock:
+            return self.owner.get(pod_key)
+
+    def placement(self, key):
+        """[{node, pods, gpus}] for every node running a replica, busiest first."""
+        by_node = {}
+        for node, gpus in self.pods_of(key).values():
+            slot = by_node.setdefault(node, {"node": node, "pods": 0, "gpus": 0})
+            slot["pods"] += 1
+            slot["gpus"] += gpus
+        return sorted(by_node.values(), key=lambda x: (-x["pods"], x["node"]))
+
+OWNERS = OwnerIndex()
+
+def _informer(name):
+    inf = INFORMERS.get(name)
+    return inf if inf and inf.synced.is_set() else None
+
+def _cached_items(name, path):
+    """Objects from the named informer once it has synced, else a direct list
+    (startup, or COCKPIT_INFORMERS=0)."""
+    inf = _informer(name)
+    return inf.items() if inf else k8s("GET", path)["items"]
+
+# ----------------------------------------------------------------- slow-changing sources
+SWR_TTL = {"longhorn": 30, "longhorn_version": 600, "join_secret": 60, "apps": 30}
+for _kv in filter(None, os.environ.get("COCKPIT_TTL", "").split(",")):
+    _k, _, _v = _kv.partition("=")
+    SWR_TTL[_k.strip()] = float(_v)
+
+class Cached:
+    """Stale-while-revalidate holder for one rarely-changing source. The first
+    get() fetches inline; after `ttl` seconds the old value keeps being served
+    while a single background thread refreshes it. A failed refresh keeps the
+    last good value (and its age) and is retried on the next get(). Concurrent
+    first callers share one fetch."""
+    def __init__(self, name, fetch):
+        self.name, self.fetch = name, fetch
+        self.value, self.ts, self.loaded, self.error = None, 0.0, 0.0, None
+        self._lock, self._refreshing = threading.Lock(), False
+        self._done = threading.Condition(self._lock)
+
+    @property
+    def ttl(self):
+        return SWR_TTL.get(self.name, 30)
+
+    def age(self):
+        return round(time.monotonic() - self.ts, 1) if self.ts else None
+
+    def _refresh(self):
+        try:
+            value = self.fetch()
+            with self._lock:
+                self.value, self.ts, self.loaded, self.error = value, time.monotonic(), time.time(), None
+        except Exception as e:
+            with self._lock: self.error = str(e)
+            raise
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._done.notify_all()
+
+    def get(self):
+        with self._lock:
+            if self.ts and time.monotonic() - self.ts < self.ttl:
+                return self.value
+            if self.ts:                      # stale: serve it, refresh behind
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._bg, daemon=True,
+                                     name=f"swr-{self.name}").start()
+                return self.value
+            if self._refreshing:             # cold, and a fetch is already under way: share it
+                while self._refreshing:
+                    self._done.wait()
+                if self.ts:
+                    return self.value
+                raise RuntimeError(self.error or f"{self.name} unavailable")
+            self._refreshing = True
+        self._refresh()
+        return self.value
+
+    def _bg(self):
+        try:
+            self._refresh()
+        except Exception:
+            pass
+
+    def invalidate(self):
+        with self._lock: self.ts = 0.0
+
+    def status(self):
+        """For the overview's `sources`: when the value was fetched (epoch), not
+        its age, so the report only changes when the holder does."""
+        return {"loaded": round(self.loaded) or None, "ttl_s": self.ttl,
+                **({"error": self.error} if self.error else {}),
+                **({"ok": False} if self.error and not self.loaded else {})}
+
+CACHED = {}
+def cached(name):
+    """Decorator: route a zero-arg fetch through a named Cached holder."""
+    def wrap(fn):
+        CACHED[name] = c = Cached(name, fn)
+        return c.get
+    return wrap
 
 # ----------------------------------------------------------------- DCGM telemetry
 DCGM = {"DCGM_FI_DEV_GPU_UTIL": "util", "DCGM_FI_DEV_GPU_TEMP": "temp",
@@ -64,45 +1218,301 @@ DCGM = {"DCGM_FI_DEV_GPU_UTIL": "util", "DCGM_FI_DEV_GPU_TEMP": "temp",
         "DCGM_FI_DEV_POWER_USAGE": "power",
         "DCGM_FI_DEV_SM_CLOCK": "sm_clock", "DCGM_FI_DEV_MEM_CLOCK": "mem_clock",
         "DCGM_FI_DEV_MEM_COPY_UTIL": "mem_util"}
-_LINE = re.compile(r'^(\w+)\{([^}]*)\}\s+([0-9.eE+-]+)')
-
-def scrape_dcgm(ip):
-    with urllib.request.urlopen(f"http://{ip}:9400/metrics", timeout=3) as r:
-        text = r.read().decode(errors="replace")
-    gpus = {}
-    for line in text.splitlines():
-        m = _LINE.match(line)
-        if not m or m.group(1) not in DCGM: continue
-        labels = dict(re.findall(r'(\w+)="([^"]*)"', m.group(2)))
-        idx = labels.get("gpu", "0")
-        slot = gpus.setdefault(idx, {"idx": idx})
-        slot[DCGM[m.group(1)]] = float(m.group(3))
-        if labels.get("UUID"):
-            slot["uuid"] = labels["UUID"]
-        if labels.get("modelName"):
-            slot["model"] = labels["modelName"]
-        for k in ("pod", "namespace", "container"):
-            if labels.get(k):
-                slot[k] = labels[k]
+_DCGM_B = {k.encode(): v for k, v in DCGM.items()}
+_DCGM_LABELS = {b"gpu": "gpu", b"UUID": "uuid", b"modelName": "model",
+                b"pod": "pod", b"namespace": "namespace", b"container": "container"}
+
+def _dcgm_labels(raw):
+    """b'gpu="0",UUID="GPU-…",…' -> {wanted label: str}, one left-to-right pass."""
+    out, i = {}, 0
+    while True:
+        eq = raw.find(b'="', i)
+        if eq < 0: return out
+        end = raw.find(b'"', eq + 2)
+        if end < 0: return out
+        key = raw[i:eq].strip(b", ")
+        if key in _DCGM_LABELS and end > eq + 2:
+            out[_DCGM_LABELS[key]] = raw[eq + 2:end].decode(errors="replace")
+        i = end + 1
+
+def parse_dcgm(lines):
+    """Prometheus exposition (an iterable of byte lines: a response object or
+    body.splitlines()) -> {gpu index: sample}. Lines whose metric isn't in DCGM
+    are rejected on a prefix/dict check before any label work, and each distinct
+    label set (the exporter repeats one per GPU on every field) is parsed once."""
+    gpus, seen = {}, {}
+    for line in lines:
+        if not line.startswith(b"DCGM_FI_"): continue
+        lb = line.find(b"{")
+        field = _DCGM_B.get(line[:lb]) if lb > 0 else None
+        if field is None: continue
+        rb = line.find(b"}", lb)
+        if rb < 0: continue
+        try:
+            value = float(line[rb + 1:].split(None, 1)[0])
+        except (ValueError, IndexError):
+            continue
+        if not math.isfinite(value): continue
+        raw = line[lb + 1:rb]
+        slot = seen.get(raw)
+        if slot is None:
+            labels = _dcgm_labels(raw)
+            idx = labels.pop("gpu", "0")
+            slot = seen[raw] = gpus.setdefault(idx, {"idx": idx})
+            slot.update(labels)
+        slot[field] = value
     return gpus
 
-def telemetry():
-    """node -> [per-GPU dicts sorted by index]. Empty on any failure (UI degrades)."""
-    if DEMO: return demo_telemetry()
-    out = {}
-    try:
+def scrape_dcgm(ip, timeout=3):
+    if REPLAYER: return parse_dcgm(REPLAYER.dcgm(ip).splitlines())
+    if RECORDER: return parse_dcgm(_traced("dcgm", ip, lambda: _fetch_dcgm(ip, timeout)).splitlines())
+    with urllib.request.urlopen(f"http://{ip}:{DCGM_PORT}/metrics", timeout=timeout) as r:
+        return parse_dcgm(r)
+
+def _fetch_dcgm(ip, timeout):
+    with urllib.request.urlopen(f"http://{ip}:{DCGM_PORT}/metrics", timeout=timeout) as r:
+        return r.read()
+
+DCGM_PORT = int(os.environ.get("COCKPIT_DCGM_PORT", "9400"))
+DCGM_INTERVAL = float(os.environ.get("COCKPIT_DCGM_INTERVAL", "5"))
+DCGM_HISTORY = int(os.environ.get("COCKPIT_DCGM_HISTORY", "720"))     # samples per GPU
+DCGM_BACKOFF_MAX = float(os.environ.get("COCKPIT_DCGM_BACKOFF_MAX", "300"))
+DCGM_TRIP = 2                        # consecutive failures before the breaker opens
+
+class Exporter:
+    """Circuit breaker + stats for one node's dcgm-exporter. closed: scraped every
+    pass. open: skipped until retry_at (exponential, jittered backoff). half_open:
+    one probe with a short timeout decides between the two. The last good sample
+    is kept and served flagged stale while the exporter is failing."""
+    __slots__ = ("node", "ip", "state", "fails", "failures", "scrapes", "latency_ms",
+                 "last_ok", "last_err", "retry_at", "retry_wall", "good")
+    def __init__(self, node, ip):
+        self.node, self.ip, self.state = node, ip, "closed"
+        self.fails = self.failures = self.scrapes = 0
+        self.latency_ms, self.last_ok, self.last_err = None, 0.0, ""
+        self.retry_at, self.retry_wall, self.good = 0.0, 0.0, None
+
+    def due(self, now):
+        if self.state == "closed": return True
+        if now < self.retry_at: return False
+        self.state = "half_open"
+        return True
+
+    def timeout(self):
+        return 1.0 if self.state == "half_open" else 3.0
+
+    def ok(self, gpus, ms):
+        self.scrapes += 1
+        self.state, self.fails, self.latency_ms = "closed", 0, ms
+        self.last_ok, self.last_err, self.good = time.time(), "", gpus
+
+    def fail(self, err, ms):
+        self.scrapes += 1
+        self.failures += 1
+        self.fails += 1
+        self.latency_ms, self.last_err = ms, str(err)[:160]
+        if self.state == "half_open" or self.fails >= DCGM_TRIP:
+            wait = min(DCGM_BACKOFF_MAX, DCGM_INTERVAL * 2 ** max(0, self.fails - DCGM_TRIP))
+            wait *= random.uniform(.8, 1.2)
+            self.state, self.retry_at, self.retry_wall = "open", time.monotonic() + wait, time.time() + wait
+
+    def sample(self):
+        """Last good per-GPU dicts; flagged stale unless the latest scrape succeeded."""
+        if self.good is None: return None
+        if self.fails == 0: return self.good
+        return {i: {**g, "stale": True, "stale_since": round(self.last_ok)} for i, g in self.good.items()}
+
+    def status(self, detail=False):
+        """Breaker state with epoch times (the client ages them), so it only changes
+        when the breaker does; per-scrape latency and counts only with `detail`."""
+        return {"state": self.state, "failures": self.failures, "consecutive": self.fails,
+                "last_ok": round(self.last_ok) or None,
+                **({"error": self.last_err} if self.last_err else {}),
+                **({"retry_at": round(self.retry_wall)} if self.state == "open" else {}),
+                **({"latency_ms": self.latency_ms, "scrapes": self.scrapes} if detail else {})}
+
+EXPORTERS, _XLOCK = {}, threading.Lock()   # node -> Exporter; the collector writes, requests read
+
+def _is_exporter(pod):
+    md = pod.get("metadata", {})
+    return (md.get("namespace") == "gpu-operator"
+            and md.get("labels", {}).get("app") == "nvidia-dcgm-exporter")
+
+def _discover_exporters():
+    """node -> exporter pod IP. Read from the pod informer (which already watches
+    every pod, so no extra watch) once synced; otherwise one labelled list."""
+    inf = _informer("pods")
+    if inf:
+        pods = [p for p in inf.items("gpu-operator") if _is_exporter(p)]
+    else:
         sel = urllib.parse.quote("app=nvidia-dcgm-exporter")
         pods = k8s("GET", f"/api/v1/namespaces/gpu-operator/pods?labelSelector={sel}")["items"]
-        jobs = [(p["status"].get("podIP"), p["spec"].get("nodeName"))
-                for p in pods if p["status"].get("podIP") and p["spec"].get("nodeName")]
-        with ThreadPoolExecutor(max_workers=8) as ex:
-            futs = {ex.submit(scrape_dcgm, ip): node for ip, node in jobs}
-            for f, node in futs.items():
-                try: out[node] = f.result()
-                except Exception: pass
+    return {p["spec"]["nodeName"]: p["status"]["podIP"]
+            for p in pods if p["status"].get("podIP") and p["spec"].get("nodeName")
+            and p["status"].get("phase") == "Running"
+            and not p["metadata"].get("deletionTimestamp")}
+
+def _on_exporter_pod(kind, pod, old):
+    """Exporter restarted / rescheduled / gone: rescrape now instead of next tick."""
+    if not _is_exporter(pod): return
+    ip = lambda o: (o or {}).get("status", {}).get("podIP")
+    if kind != "MODIFIED" or ip(pod) != ip(old) or \
+            (pod.get("status", {}).get("phase") != (old or {}).get("status", {}).get("phase")):
+        COLLECTOR.wake()
+
+def _scrape_one(ex):
+    t = time.monotonic()
+    try:
+        with TIMINGS.span(f"dcgm {ex.node}"):
+            gpus = scrape_dcgm(ex.ip, ex.timeout())
+    except Exception as e:
+        DCGM_FAILURES.inc((ex.node,))
+        ex.fail(e, round(1000 * (time.monotonic() - t)))
+    else:
+        ex.ok(gpus, round(1000 * (time.monotonic() - t)))
+    finally:
+        DCGM_SECONDS.observe((ex.node,), time.monotonic() - t)
+
+def scrape_all():
+    """node -> [per-GPU dicts sorted by index], one pass over every exporter whose
+    breaker lets it through. Failing nodes keep their last good values, flagged
+    stale. Called by the collector."""
+    if DEMO: return demo_telemetry()
+    try:
+        found = _discover_exporters()
     except Exception:
-        return {}
-    return {n: [g[i] for i in sorted(g, key=int)] for n, g in out.items()}
+        found = {n: e.ip for n, e in exporters()}        # API blip: keep scraping known IPs
+    with _XLOCK:
+        for node in [n for n in EXPORTERS if n not in found]:
+            del EXPORTERS[node]
+            DCGM_SECONDS.forget((node,))
+            DCGM_FAILURES.forget((node,))
+        for node, ip in found.items():
+            if node not in EXPORTERS or EXPORTERS[node].ip != ip:
+                EXPORTERS[node] = Exporter(node, ip)          # new or restarted exporter
+    now = time.monotonic()
+    due = [e for _, e in exporters() if e.due(now)]
+    if due:
+        with ThreadPoolExecutor(max_workers=min(32, len(due))) as pool:
+            list(pool.map(TIMINGS.bind(_scrape_one), due))
+    out = {}
+    for node, e in exporters():
+        g = e.sample()
+        if g is not None:
+            out[node] = [g[i] for i in sorted(g, key=int)]
+    return out
+
+def exporters():
+    """Sorted (node, Exporter) pairs, safe to iterate while the collector changes the set."""
+    with _XLOCK:
+        return sorted(EXPORTERS.items())
+
+def exporter_status(detail=False):
+    return {n: e.status(detail) for n, e in exporters()}
+
+class GpuRing:
+    """Fixed-size per-GPU history: one array('d') per field plus timestamps, written
+    round-robin, so memory is flat at ~8 bytes x (fields+1) x size per GPU."""
+    FIELDS = ("util", "temp", "power", "vram_used", "vram_free", "sm_clock", "mem_clock", "mem_util")
+    __slots__ = ("size", "head", "count", "t", "cols")
+    def __init__(self, size=DCGM_HISTORY):
+        self.size, self.head, self.count = size, 0, 0
+        self.t = array.array("d", bytes(8 * size))
+        self.cols = {f: array.array("d", bytes(8 * size)) for f in self.FIELDS}
+
+    def push(self, ts, sample):
+        i = self.head
+        self.t[i] = ts
+        for f, col in self.cols.items():
+            col[i] = sample.get(f, math.nan)
+        self.head, self.count = (i + 1) % self.size, min(self.count + 1, self.size)
+
+    def last_ts(self):
+        return self.t[(self.head - 1) % self.size] if self.count else 0.0
+
+    def window(self, seconds):
+        """Samples newer than now-seconds, oldest first; missing values as None."""
+        since, t, rows = time.time() - seconds, [], []
+        for k in range(self.count):
+            i = (self.head - self.count + k) % self.size
+            if self.t[i] >= since:
+                rows.append(i)
+                t.append(round(self.t[i], 1))
+        out = {"t": t}
+        for f, col in self.cols.items():
+            out[f] = [None if math.isnan(col[i]) else round(col[i], 1) for i in rows]
+        return out
+
+class DcgmCollector:
+    """Scrapes every exporter each DCGM_INTERVAL on its own thread. Requests read
+    `latest` without touching the network; history lives in per-GPU rings."""
+    def __init__(self, interval=DCGM_INTERVAL):
+        self.interval = interval
+        self.latest, self.ts = {}, 0.0
+        self.rings, self.lock = {}, threading.Lock()
+        self.ready, self._started = threading.Event(), False
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def collect(self):
+        with TIMINGS.root("dcgm pass"):
+            tel, now = scrape_all(), time.time()
+        with self.lock:
+            changed = tel != self.latest
+            self.latest, self.ts = tel, now
+            for node, gpus in tel.items():
+                for g in gpus:
+                    if g.get("stale"): continue               # don't record replayed values
+                    ring = self.rings.get((node, g["idx"]))
+                    if ring is None:
+                        ring = self.rings[(node, g["idx"])] = GpuRing()
+                    ring.push(now, g)
+            horizon = now - self.interval * DCGM_HISTORY
+            for key in [k for k, r in self.rings.items() if r.last_ts() < horizon]:
+                del self.rings[key]                      # GPU gone longer than the window
+        self.ready.set()
+        if changed:
+            SNAPSHOTS.invalidate(soft=True)
+
+    def _run(self):
+        while True:
+            t = time.monotonic()
+            try:
+                self.collect()
+            except Exception:
+                pass
+            self._wake.wait(max(0.2, self.interval - (time.monotonic() - t)))
+            self._wake.clear()
+
+    def start(self):
+        with self.lock:
+            if self._started: return
+            self._started = True
+        threading.Thread(target=self._run, daemon=True, name="dcgm-collector").start()
+
+    def history(self, node, idx, seconds):
+        with self.lock:
+            ring = self.rings.get((node, str(idx)))
+            return ring.window(seconds) if ring else None
+
+COLLECTOR = DcgmCollector()
+
+def telemetry():
+    """Latest collector sample, node -> [per-GPU dicts]. Only the very first call
+    after start waits (briefly) for the first pass."""
+    COLLECTOR.start()
+    COLLECTOR.ready.wait(timeout=4)
+    return {n: [dict(g) for g in gpus] for n, gpus in COLLECTOR.latest.items()}
+
+_GPU_HISTORY = re.compile(r"/api/gpu/([^/]+)/(\d+)/history")
+
+def _parse_window(v, default=900):
+    """'600', '90s', '15m', '2h' -> seconds (capped to the ring length)."""
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", (v or "").strip())
+    secs = float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[m.group(2)] if m else default
+    return min(secs, DCGM_INTERVAL * DCGM_HISTORY)
 
 # ----------------------------------------------------------------- demo state
 FAKE = {
@@ -125,9 +1535,9 @@ FAKE = {
      "strategy":"RollingUpdate","node":"infer-box"},
     {"ns":"ml","name":"yolo-train-e2","kind":"Job","replicas":1,"ready":1,"gpus":1},
   ],
-  "pods_by_node": {"trx40-beast":[{"ns":"default","name":"llama-nexus-0","gpus":2},
-                                  {"ns":"ml","name":"yolo-train-e2-x","gpus":1}],
-                   "infer-box":[{"ns":"default","name":"vtuber-tts-0","gpus":1}]},
+  "pods_by_node": {"trx40-beast":[{"ns":"default","name":"llama-nexus-0","gpus":2,"ckpt":False},
+                                  {"ns":"ml","name":"yolo-train-e2-x","gpus":1,"ckpt":True}],
+                   "infer-box":[{"ns":"default","name":"vtuber-tts-0","gpus":1,"ckpt":False}]},
   "gpu_procs": {
     "trx40-beast": {"0": [{"kind": "pod", "ns": "default", "name": "llama-nexus-0"}],
                     "1": [{"kind": "pod", "ns": "default", "name": "llama-nexus-0"}],
@@ -149,7 +1559,125 @@ def demo_telemetry():
             v["temp"] = max(40.0, min(86.0, v["temp"] + random.randint(-2, 2)))
             v["power"] = max(60.0, min(420.0, v["power"] + random.randint(-20, 20)))
             v["vram_free"] = vram - v["vram_used"]
-    return _DEMO_T
+    return {n: [dict(v) for v in g] for n, g in _DEMO_T.items()}
+
+# ----------------------------------------------------------------- records
+_jstr = json.encoder.encode_basestring_ascii
+_jdump = json.JSONEncoder(separators=(",", ":")).encode
+
+def _jval(v):
+    t = type(v)
+    if t is str: return _jstr(v)
+    if t is bool: return "true" if v else "false"
+    if t is int: return int.__repr__(v)
+    if v is None: return "null"
+    if t is float: return float.__repr__(v) if math.isfinite(v) else _jdump(v)
+    return encode_json(v)
+
+def encode_json(o):
+    """json.dumps() for payloads that hold Records: each record contributes its
+    cached fragment, plain containers without records go through the C encoder."""
+    if isinstance(o, Record):
+        return o.json()
+    t = type(o)
+    if t is dict:
+        return "{" + ",".join(_jstr(k if type(k) is str else str(k)) + ":" + encode_json(v)
+                              for k, v in o.items()) + "}"
+    if (t is list or t is tuple) and o and any(isinstance(x, Record) for x in o):
+        return "[" + ",".join(encode_json(x) for x in o) + "]"
+    return _jdump(o)
+
+class Record:
+    """Slotted row with dict-style access (get / [] / items / ==) so code written
+    against the old row dicts keeps working. The JSON fragment is built straight
+    from the slots on first use and cached until a field is assigned, as an
+    attribute or an item. Nested values (storage, placement, processes) are
+    part of that fragment: replace them, never mutate them in place."""
+    __slots__ = ("_json",)
+    FIELDS = ()
+
+    def __init_subclass__(cls):
+        cls._KEYS = tuple(_jstr(f) + ":" for f in cls.FIELDS)
+        cls._FIELDSET = frozenset(cls.FIELDS)
+
+    def __init__(self, **kw):
+        self._json = None
+        for f in self.FIELDS:
+            setattr(self, f, kw.get(f))
+
+    def get(self, k, default=None):
+        return getattr(self, k) if k in self._FIELDSET else default
+
+    def __getitem__(self, k):
+        if k not in self._FIELDSET: raise KeyError(k)
+        return getattr(self, k)
+
+    def __setattr__(self, k, v):
+        object.__setattr__(self, k, v)
+        if k != "_json":
+            object.__setattr__(self, "_json", None)
+
+    def __setitem__(self, k, v):
+        if k not in self._FIELDSET:
+            raise KeyError(k)
+        setattr(self, k, v)
+
+    def __contains__(self, k): return k in self._FIELDSET
+    def __iter__(self): return iter(self.FIELDS)
+    def __len__(self): return len(self.FIELDS)
+    def keys(self): return self.FIELDS
+    def values(self): return [getattr(self, f) for f in self.FIELDS]
+    def items(self): return zip(self.FIELDS, self.values())
+    def to_dict(self): return dict(self.items())
+    __hash__ = None
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self.values() == other.values()
+        return isinstance(other, dict) and self.to_dict() == other
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def json(self):
+        if self._json is None:
+            self._json = "{" + ",".join(k + _jval(getattr(self, f))
+                                        for k, f in zip(self._KEYS, self.FIELDS)) + "}"
+        return self._json
+
+class NodeRow(Record):
+    FIELDS = ("name", "internal_ip", "ready", "offline", "offline_reason", "control",
+              "unschedulable", "cpu", "ram", "gpu_product", "gpus", "gpu_allocatable", "vram",
+              "cc", "tier", "cpu_tier", "gpu_used", "driver_pending", "gpu_registering",
+              "gpu_status_msg", "storage")
+    __slots__ = FIELDS
+
+class GpuCard(Record):
+    FIELDS = ("id", "node", "node_ready", "idx", "product", "tier", "vram_gb", "cc", "uuid",
+              "allocated", "util", "temp", "power", "mem_util", "vram_used", "vram_total",
+              "sm_clock", "mem_clock", "processes", "cordoned", "stale")
+    __slots__ = FIELDS
+
+class WorkloadRow(Record):
+    FIELDS = ("ns", "name", "kind", "replicas", "ready", "gpus", "cpu_tier_mode", "cpu_req",
+              "cpu_lim", "mem_req", "mem_lim", "strategy", "node", "placement")
+    __slots__ = FIELDS
+
+_LIVE_RECORDS, _LIVE_LOCK = {}, threading.Lock()
+def reuse_records(kind, rows, key):
+    """Swap each freshly built record for last snapshot's when equal, so unchanged
+    rows keep their object and cached JSON; only the current set is retained."""
+    with _LIVE_LOCK:
+        prev, keep, out = _LIVE_RECORDS.get(kind, {}), {}, []
+        for r in rows:
+            k = key(r)
+            old = prev.get(k)
+            if old is not None and old == r:
+                r = old
+            keep[k] = r
+            out.append(r)
+        _LIVE_RECORDS[kind] = keep
+    return out
 
 # ----------------------------------------------------------------- data shaping
 def gpu_req(pod):
@@ -243,46 +1771,36 @@ def _strip_cpu_tier_affinity(aff):
         aff.pop("nodeAffinity", None)
     return aff or None
 
-def _deployment_pod_nodes(deps_raw, pods_raw):
-    rs_map = {}
-    try:
-        for rs in k8s("GET", "/apis/apps/v1/replicasets")["items"]:
-            for o in rs.get("metadata", {}).get("ownerReferences", []):
-                if o.get("kind") == "Deployment":
-                    rs_map[rs["metadata"]["uid"]] = (
-                        rs["metadata"]["namespace"], o["name"])
-    except Exception:
-        pass
-    out = {}
-    for p in pods_raw:
-        node = p["spec"].get("nodeName")
-        if not node:
-            continue
-        ns = p["metadata"]["namespace"]
-        for o in p["metadata"].get("ownerReferences", []):
-            if o.get("kind") == "ReplicaSet" and o.get("uid") in rs_map:
-                d_ns, d_name = rs_map[o["uid"]]
-                if d_ns == ns:
-                    out[(d_ns, d_name)] = node
-    return out
+def _job_active(j):
+    st = j.get("status", {})
+    return bool(st.get("active")) or not (st.get("completionTime") or st.get("failed"))
 
-def _workload_row(d, pod_nodes):
+def _workload_row(d, owners, kind="Deployment"):
     ns, name = d["metadata"]["namespace"], d["metadata"]["name"]
     ps = d["spec"]["template"]["spec"]
     containers = ps.get("containers") or [{}]
     c0 = containers[0]
     res = c0.get("resources") or {}
     req, lim = res.get("requests") or {}, res.get("limits") or {}
-    return {"ns": ns, "name": name, "kind": "Deployment",
-            "replicas": d["spec"].get("replicas", 0),
-            "ready": d["status"].get("readyReplicas", 0) or 0,
-            "gpus": sum(int(c.get("resources", {}).get("limits", {}).get("nvidia.com/gpu", "0") or 0)
-                        for c in containers),
-            "cpu_tier_mode": cpu_tier_mode_from_spec(ps),
-            "cpu_req": req.get("cpu", ""), "cpu_lim": lim.get("cpu", ""),
-            "mem_req": req.get("memory", ""), "mem_lim": lim.get("memory", ""),
-            "strategy": d["spec"].get("strategy", {}).get("type", "RollingUpdate"),
-            "node": pod_nodes.get((ns, name), "")}
+    st = d.get("status", {})
+    if kind == "Job":
+        replicas = d["spec"].get("parallelism", 1)
+        ready, strategy = st.get("ready", st.get("active", 0)) or 0, "-"
+    else:
+        replicas, ready = d["spec"].get("replicas", 0), st.get("readyReplicas", 0) or 0
+        strategy = (d["spec"].get("strategy", {}).get("type", "RollingUpdate") if kind == "Deployment"
+                    else d["spec"].get("updateStrategy", {}).get("type", "RollingUpdate"))
+    placement = owners.placement((kind, ns, name))
+    return WorkloadRow(
+        ns=ns, name=name, kind=kind, replicas=replicas, ready=ready,
+        gpus=sum(int(c.get("resources", {}).get("limits", {}).get("nvidia.com/gpu", "0") or 0)
+                 for c in containers),
+        cpu_tier_mode=cpu_tier_mode_from_spec(ps),
+        cpu_req=req.get("cpu", ""), cpu_lim=lim.get("cpu", ""),
+        mem_req=req.get("memory", ""), mem_lim=lim.get("memory", ""),
+        strategy=strategy,
+        node=placement[0]["node"] if placement else "",
+        placement=placement)
 
 def _node_vram_gb(lab):
     vram = lab.get("gpu.homelab/vram-gb")
@@ -443,30 +1961,31 @@ def flatten_gpus(nodes, tel, pods_by_node, gpu_procs=None):
                     pass
             product = _short_gpu_name(g.get("model")) if g.get("model") else n.get("gpu_product", "-")
             vram_gb = str(round(vram_total / 1024)) if vram_total else n.get("vram", "-")
-            cards.append({
-                "id": f"{n['name']}:{idx}",
-                "node": n["name"],
-                "node_ready": n["ready"],
-                "idx": idx,
-                "product": product,
-                "tier": n.get("tier", "-"),
-                "vram_gb": vram_gb,
-                "cc": n.get("cc", "-"),
-                "uuid": g.get("uuid", ""),
-                "allocated": bool(procs) or i < int(n.get("gpu_used", 0) or 0),
-                "util": float(g.get("util") or 0),
-                "temp": float(g.get("temp") or 0),
-                "power": float(g.get("power") or 0),
-                "mem_util": float(g.get("mem_util") or 0),
-                "vram_used": vram_used,
-                "vram_total": vram_total,
-                "sm_clock": float(g.get("sm_clock") or 0),
-                "mem_clock": float(g.get("mem_clock") or 0),
-                "processes": procs,
-                "cordoned": bool(n.get("unschedulable")),
-            })
-    cards.sort(key=lambda c: (-c["util"], c["node"], int(c["idx"])))
-    return cards
+            cards.append(GpuCard(
+                id=f"{n['name']}:{idx}",
+                node=n["name"],
+                node_ready=n["ready"],
+                idx=idx,
+                product=product,
+                tier=n.get("tier", "-"),
+                vram_gb=vram_gb,
+                cc=n.get("cc", "-"),
+                uuid=g.get("uuid", ""),
+                allocated=bool(procs) or i < int(n.get("gpu_used", 0) or 0),
+                util=float(g.get("util") or 0),
+                temp=float(g.get("temp") or 0),
+                power=float(g.get("power") or 0),
+                mem_util=float(g.get("mem_util") or 0),
+                vram_used=vram_used,
+                vram_total=vram_total,
+                sm_clock=float(g.get("sm_clock") or 0),
+                mem_clock=float(g.get("mem_clock") or 0),
+                processes=procs,
+                cordoned=bool(n.get("unschedulable")),
+                stale=bool(g.get("stale")),
+            ))
+    cards.sort(key=lambda c: (-c.util, c.node, int(c.idx)))
+    return reuse_records("gpu", cards, lambda c: c.id)
 
 def _storage_bytes(raw):
     if not raw or raw == "?":
@@ -508,17 +2027,30 @@ def longhorn_by_node():
                                   "total_gib": 400.0, "avail_gib": 280.0,
                                   "scheduled_gib": 45.0, "pct": 30}]},
         }
-    out = {}
-    items = None
+    return _longhorn_nodes()
+
+@cached("longhorn_version")
+def _longhorn_version():
+    """Served Longhorn CRD version, or None when Longhorn isn't installed."""
     for ver in ("v1beta2", "v1beta1"):
         try:
-            items = k8s("GET",
-                        f"/apis/longhorn.io/{ver}/namespaces/longhorn-system/nodes")["items"]
-            break
-        except Exception:
-            items = None
-    if not items:
+            k8s("GET", f"/apis/longhorn.io/{ver}")
+            return ver
+        except urllib.error.HTTPError as e:
+            if e.code != 404: raise
+    return None
+
+@cached("longhorn")
+def _longhorn_nodes():
+    out = {}
+    ver = _longhorn_version()
+    if not ver:
         return out
+    try:
+        items = k8s("GET", f"/apis/longhorn.io/{ver}/namespaces/longhorn-system/nodes")["items"]
+    except urllib.error.HTTPError as e:
+        if e.code == 404: CACHED["longhorn_version"].invalidate()
+        raise
     for item in items:
         name = item["metadata"]["name"]
         total_b = avail_b = sched_b = 0
@@ -713,29 +2245,99 @@ def cluster_summary(nodes, gpus, workloads, drains, telemetry):
         "cpu_tiers": cpu_tiers,
     }
 
+# ----------------------------------------------------------------- source fan-out
+SOURCE_DEADLINE = float(os.environ.get("COCKPIT_SOURCE_DEADLINE", "6"))
+_SOURCE_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="source")
+_INFLIGHT, _INFLOCK = {}, threading.Lock()          # source name -> (future, [start time])
+
+def _source_call(name, fn):
+    """At most one call per source in flight: a build that finds the previous
+    one still running waits on it rather than queueing another, so a hung
+    source holds one worker, never the pool."""
+    with _INFLOCK:
+        cur = _INFLIGHT.get(name)
+        if cur and not cur[0].done():
+            return cur
+        started = [None]
+        def run():
+            started[0] = time.monotonic()
+            with TIMINGS.span(f"source {name}"): return fn()
+        _INFLIGHT[name] = cur = (_SOURCE_POOL.submit(TIMINGS.bind(run)), started)
+        return cur
+
+def gather_sources(sources, deadline=SOURCE_DEADLINE):
+    """Run independent fetches concurrently. `sources` maps name -> (fn, fallback)
+    or (fn, fallback, deadline_s). Returns (results, report): a source that raises
+    or misses its deadline yields its fallback and is reported instead of failing
+    the caller. A deadline runs from when the call started (an earlier build's
+    call, if that one is still going); late calls keep running and are simply
+    not waited for. Per-source times go to TIMINGS ("source <name>"), not into
+    the report, which is part of every overview."""
+    futs = {name: (_source_call(name, spec[0]), spec) for name, spec in sources.items()}
+    results, report = {}, {}
+    for name, ((f, started), spec) in futs.items():
+        limit = spec[2] if len(spec) > 2 else deadline
+        try:
+            results[name] = f.result(timeout=max(0.0, (started[0] or time.monotonic()) + limit
+                                                  - time.monotonic()))
+            report[name] = {"ok": True}
+        except FutureTimeout:
+            results[name] = spec[1]
+            report[name] = {"ok": False, "late": True, "error": f"no answer within {limit:g}s"}
+        except Exception as e:
+            results[name] = spec[1]
+            report[name] = {"ok": False, "error": str(e)[:200]}
+    return results, report
+
+def _source_issues(report):
+    out = []
+    for name, r in report.items():
+        if not r["ok"]:
+            out.append({"level": "warn", "msg": f"{name} data unavailable ({r['error']})"})
+        elif r.get("error"):
+            out.append({"level": "warn", "msg": f"{name} never loaded: {r['error']}" if not r.get("loaded")
+                        else f"{name} refresh failing — showing data from "
+                             f"{time.strftime('%H:%M:%S', time.localtime(r['loaded']))}"})
+    return out
+
 def overview():
     if DEMO:
-        tel = demo_telemetry()
+        tel = telemetry()
         lh = longhorn_by_node()
         for n in FAKE["nodes"]:
             n["storage"] = _node_storage(n["name"], {"capacity": {"ephemeral-storage": "500Gi"}},
                                          lh)
         gpus = flatten_gpus(FAKE["nodes"], tel, FAKE["pods_by_node"], FAKE.get("gpu_procs"))
         drains = drain_snapshot()
-        return {**FAKE, "telemetry": tel, "gpus": gpus, "drains": drains,
+        return {**FAKE, "telemetry": tel, "gpus": gpus, "drains": drains, "maintenance": maint_snapshot(),
                 "cluster": cluster_summary(FAKE["nodes"], gpus, FAKE["workloads"], drains, tel),
                 "demo": True}
-    nodes_raw = k8s("GET", "/api/v1/nodes")["items"]
-    pods_raw  = k8s("GET", "/api/v1/pods?fieldSelector=status.phase=Running")["items"]
-    deps_raw  = k8s("GET", "/apis/apps/v1/deployments")["items"]
+    got, sources = gather_sources({
+        "nodes":       (lambda: _cached_items("nodes", "/api/v1/nodes"), None),
+        "pods":        (lambda: _cached_items("pods", "/api/v1/pods?fieldSelector=status.phase=Running"), []),
+        "deployments": (lambda: _cached_items("deployments", "/apis/apps/v1/deployments"), []),
+        "statefulsets": (lambda: _cached_items("statefulsets", "/apis/apps/v1/statefulsets"), []),
+        "jobs":        (lambda: _cached_items("jobs", "/apis/batch/v1/jobs"), []),
+        **({} if OWNERS.live() else {"replicasets": (
+            lambda: _cached_items("replicasets", "/apis/apps/v1/replicasets"), [])}),
+        "longhorn":    (longhorn_by_node, {}),
+        "telemetry":   (telemetry, {}),
+        "driver":      (_driver_cfg, {}),
+    })
+    if got["nodes"] is None:        # nothing useful to draw without the node list
+        raise RuntimeError(f"node list unavailable: {sources['nodes']['error']}")
+    nodes_raw = got["nodes"]
+    pods_raw  = [p for p in got["pods"] if p.get("status", {}).get("phase") == "Running"]
+    deps_raw  = got["deployments"]
     used, pods_by_node = {}, {}
     for p in pods_raw:
         node, g = p["spec"].get("nodeName", ""), gpu_req(p)
         if g and node:
             used[node] = used.get(node, 0) + g
             pods_by_node.setdefault(node, []).append(
-                {"ns": p["metadata"]["namespace"], "name": p["metadata"]["name"], "gpus": g})
-    lh_map = longhorn_by_node()
+                {"ns": p["metadata"]["namespace"], "name": p["metadata"]["name"], "gpus": g,
+                 "ckpt": CKPT + "signal" in p["metadata"].get("annotations", {})})
+    lh_map = got["longhorn"]
     nodes = []
     for n in nodes_raw:
         lab, st = n["metadata"].get("labels", {}), n["status"]
@@ -747,107 +2349,555 @@ def overview():
         gpus = _node_gpu_count(st, lab)
         gpu_alloc = int(st.get("allocatable", {}).get("nvidia.com/gpu", "0") or 0)
         gpu_reg, gpu_status_msg = _node_gpu_registering(st, lab, driver_pending, ready)
-        nodes.append({
-            "name": name,
-            "internal_ip": _node_internal_ip(st),
-            "ready": ready,
-            "offline": offline,
-            "offline_reason": offline_reason,
-            "control": lab.get("node-role.homelab/control-plane") == "true"
-                       or "node-role.kubernetes.io/control-plane" in lab,
-            "unschedulable": bool(n["spec"].get("unschedulable", False)),
-            "cpu": st.get("allocatable", {}).get("cpu", "?"),
-            "ram": str(round(int(str(st.get("allocatable", {}).get("memory", "0Ki"))[:-2] or 0) / 1048576)),
-            "gpu_product": _node_gpu_product(lab),
-            "gpus": gpus,
-            "gpu_allocatable": gpu_alloc,
-            "vram": _node_vram_gb(lab),
-            "cc": _node_compute_cap(lab),
-            "tier": lab.get("gpu.homelab/tier", "-"),
-            "cpu_tier": lab.get("homelab/cpu-tier", "-"),
-            "gpu_used": used.get(name, 0),
-            "driver_pending": driver_pending,
-            "gpu_registering": gpu_reg,
-            "gpu_status_msg": gpu_status_msg,
-            "storage": _node_storage(name, st, lh_map)})
-    wl = [_workload_row(d, _deployment_pod_nodes(deps_raw, pods_raw))
-          for d in deps_raw if d["metadata"]["namespace"] not in SYS_NS]
-    tel = telemetry()
+        nodes.append(NodeRow(
+            name=name,
+            internal_ip=_node_internal_ip(st),
+            ready=ready,
+            offline=offline,
+            offline_reason=offline_reason,
+            control=lab.get("node-role.homelab/control-plane") == "true"
+                    or "node-role.kubernetes.io/control-plane" in lab,
+            unschedulable=bool(n["spec"].get("unschedulable", False)),
+            cpu=st.get("allocatable", {}).get("cpu", "?"),
+            ram=str(round(int(str(st.get("allocatable", {}).get("memory", "0Ki"))[:-2] or 0) / 1048576)),
+            gpu_product=_node_gpu_product(lab),
+            gpus=gpus,
+            gpu_allocatable=gpu_alloc,
+            vram=_node_vram_gb(lab),
+            cc=_node_compute_cap(lab),
+            tier=lab.get("gpu.homelab/tier", "-"),
+            cpu_tier=lab.get("homelab/cpu-tier", "-"),
+            gpu_used=used.get(name, 0),
+            driver_pending=driver_pending,
+            gpu_registering=gpu_reg,
+            gpu_status_msg=gpu_status_msg,
+            storage=_node_storage(name, st, lh_map)))
+    owners = OWNERS if OWNERS.live() else OwnerIndex.build(pods_raw, got["replicasets"])
+    wl = [_workload_row(d, owners, kind)
+          for kind, objs in (("Deployment", deps_raw), ("StatefulSet", got["statefulsets"]),
+                             ("Job", [j for j in got["jobs"] if _job_active(j)]))
+          for d in objs if d["metadata"]["namespace"] not in SYS_NS]
+    tel = got["telemetry"]
     _enrich_node_products(nodes, tel)
-    gpus = flatten_gpus(nodes, tel, pods_by_node)
+    nodes = reuse_records("node", nodes, lambda n: n.name)
+    wl = reuse_records("workload", wl, lambda w: (w.kind, w.ns, w.name))
+    with TIMINGS.span("flatten_gpus"):
+        gpus = flatten_gpus(nodes, tel, pods_by_node)
     drains = drain_snapshot()
+    with TIMINGS.span("cluster_summary"):
+        cluster = cluster_summary(nodes, gpus, wl, drains, tel)
+    for name, key in (("longhorn", "longhorn"), ("driver", "join_secret")):
+        sources[name].update(CACHED[key].status())
+    down = [{"level": "warn", "msg": f"DCGM exporter on {n} failing ({e.fails}×) — "
+                                      f"{'values are stale' if e.good else 'no telemetry'}"}
+            for n, e in exporters() if e.fails]
+    cluster["issues"] = (_source_issues(sources) + down + cluster["issues"])[:8]
     return {"nodes": nodes, "workloads": wl, "pods_by_node": pods_by_node,
-            "telemetry": tel, "gpus": gpus, "drains": drains,
-            "cluster": cluster_summary(nodes, gpus, wl, drains, tel),
-            "driver": _driver_cfg()}
+            "telemetry": tel, "gpus": gpus, "drains": drains, "maintenance": maint_snapshot(),
+            "cluster": cluster, "driver": got["driver"], "sources": sources,
+            "exporters": exporter_status()}
 
 # ----------------------------------------------------------------- drain manager
 DRAINS, _DLOCK = {}, threading.Lock()
 def drain_snapshot():
     with _DLOCK:
-        return {k: dict(v) for k, v in DRAINS.items()}
+        return {k: {**v, "pods": {n: dict(p) for n, p in v["pods"].items()}} if v.get("pods") else dict(v)
+                for k, v in DRAINS.items()}
 
 def _drain_demo(node):
-    st = DRAINS[node]
-    st.update(total=max(2, len(FAKE["pods_by_node"].get(node, [])) + 1), phase="evicting")
+    st, t0 = DRAINS[node], time.monotonic()
+    names = [f"{p['ns']}/{p['name']}" for p in FAKE["pods_by_node"].get(node, [])]
+    names += [f"default/{node}-helper-{i}" for i in range(max(2, len(names) + 1) - len(names))]
+    ckpt = {f"{p['ns']}/{p['name']}" for p in FAKE["pods_by_node"].get(node, []) if p.get("ckpt")}
+    st.update(total=len(names), phase="evicting", empty_s=None,
+              pods={k: {"state": "terminating", "tries": 1, "msg": "", "gone_s": None} for k in names})
+    for k in ckpt:
+        st["pods"][k].update(state="checkpointing", msg="waiting for checkpoint", ckpt="")
     for n in FAKE["nodes"]:
         if n["name"] == node: n["unschedulable"] = True
-    for i in range(st["total"]):
+    for k in sorted(names, key=lambda k: k in ckpt):          # checkpointing pods go last
+        if k in ckpt:
+            st["pods"][k].update(state="terminating", msg="",
+                                 ckpt=f"done in {round(time.monotonic() - t0, 1)}s")
         time.sleep(1.6); st["evicted"] += 1
+        st["pods"][k].update(state="gone", gone_s=round(time.monotonic() - t0, 1))
     FAKE["pods_by_node"].pop(node, None)
     for n in FAKE["nodes"]:
         if n["name"] == node: n["gpu_used"] = 0
-    st["phase"] = "done"
+    st.update(phase="done", empty_s=round(time.monotonic() - t0, 1), msg="")
+
+EVICT_WORKERS = int(os.environ.get("COCKPIT_EVICT_WORKERS", "8"))
+EVICT_BACKOFF_MAX = float(os.environ.get("COCKPIT_EVICT_BACKOFF_MAX", "30"))
+DRAIN_TIMEOUT = float(os.environ.get("COCKPIT_DRAIN_TIMEOUT", "240"))
+_EVICT_POOL = ThreadPoolExecutor(EVICT_WORKERS, thread_name_prefix="evict")   # shared by all drains
+_EVICT_OPEN = ("checkpointing", "pending", "evicting", "blocked", "terminating")
+
+def _drain_targets(pods):
+    """Pods a drain must move: not DaemonSet-owned, not static, not finished."""
+    out = []
+    for p in pods:
+        if any(o.get("kind") == "DaemonSet" for o in p["metadata"].get("ownerReferences", [])): continue
+        if p["metadata"].get("annotations", {}).get("kubernetes.io/config.mirror"): continue
+        if p["status"].get("phase") in ("Succeeded", "Failed"): continue
+        out.append(p)
+    return out
+
+# Opt-in checkpoint protocol, declared on the pod (or its template):
+#   checkpoint.homelab/signal   exec:<shell cmd> | http:<port>/<path> (POSTed) | file:<path> (touched)
+#   checkpoint.homelab/done     file:<path> (exists) | http:<port>/<path> (GET 2xx); default: a
+#                               clean exit/2xx from the signal itself, or <signal path>.done for file:
+#   checkpoint.homelab/timeout  seconds to wait for `done` (COCKPIT_CHECKPOINT_TIMEOUT)
+#   checkpoint.homelab/container  exec target (the first container otherwise)
+CKPT = "checkpoint.homelab/"
+CHECKPOINT_TIMEOUT = float(os.environ.get("COCKPIT_CHECKPOINT_TIMEOUT", "600"))
+CHECKPOINT_POLL = 5
+CHECKPOINT_HTTP_TIMEOUT = 10          # per signal/done request; the poll loop owns the deadline
+
+def _ckpt_spec(raw):
+    kind, _, arg = (raw or "").partition(":")
+    if kind not in ("exec", "http", "file") or not arg.strip():
+        raise ValueError(f"bad checkpoint spec {raw!r}")
+    return kind, arg.strip()
+
+def _ckpt_url(pod, arg):
+    port, _, path = arg.partition("/")
+    ip = pod["status"].get("podIP")
+    if not ip:
+        raise RuntimeError("pod has no IP")
+    return f"http://{ip}:{int(port)}/{path}"
+
+def _ckpt_timeout(pod):
+    try:
+        return float(pod["metadata"].get("annotations", {}).get(CKPT + "timeout") or CHECKPOINT_TIMEOUT)
+    except ValueError:
+        return CHECKPOINT_TIMEOUT
+
+def checkpoint_pod(pod, say):
+    """Ask `pod` to checkpoint and wait for its done marker. say(msg) reports
+    progress and returns False to abandon the wait (the pod went away). Returns
+    seconds taken; raises TimeoutError past the deadline, anything else when the
+    protocol is broken. Under replay nothing is sent: the pods in a trace aren't
+    there to signal."""
+    if REPLAYER:
+        raise RuntimeError("checkpoint hooks are not run in replay")
+    md, t0 = pod["metadata"], time.monotonic()
+    ann, timeout = md.get("annotations", {}), _ckpt_timeout(pod)
+    container = ann.get(CKPT + "container") or pod["spec"]["containers"][0]["name"]
+    sh = lambda cmd, t=30: k8s_exec(md["namespace"], md["name"], ["sh", "-c", cmd], container, t)
+    kind, sig = _ckpt_spec(ann[CKPT + "signal"])
+    done = ann.get(CKPT + "done") or (f"file:{sig}.done" if kind == "file" else "")
+    done = done and _ckpt_spec(done)
+    if done and done[0] == "file":
+        sh(f"rm -f {shlex.quote(done[1])}")                  # a stale marker from the last drain
+    if kind == "exec":
+        rc, out = sh(sig, timeout)
+        if rc: raise RuntimeError(f"signal exited {rc}: {out.strip()[-200:]}")
+    elif kind == "file":
+        rc, out = sh(f"mkdir -p \"$(dirname {shlex.quote(sig)})\" && touch {shlex.quote(sig)}")
+        if rc: raise RuntimeError(f"could not create {sig}: {out.strip()[-200:]}")
+    else:
+        req = urllib.request.Request(_ckpt_url(pod, sig), data=b"", method="POST")
+        try:
+            urllib.request.urlopen(req, timeout=CHECKPOINT_HTTP_TIMEOUT).close()
+        except TimeoutError:
+            if not done:                                  # the answer was the only "done" there is
+                raise RuntimeError(f"signal not answered within {CHECKPOINT_HTTP_TIMEOUT}s")
+            # delivered and busy checkpointing: the done marker says when it's over
+    while done:
+        if done[0] == "file":
+            ok = sh(f"test -e {shlex.quote(done[1])}")[0] == 0
+        else:
+            try:
+                urllib.request.urlopen(_ckpt_url(pod, done[1]), timeout=CHECKPOINT_HTTP_TIMEOUT).close()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+        took = time.monotonic() - t0
+        if ok: break
+        if took > timeout: raise TimeoutError(f"no checkpoint after {timeout:g}s")
+        if not say(f"waiting for checkpoint ({took:.0f}s/{timeout:g}s)"): break
+        time.sleep(CHECKPOINT_POLL)
+    return round(time.monotonic() - t0, 1)
+
+class Eviction:
+    """Empties one node. Evictions go out concurrently on the shared pool; a pod
+    the API refuses (429 from a PDB, 5xx, connection errors) retries on its own
+    jittered exponential schedule; and a pod only counts once a watch on the
+    node's pods sees it deleted — an accepted eviction just means terminating.
+    Pods that declare checkpoint.homelab/signal are checkpointed first, each on
+    its own thread, and evicted once done (or once their deadline passes).
+    Per-pod state and time-to-empty are kept in `st` (a DRAINS or job entry)."""
+    def __init__(self, node, st, timeout=DRAIN_TIMEOUT):
+        self.node, self.st, self.timeout = node, st, timeout
+        self.pods, self._next, self._cond = {}, {}, threading.Condition()
+        self._done, self.t0 = threading.Event(), time.monotonic()
+        self._shown = None
+
+    def run(self):
+        """Cordon, evict, wait for the node to empty. Returns pods still there —
+        the ones not yet gone at the deadline and any whose eviction was refused."""
+        t0 = self.t0 = time.monotonic()
+        k8s("PATCH", f"/api/v1/nodes/{self.node}", {"spec": {"unschedulable": True}},
+            "application/strategic-merge-patch+json")
+        path = f"/api/v1/pods?fieldSelector=spec.nodeName={self.node}"
+        body = k8s("GET", path)
+        targets = _drain_targets(body["items"])
+        ckpt = [p for p in targets if CKPT + "signal" in p["metadata"].get("annotations", {})]
+        for p in targets:
+            self.pods[_obj_key(p)] = {"state": "pending", "tries": 0, "msg": "", "gone_s": None}
+            self._next[_obj_key(p)] = 0.0
+        for p in ckpt:
+            self.pods[_obj_key(p)].update(state="checkpointing", msg="checkpoint requested", ckpt="")
+        self.st.update(total=len(self.pods), evicted=0, failed=0, pods=self.pods, empty_s=None)
+        threading.Thread(target=self._watch, args=(path, body.get("metadata", {}).get("resourceVersion", "")),
+                         name=f"drain-watch-{self.node}", daemon=True).start()
+        for p in ckpt:
+            threading.Thread(target=self._checkpoint, args=(_obj_key(p), p),
+                             name=f"checkpoint-{p['metadata']['name']}", daemon=True).start()
+        deadline = t0 + self.timeout + max((_ckpt_timeout(p) for p in ckpt), default=0)
+        try:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    for key, p in self.pods.items():
+                        if p["state"] in ("pending", "blocked") and self._next[key] <= now:
+                            p["state"] = "evicting"
+                            _EVICT_POOL.submit(self._evict, key)
+                    self._progress(t0)
+                    left = [k for k, p in self.pods.items() if p["state"] in _EVICT_OPEN]
+                    if not left or now >= deadline:
+                        return [k for k, p in self.pods.items() if p["state"] != "gone"]
+                    due = [self._next[k] for k in left if self.pods[k]["state"] in ("pending", "blocked")]
+                    self._cond.wait(max(0.05, min(due + [deadline]) - now))
+        finally:
+            self._done.set()
+
+    def _progress(self, t0):
+        n = collections.Counter(p["state"] for p in self.pods.values())
+        self.st.update(evicted=n["gone"], failed=n["failed"])
+        if n["gone"] == len(self.pods):
+            if self.st.get("empty_s") is None:
+                self.st["empty_s"] = round(time.monotonic() - t0, 1)
+            saved = sum(1 for p in self.pods.values() if p.get("ckpt", "").startswith("done"))
+            self.st["msg"] = f"node empty in {self.st['empty_s']}s" + (f", {saved} checkpointed" if saved else "")
+        elif n["gone"] + n["failed"] == len(self.pods):
+            why = next(f"{k}: {p['msg']}" for k, p in self.pods.items() if p["state"] == "failed")
+            self.st["msg"] = f"{n['failed']} pod(s) could not be evicted ({why})"
+        else:
+            self.st["msg"] = ", ".join(f"{n[s]} {s}" for s in ("checkpointing", "evicting", "terminating", "blocked",
+                                                               "failed") if n[s]) or "evicting…"
+        if self._shown != (n["gone"], n["failed"], self.st["msg"]):
+            self._shown = (n["gone"], n["failed"], self.st["msg"])
+            SNAPSHOTS.invalidate(soft=True)                  # the overview shows drain progress
+
+    def _evict(self, key):
+        ns, name = key.split("/", 1)
+        try:
+            k8s("POST", f"/api/v1/namespaces/{ns}/pods/{name}/eviction",
+                {"apiVersion": "policy/v1", "kind": "Eviction", "metadata": {"name": name, "namespace": ns}})
+            state, msg = "terminating", ""
+        except urllib.error.HTTPError as e:
+            if e.code == 404: state, msg = "gone", ""
+            elif e.code == 429: state, msg = "blocked", "disruption budget"
+            elif e.code >= 500: state, msg = "blocked", f"HTTP {e.code}"
+            else: state, msg = "failed", f"HTTP {e.code} {e.reason}"
+        except Exception as e:
+            state, msg = "blocked", str(e)
+        with self._cond:
+            p = self.pods[key]
+            if p["state"] != "evicting":
+                return                                         # the watch saw it go meanwhile
+            p["tries"] += 1
+            if state == "blocked":
+                delay = min(EVICT_BACKOFF_MAX, 2 ** (p["tries"] - 1)) * random.uniform(.5, 1.5)
+                self._next[key] = time.monotonic() + delay
+                msg = f"{msg}; retry in {delay:.1f}s"
+            p.update(state=state, msg=msg)
+            if state == "gone":
+                p["gone_s"] = round(time.monotonic() - self.t0, 1)
+            self._cond.notify_all()
+
+    def _checkpoint(self, key, pod):
+        def say(msg):
+            with self._cond:
+                p = self.pods[key]
+                if p["state"] == "checkpointing": p["msg"] = msg
+                return p["state"] == "checkpointing"
+        try:
+            ckpt = f"done in {checkpoint_pod(pod, say)}s"
+        except TimeoutError as e:
+            ckpt = f"timed out: {e}"
+        except Exception as e:
+            ckpt = f"failed: {e}"
+        with self._cond:
+            p = self.pods[key]
+            if p["state"] != "checkpointing":
+                return                                         # gone while we waited
+            p.update(state="pending", msg="", ckpt=ckpt)
+            self._next[key] = 0.0
+            self._cond.notify_all()
+
+    def _gone(self, key):
+        with self._cond:
+            p = self.pods.get(key)
+            if p and p["state"] in _EVICT_OPEN:
+                p.update(state="gone", msg="", gone_s=round(time.monotonic() - self.t0, 1))
+                self._cond.notify_all()
+
+    def _watch(self, path, rv):
+        """Pod deletions on the node; relists to reconcile after every watch window."""
+        while not self._done.is_set():
+            try:
+                if not rv:
+                    body = k8s("GET", path)
+                    rv = body.get("metadata", {}).get("resourceVersion", "")
+                    live = {_obj_key(p) for p in _drain_targets(body["items"])}
+                    for key in list(self.pods):
+                        if key not in live: self._gone(key)
+                q = f"{path}&watch=1&timeoutSeconds=30&resourceVersion={urllib.parse.quote(rv)}"
+                for ev in k8s_watch(q, timeout=60):
+                    obj = ev.get("object") or {}
+                    if ev.get("type") == "ERROR":
+                        break
+                    if ev.get("type") == "DELETED" or obj.get("status", {}).get("phase") in ("Succeeded", "Failed"):
+                        self._gone(_obj_key(obj))
+                    if self._done.is_set():
+                        return
+                rv = ""
+            except Exception:
+                rv = ""
+                self._done.wait(2)
 
 def _drain_real(node):
     st = DRAINS[node]
     try:
-        k8s("PATCH", f"/api/v1/nodes/{node}", {"spec": {"unschedulable": True}},
-            "application/strategic-merge-patch+json")
-        pods = k8s("GET", f"/api/v1/pods?fieldSelector=spec.nodeName={node}")["items"]
-        targets = []
-        for p in pods:
-            if any(o.get("kind") == "DaemonSet" for o in p["metadata"].get("ownerReferences", [])): continue
-            if p["metadata"].get("annotations", {}).get("kubernetes.io/config.mirror"): continue
-            if p["status"].get("phase") in ("Succeeded", "Failed"): continue
-            targets.append((p["metadata"]["namespace"], p["metadata"]["name"]))
-        st.update(total=len(targets), phase="evicting")
-        remaining, deadline = list(targets), time.time() + 240
-        while remaining and time.time() < deadline:
-            still = []
-            for ns, name in remaining:
-                try:
-                    k8s("POST", f"/api/v1/namespaces/{ns}/pods/{name}/eviction",
-                        {"apiVersion": "policy/v1", "kind": "Eviction",
-                         "metadata": {"name": name, "namespace": ns}})
-                    st["evicted"] += 1
-                except urllib.error.HTTPError as e:
-                    if e.code == 429: still.append((ns, name))     # PDB protecting it — retry
-                    elif e.code == 404: st["evicted"] += 1          # already gone
-                    else: st["failed"] += 1
-                except Exception:
-                    st["failed"] += 1
-            remaining = still
-            if remaining:
-                st["msg"] = f"{len(remaining)} pod(s) protected by PDBs — waiting for replicas to move"
-                time.sleep(4)
-        st["phase"] = "done" if not remaining else "timeout"
-        if remaining: st["msg"] = f"{len(remaining)} pod(s) still PDB-blocked after 4m"
+        st["phase"] = "evicting"
+        ev = Eviction(node, st)
+        left = ev.run()
+        stuck = [k for k in left if st["pods"][k]["state"] != "failed"]
+        st["phase"] = "done" if not left else "timeout" if stuck else "error"
+        if stuck:                       # the deadline includes checkpoint time, so say what was waited
+            st["msg"] = (f"{len(left)} pod(s) still on the node after "
+                         f"{time.monotonic() - ev.t0:.0f}s ({st['msg']})")
     except Exception as e:
         st["phase"], st["msg"] = "error", str(e)
 
-def act_drain(b):
-    node = b["node"]
+def _claim_drain(node):
+    """Start a fresh DRAINS entry; False when a drain of `node` is already running."""
     with _DLOCK:
         cur = DRAINS.get(node)
         if cur and cur["phase"] in ("starting", "evicting"):
-            return {"ok": True, "already": True}
+            return False
         DRAINS[node] = {"phase": "starting", "total": 0, "evicted": 0, "failed": 0,
                         "msg": "", "ts": time.time()}
-    threading.Thread(target=_drain_demo if DEMO else _drain_real,
-                     args=(node,), daemon=True).start()
+    return True
+
+def act_drain(b):
+    node = b["node"]
+    if not _claim_drain(node):
+        return {"ok": True, "already": True}
+    JOBS.submit("drain", node, _drain_demo if DEMO else _drain_real, node)
     return {"ok": True}
 
+def _drain_resume(node, st):
+    """Rerun an interrupted drain from the top (eviction is idempotent); a plan's
+    drains are its to restart."""
+    if DEMO or st.get("plan"):
+        return None
+    st.update(phase="starting", msg="")
+    return _drain_real, node
+
+JOBS.register("drain", DRAINS, _DLOCK, PRIO_HIGH, _drain_resume)
+
+# ----------------------------------------------------------------- drain dry run
+def _cpu_milli(raw):
+    s = str(raw or "0").strip()
+    try:
+        return int(float(s[:-1]) if s.endswith("m") else float(s) * 1000)
+    except ValueError:
+        return 0
+
+def _pod_requests(spec):
+    """(cpu millicores, memory bytes, GPUs) the scheduler reserves for a pod: its
+    containers summed, or its largest init container if that is bigger. A
+    container without requests gets its limits, as the API server defaults them."""
+    def one(c):
+        r = c.get("resources") or {}
+        req, lim = r.get("requests") or {}, r.get("limits") or {}
+        return (_cpu_milli(req.get("cpu", lim.get("cpu"))), _storage_bytes(req.get("memory", lim.get("memory"))),
+                int(lim.get("nvidia.com/gpu", req.get("nvidia.com/gpu", 0)) or 0))
+    total = [0, 0, 0]
+    for c in spec.get("containers", []):
+        total = [a + b for a, b in zip(total, one(c))]
+    for c in spec.get("initContainers") or []:
+        total = [max(a, b) for a, b in zip(total, one(c))]
+    return tuple(total)
+
+def _expr_ok(ex, labels):
+    key, op, vals = ex.get("key"), ex.get("operator"), ex.get("values") or []
+    if op == "In": return labels.get(key) in vals
+    if op == "NotIn": return labels.get(key) not in vals
+    if op == "Exists": return key in labels
+    if op == "DoesNotExist": return key not in labels
+    if op in ("Gt", "Lt"):
+        try:
+            a, b = int(labels[key]), int(vals[0])
+        except (KeyError, ValueError, IndexError):
+            return False
+        return a > b if op == "Gt" else a < b
+    return False
+
+def _selector_ok(sel, labels):
+    """metav1.LabelSelector; a missing selector matches nothing, an empty one everything."""
+    if sel is None:
+        return False
+    return (all(labels.get(k) == v for k, v in (sel.get("matchLabels") or {}).items())
+            and all(_expr_ok(ex, labels) for ex in sel.get("matchExpressions") or []))
+
+def _tolerates(tols, taint):
+    for t in tols or []:
+        if t.get("effect") and t["effect"] != taint.get("effect"): continue
+        if t.get("operator") == "Exists" and (not t.get("key") or t["key"] == taint.get("key")): return True
+        if t.get("key") == taint.get("key") and t.get("value", "") == taint.get("value", ""): return True
+    return False
+
+def _node_refuses(spec, node):
+    """Why `node` can't take a pod with `spec` (ignoring capacity), or None."""
+    labels = node["metadata"].get("labels", {})
+    for k, v in (spec.get("nodeSelector") or {}).items():
+        if labels.get(k) != v:
+            return "node selector"
+    na = (spec.get("affinity") or {}).get("nodeAffinity") or {}
+    req = na.get("requiredDuringSchedulingIgnoredDuringExecution")
+    if req and not any(all(_expr_ok(ex, labels) for ex in term.get("matchExpressions") or [])
+                       for term in req.get("nodeSelectorTerms") or []):
+        return "node affinity"
+    for t in node["spec"].get("taints") or []:
+        if t.get("effect") in ("NoSchedule", "NoExecute") and not _tolerates(spec.get("tolerations"), t):
+            return "untolerated taint"
+    return None
+
+def _node_preference(spec, node):
+    """Summed weights of the pod's preferred node-affinity terms `node` satisfies —
+    how the scheduler ranks e.g. the prefer_cheap tiers of cpu_tier_affinity_for_mode."""
+    labels = node["metadata"].get("labels", {})
+    na = (spec.get("affinity") or {}).get("nodeAffinity") or {}
+    return sum(p.get("weight", 0) for p in na.get("preferredDuringSchedulingIgnoredDuringExecution") or []
+               if all(_expr_ok(ex, labels) for ex in p.get("preference", {}).get("matchExpressions") or []))
+
+def simulate_drain(node, nodes, pods, pdbs=None):
+    """Dry-run a drain of `node` against raw node/pod/PDB objects: bin-pack the
+    pods it would evict onto the other schedulable, Ready nodes' free CPU, memory,
+    GPUs and pod slots (largest first, honouring node selectors, required node
+    affinity and taints; preferred affinity and then the tightest GPU fit pick
+    among nodes that fit), and check each PodDisruptionBudget the evictions hit."""
+    free, cand = {}, {}
+    for n in nodes:
+        name, st = n["metadata"]["name"], n["status"]
+        a = st.get("allocatable", {})
+        free[name] = [_cpu_milli(a.get("cpu")), _storage_bytes(a.get("memory")),
+                      int(a.get("nvidia.com/gpu", "0") or 0), int(a.get("pods", "110") or 0)]
+        ready = any(c["type"] == "Ready" and c["status"] == "True" for c in st.get("conditions", []))
+        if name != node:
+            cand[name] = (n, None if ready and not n["spec"].get("unschedulable") else
+                          "cordoned" if ready else "not Ready")
+    if node not in free:
+        raise ValueError(f"unknown node {node}")
+    here = []
+    for p in pods:
+        where, phase = p["spec"].get("nodeName"), p.get("status", {}).get("phase")
+        if not where or phase in ("Succeeded", "Failed"):
+            continue
+        req = _pod_requests(p["spec"])
+        if where in free:
+            f = free[where]
+            for i, v in enumerate(req + (1,)):
+                f[i] -= v
+        if where == node:
+            here.append(p)
+    targets = [(p, _pod_requests(p["spec"])) for p in _drain_targets(here)]
+    placed, pending, unmanaged = [], [], []
+    for p, (cpu, mem, gpus) in sorted(targets, key=lambda t: t[1][::-1], reverse=True):
+        key = _obj_key(p)
+        if not p["metadata"].get("ownerReferences"):
+            unmanaged.append(key)                              # evicted for good: nothing recreates it
+            continue
+        why, best = collections.Counter(), None
+        for name, (n, down) in cand.items():
+            f = free[name]
+            bad = down or _node_refuses(p["spec"], n) or (
+                "short of GPUs" if f[2] < gpus else "short of CPU" if f[0] < cpu else
+                "short of memory" if f[1] < mem else "out of pod slots" if f[3] < 1 else None)
+            if bad:
+                why[bad] += 1
+                continue
+            rank = (_node_preference(p["spec"], n), -(f[2] - gpus), -(f[0] - cpu))
+            if best is None or rank > best[0]:
+                best = (rank, name)
+        row = {"pod": key, "gpus": gpus, "cpu_m": cpu, "mem_mib": mem >> 20}
+        if best is None:
+            row["why"] = (f"0/{len(cand)} nodes fit: " + ", ".join(f"{c} {r}" for r, c in why.most_common())
+                          if cand else "no other nodes")
+            pending.append(row)
+            continue
+        f = free[best[1]]
+        for i, v in enumerate((cpu, mem, gpus, 1)):
+            f[i] -= v
+        placed.append({**row, "to": best[1]})
+    stuck = {r["pod"] for r in pending}
+    budgets = []
+    for b in pdbs or []:
+        ns = b["metadata"].get("namespace", "")
+        hit = [_obj_key(p) for p, _ in targets if p["metadata"].get("namespace") == ns
+               and _selector_ok(b["spec"].get("selector"), p["metadata"].get("labels", {}))]
+        st = b.get("status", {})
+        allowed = st.get("disruptionsAllowed", 0)
+        if not hit or allowed >= len(hit):
+            continue
+        healthy, expected = st.get("currentHealthy", 0), st.get("expectedPods", 0)
+        if allowed == 0 and healthy >= expected:
+            effect, msg = "blocks", f"allows 0 disruptions with all {expected} pod(s) healthy"
+        elif stuck.intersection(hit):
+            effect, msg = "blocks", f"allows {allowed}, and the replacements would stay Pending"
+        else:
+            effect, msg = "slows", (f"allows {allowed} at a time — later evictions wait for replacements"
+                                    if allowed else f"0 disruptions until {expected - healthy} pod(s) recover")
+        budgets.append({"pdb": f"{ns}/{b['metadata']['name']}", "pods": len(hit), "allowed": allowed,
+                        "effect": effect, "msg": msg})
+    blocked = [b for b in budgets if b["effect"] == "blocks"]
+    msg = (f"{len(placed)} pod(s) fit elsewhere" if not pending else f"{len(pending)} pod(s) would stay Pending") \
+        + (f"; {len(blocked)} disruption budget(s) block it" if blocked else "") \
+        + (f"; {len(unmanaged)} unmanaged pod(s) would be deleted" if unmanaged else "")
+    return {"node": node, "feasible": not pending and not blocked, "pods": len(targets), "msg": msg,
+            "placed": placed, "pending": pending, "budgets": budgets, "unmanaged": unmanaged,
+            "pdbs_checked": pdbs is not None}
+
+def _demo_cluster():
+    """FAKE as raw nodes and GPU pods, enough for simulate_drain in the demo."""
+    nodes = [{"metadata": {"name": n["name"], "labels": {"gpu.homelab/tier": n["tier"], CPU_TIER_KEY: n["cpu_tier"]}},
+              "spec": {"unschedulable": n["unschedulable"]},
+              "status": {"conditions": [{"type": "Ready", "status": str(n["ready"])}],
+                         "allocatable": {"cpu": n["cpu"], "memory": f"{n['ram']}Gi", "nvidia.com/gpu": str(n["gpus"])}}}
+             for n in FAKE["nodes"]]
+    pods = [{"metadata": {"namespace": p["ns"], "name": p["name"], "ownerReferences": [{"kind": "ReplicaSet"}]},
+             "spec": {"nodeName": node, "containers": [{"resources": {"limits": {"nvidia.com/gpu": str(p["gpus"])}}}]},
+             "status": {"phase": "Running"}}
+            for node, ps in FAKE["pods_by_node"].items() for p in ps]
+    return nodes, pods
+
+def drain_check(node):
+    if DEMO:
+        return simulate_drain(node, *_demo_cluster(), [])
+    try:
+        pdbs = k8s("GET", "/apis/policy/v1/poddisruptionbudgets")["items"]
+    except urllib.error.HTTPError as e:
+        if e.code not in (403, 404): raise
+        pdbs = None                                   # no RBAC for PDBs: report capacity only
+    # every phase: a bound Pending pod already holds its requests on the node
+    # (simulate_drain skips Succeeded/Failed itself)
+    return simulate_drain(node, _cached_items("nodes", "/api/v1/nodes"),
+                          _cached_items("pods", "/api/v1/pods"), pdbs)
+
 # ----------------------------------------------------------------- other actions
 def act_scale(b):
     if DEMO:
@@ -976,6 +3026,16 @@ def act_label(b):
     return {"ok": True}
 
 # ----------------------------------------------------------------- add node
+@cached("join_secret")
+def _join_secret():
+    try:
+        sec = k8s("GET", "/api/v1/namespaces/cockpit/secrets/cockpit-join")
+    except urllib.error.HTTPError as e:
+        if e.code == 404: return {}          # optional; absence is a valid, cacheable answer
+        raise
+    return {k: base64.b64decode(v).decode(errors="replace")
+            for k, v in sec.get("data", {}).items()}
+
 def _join_cfg():
     def _read(name):
         p = JOIN / name
@@ -983,9 +3043,7 @@ def _join_cfg():
     api = {}
     if not DEMO:
         try:
-            sec = k8s("GET", "/api/v1/namespaces/cockpit/secrets/cockpit-join")
-            api = {k: base64.b64decode(v).decode(errors="replace")
-                   for k, v in sec.get("data", {}).items()}
+            api = _join_secret()
         except Exception:
             pass
     host = os.environ.get("SERVER_HOST") or _read("server_host") or api.get("server_host", "")
@@ -1035,16 +3093,18 @@ def _node_names():
     if DEMO:
         return {n["name"] for n in FAKE["nodes"]}
     try:
-        return {n["metadata"]["name"] for n in k8s("GET", "/api/v1/nodes")["items"]}
+        return {n["metadata"]["name"] for n in _cached_items("nodes", "/api/v1/nodes")}
     except Exception:
         return set()
 
 def _node_ready(name):
     if DEMO:
         return any(n["name"] == name and n["ready"] for n in FAKE["nodes"])
+    inf = _informer("nodes")
     try:
-        for n in k8s("GET", "/api/v1/nodes")["items"]:
-            if n["metadata"]["name"] != name:
+        nodes = [inf.get(name)] if inf else k8s("GET", "/api/v1/nodes")["items"]
+        for n in nodes:
+            if not n or n["metadata"]["name"] != name:
                 continue
             return any(c["type"] == "Ready" and c["status"] == "True"
                        for c in n["status"].get("conditions", []))
@@ -1085,9 +3145,7 @@ def _driver_cfg():
     api = {}
     if not DEMO:
         try:
-            sec = k8s("GET", "/api/v1/namespaces/cockpit/secrets/cockpit-join")
-            api = {k: base64.b64decode(v).decode(errors="replace")
-                   for k, v in sec.get("data", {}).items()}
+            api = _join_secret()
         except Exception:
             pass
     op = (_read("gpu_operator_manages_driver") or os.environ.get("GPU_OPERATOR_MANAGES_DRIVER")
@@ -1179,6 +3237,16 @@ def _wait_for_gpu_operator(node_name, timeout=480):
         time.sleep(6)
     return False
 
+def _ssh_reboot(auth, port, user, host):
+    try:
+        if auth["mode"] == "password":
+            pw = _b64_shell(auth["password"])
+            _ssh_exec(auth, port, user, host, f"echo '{pw}' | base64 -d | sudo -S reboot", timeout=15)
+        else:
+            _ssh_exec(auth, port, user, host, "sudo reboot", timeout=15)
+    except subprocess.TimeoutExpired:
+        pass                                  # the session often hangs as the box goes down
+
 def _wait_node_ready(node_name, timeout=600):
     deadline = time.time() + timeout
     while time.time() < deadline:
@@ -1193,6 +3261,8 @@ def driver_jobs_snapshot():
     with _DJLOCK:
         return {k: dict(v) for k, v in DRIVER_JOBS.items()}
 
+JOBS.register("driver", DRIVER_JOBS, _DJLOCK)
+
 def _ssh_driver_install(job_id, body):
     cfg = _driver_cfg()
     st = DRIVER_JOBS[job_id]
@@ -1239,12 +3309,7 @@ def _ssh_driver_install(job_id, body):
             st.update(phase="labeling", msg="driver OK — applying GPU labels…")
         elif need_reboot and do_reboot:
             st.update(phase="rebooting", msg="rebooting node…")
-            if auth["mode"] == "password":
-                pw = _b64_shell(auth["password"])
-                _ssh_exec(auth, port, user, host,
-                          f"echo '{pw}' | base64 -d | sudo -S reboot", timeout=15)
-            else:
-                _ssh_exec(auth, port, user, host, "sudo reboot", timeout=15)
+            _ssh_reboot(auth, port, user, host)
             time.sleep(20)
             st.update(phase="waiting", msg=f"waiting for {node or host} to come back…")
             if node and not _wait_node_ready(node, 600):
@@ -1303,9 +3368,9 @@ def act_driver_install(b):
                 st.update(phase=phase, msg=msg)
                 time.sleep(delay)
             st.update(phase="done", msg="driver ready (demo)")
-        threading.Thread(target=demo, daemon=True).start()
+        JOBS.submit("driver", job_id, demo)
     else:
-        threading.Thread(target=_ssh_driver_install, args=(job_id, b), daemon=True).start()
+        JOBS.submit("driver", job_id, _ssh_driver_install, job_id, b)
     return {"ok": True, "id": job_id}
 
 RENAME_JOBS, _RJLOCK = {}, threading.Lock()
@@ -1314,45 +3379,12 @@ def rename_jobs_snapshot():
     with _RJLOCK:
         return {k: dict(v) for k, v in RENAME_JOBS.items()}
 
+JOBS.register("rename", RENAME_JOBS, _RJLOCK)
+
 def _evict_workloads_on_node(node, st, timeout=240):
-    k8s("PATCH", f"/api/v1/nodes/{node}", {"spec": {"unschedulable": True}},
-        "application/strategic-merge-patch+json")
-    pods = k8s("GET", f"/api/v1/pods?fieldSelector=spec.nodeName={node}")["items"]
-    targets = []
-    for p in pods:
-        if any(o.get("kind") == "DaemonSet" for o in p["metadata"].get("ownerReferences", [])):
-            continue
-        if p["metadata"].get("annotations", {}).get("kubernetes.io/config.mirror"):
-            continue
-        if p["status"].get("phase") in ("Succeeded", "Failed"):
-            continue
-        targets.append((p["metadata"]["namespace"], p["metadata"]["name"]))
-    total, evicted = len(targets), 0
-    st.update(total=total, evicted=0)
-    remaining, deadline = list(targets), time.time() + timeout
-    while remaining and time.time() < deadline:
-        still = []
-        for ns, name in remaining:
-            try:
-                k8s("POST", f"/api/v1/namespaces/{ns}/pods/{name}/eviction",
-                    {"apiVersion": "policy/v1", "kind": "Eviction",
-                     "metadata": {"name": name, "namespace": ns}})
-                evicted += 1
-                st["evicted"] = evicted
-            except urllib.error.HTTPError as e:
-                if e.code == 429:
-                    still.append((ns, name))
-                elif e.code == 404:
-                    evicted += 1
-                    st["evicted"] = evicted
-            except Exception:
-                pass
-        remaining = still
-        if remaining:
-            st.update(msg=f"{len(remaining)} pod(s) PDB-blocked — waiting…")
-            time.sleep(4)
-    if remaining:
-        raise RuntimeError(f"{len(remaining)} pod(s) still running after eviction window")
+    left = Eviction(node, st, timeout).run()
+    if left:
+        raise RuntimeError(f"{len(left)} pod(s) still on the node after eviction ({st['msg']})")
 
 def _ssh_suggest_name(body):
     node = (body.get("node") or "").strip()
@@ -1498,9 +3530,9 @@ def act_node_rename(b):
                     FAKE["nodes"][i] = {**n, "name": new}
                     break
             st.update(phase="done", node=new, msg=f"{old} → {new}")
-        threading.Thread(target=demo, daemon=True).start()
+        JOBS.submit("rename", job_id, demo)
     else:
-        threading.Thread(target=_ssh_rename, args=(job_id, b), daemon=True).start()
+        JOBS.submit("rename", job_id, _ssh_rename, job_id, b)
     return {"ok": True, "id": job_id}
 
 def _sanitize_node_name(name):
@@ -1835,8 +3867,7 @@ def act_add_ssh(b):
         ADD_JOBS[job_id] = {"id": job_id, "method": "ssh", "host": host,
                             "role": b.get("role", "worker"), "phase": "starting",
                             "msg": "", "ts": time.time()}
-    fn = _ssh_demo if DEMO else _ssh_join
-    threading.Thread(target=fn, args=(job_id, b), daemon=True).start()
+    JOBS.submit("join", job_id, _ssh_demo if DEMO else _ssh_join, job_id, b)
     return {"ok": True, "id": job_id}
 
 def act_add_watch(b):
@@ -1854,19 +3885,32 @@ def act_add_watch(b):
                                     msg=f"{expected or 'new-box'} detected (demo)")
             return
         _wait_for_node(job_id, expected, known)
-    threading.Thread(target=run, daemon=True).start()
+    JOBS.submit("join", job_id, run)
     return {"ok": True, "id": job_id}
 
+def _join_resume(job_id, st):
+    """A watch for a named node can pick up where it left off; SSH joins can't
+    (their credentials were never stored)."""
+    if DEMO or st.get("method") != "watch" or not st.get("expected"):
+        return None
+    return _wait_for_node, job_id, st["expected"], _node_names() - {st["expected"]}
+
+JOBS.register("join", ADD_JOBS, _AJLOCK, PRIO_NORMAL, _join_resume)
+
 # ----------------------------------------------------------- managed app deploy
 def _managed_apps_registry():
     if DEMO:
         return [{"name": "plateforge", "repo": "~/git/electroplate",
                  "namespace": "plateforge", "deployment": "backend"}]
     try:
-        return json.loads(APPS_FILE.read_text())
+        return _apps_file()
     except Exception:
         return []
 
+@cached("apps")
+def _apps_file():
+    return json.loads(APPS_FILE.read_text())
+
 def _format_pod_age(ts):
     """Human-readable age from an ISO8601 timestamp."""
     if not ts:
@@ -1892,9 +3936,14 @@ def _app_pods(ns, dep_obj):
     sel = dep_obj.get("spec", {}).get("selector", {}).get("matchLabels") or {}
     if not sel:
         return []
-    label_selector = urllib.parse.quote(",".join(f"{k}={v}" for k, v in sel.items()))
+    inf = _informer("pods")
     try:
-        items = k8s("GET", f"/api/v1/namespaces/{ns}/pods?labelSelector={label_selector}")["items"]
+        if inf:
+            items = [p for p in inf.items(ns)
+                     if all(p["metadata"].get("labels", {}).get(k) == v for k, v in sel.items())]
+        else:
+            label_selector = urllib.parse.quote(",".join(f"{k}={v}" for k, v in sel.items()))
+            items = k8s("GET", f"/api/v1/namespaces/{ns}/pods?labelSelector={label_selector}")["items"]
     except Exception:
         return []
     pods = []
@@ -1923,8 +3972,11 @@ def _app_cluster_status(entry):
         return {"ready": "1/1", "phase": "running", "replicas": 1, "updated": 1,
                 "pods": [{"name": f"{app}-demo-0", "ip": "10.42.0.42", "node": "trx40-beast",
                           "phase": "Running", "ready": "1/1", "age": "2h"}]}
+    inf = _informer("deployments")
     try:
-        d = k8s("GET", f"/apis/apps/v1/namespaces/{ns}/deployments/{dep}")
+        d = inf.get(f"{ns}/{dep}") if inf else k8s("GET", f"/apis/apps/v1/namespaces/{ns}/deployments/{dep}")
+        if d is None:
+            return {"ready": "0/0", "phase": "not_deployed", "replicas": 0, "updated": 0, "pods": []}
     except urllib.error.HTTPError as e:
         if e.code == 404:
             return {"ready": "0/0", "phase": "not_deployed", "replicas": 0, "updated": 0, "pods": []}
@@ -1951,6 +4003,8 @@ def app_jobs_snapshot():
     with _APJLOCK:
         return {k: dict(v) for k, v in APP_JOBS.items()}
 
+JOBS.register("deploy", APP_JOBS, _APJLOCK)
+
 def apps_snapshot():
     reg = _managed_apps_registry()
     with _APJLOCK:
@@ -1963,7 +4017,8 @@ def apps_snapshot():
         if job:
             st["job"] = {"id": job["id"], "phase": job["phase"], "msg": job.get("msg", "")}
         out.append({**entry, **st})
-    return {"apps": out, "system_root": _join_cfg().get("system_root", "")}
+    return {"apps": out, "system_root": _join_cfg().get("system_root", ""),
+            "registry_age_s": CACHED["apps"].age()}
 
 def _demo_app_deploy(job_id, app):
     st = APP_JOBS[job_id]
@@ -2034,42 +4089,676 @@ def act_app_deploy(b):
     with _APJLOCK:
         APP_JOBS[job_id] = {"id": job_id, "app": app, "host": b.get("host", ""),
                             "phase": "queued", "msg": "starting deploy…", "ts": time.time()}
-    fn = _demo_app_deploy if DEMO else _ssh_app_deploy
     if DEMO:
-        threading.Thread(target=fn, args=(job_id, app), daemon=True).start()
+        JOBS.submit("deploy", job_id, _demo_app_deploy, job_id, app)
     else:
-        threading.Thread(target=fn, args=(job_id, b), daemon=True).start()
+        JOBS.submit("deploy", job_id, _ssh_app_deploy, job_id, b)
     return {"ok": True, "id": job_id}
 
+# ----------------------------------------------------------------- rolling maintenance
+MAINT_READY_TIMEOUT = float(os.environ.get("COCKPIT_MAINT_READY_TIMEOUT", "600"))
+MAINT_HOOKS = ("none", "reboot", "driver")
+MAINT_PLANS, _MLOCK = {}, threading.Lock()
+
+def maint_snapshot():
+    with _MLOCK:
+        return {k: {**v, "nodes": {n: dict(st) for n, st in v["nodes"].items()}}
+                for k, v in MAINT_PLANS.items()}
+
+MAINT_IN_FLIGHT = ("starting", "draining", "rescheduling", "hook", "uncordoning")
+
+def _tier_free(nodes, skip=()):
+    """Unallocated GPUs per tier on schedulable, Ready nodes."""
+    free = {}
+    for n in nodes:
+        if n["name"] in skip or n.get("unschedulable") or not n.get("ready"):
+            continue
+        t = n.get("tier") or "-"
+        free[t] = free.get(t, 0) + max(0, (n.get("gpus") or 0) - (n.get("gpu_used") or 0))
+    return free
+
+def _maint_capacity(plan, node):
+    """(ok, why): would taking `node` out keep `min_free` GPUs free in every tier?
+    Its own GPUs leave the pool, its GPU pods need room elsewhere, and so do
+    those of every node this plan has in flight — counted from the plan, not
+    the snapshot, which may predate their cordon."""
+    nodes = {n["name"]: n for n in SNAPSHOTS.get().data["nodes"]}
+    row = nodes.get(node)
+    if row is None:
+        raise RuntimeError(f"{node} is not in the cluster")
+    out = {n for n, st in plan["nodes"].items() if st["phase"] in MAINT_IN_FLIGHT}
+    free = _tier_free(nodes.values(), skip=out | {node})
+    for n in out:
+        st = plan["nodes"][n]
+        free[st["tier"]] = free.get(st["tier"], 0) - st["gpus"]
+    tier = row.get("tier") or "-"
+    free[tier] = free.get(tier, 0) - (row.get("gpu_used") or 0)
+    short = [f"{t}: {k - free.get(t, 0)} GPU(s) short of keeping {k} free"
+             for t, k in sorted(plan["min_free"].items()) if free.get(t, 0) < k]
+    return not short, "; ".join(short)
+
+def _gpu_workloads_on(node):
+    """Deployments/StatefulSets with a GPU pod on `node` -> their keys."""
+    pods = [p for p in k8s("GET", f"/api/v1/pods?fieldSelector=spec.nodeName={node}")["items"] if gpu_req(p)]
+    owners = OWNERS if OWNERS.live() else OwnerIndex.build(
+        pods, _cached_items("replicasets", "/apis/apps/v1/replicasets"))
+    keys = (owners.owner_of(_obj_key(p)) for p in pods)
+    return {k for k in keys if k and k[0] in ("Deployment", "StatefulSet")}
+
+def _workload_ready(key):
+    kind, ns, name = key
+    res = "deployments" if kind == "Deployment" else "statefulsets"
+    try:
+        o = k8s("GET", f"/apis/apps/v1/namespaces/{ns}/{res}/{name}")
+    except urllib.error.HTTPError as e:
+        if e.code == 404: return True             # deleted meanwhile — nothing to wait for
+        raise
+    want = o["spec"].get("replicas", 1)
+    return (o.get("status", {}).get("readyReplicas") or 0) >= want
+
+def _maint_hook(plan, node, st, body, ctx):
+    """Start or check on `node`'s hook; True once it has finished. Never waits:
+    the driver install runs as a "driver" job, a reboot is one SSH command and
+    then polls for Ready."""
+    now = time.monotonic()
+    if DEMO:
+        steps = ("rebooting…",) if plan["hook"] == "reboot" else ("installing driver…", "rebooting…")
+        i = int((now - ctx.setdefault("hook_t0", now)) // 2)
+        if i >= len(steps):
+            return True
+        st["msg"] = steps[i]
+        return False
+    if plan["hook"] == "driver":
+        job_id = ctx.get("driver")
+        if job_id is None:
+            job_id = ctx["driver"] = f"driver-{node}-{int(time.time())}"
+            with _DJLOCK:
+                DRIVER_JOBS[job_id] = {"id": job_id, "node": node, "host": "", "phase": "starting",
+                                       "msg": "", "ts": time.time()}
+            st["msg"] = f"driver install ({job_id})"
+            JOBS.submit("driver", job_id, _ssh_driver_install, job_id, {**body, "node": node, "host": ""})
+            return False
+        job = DRIVER_JOBS.get(job_id) or {}
+        if job.get("phase") not in JOB_DONE:
+            return False
+        if job["phase"] != "done":
+            raise RuntimeError(f"driver install: {job.get('msg', '')}")
+        return True
+    if "ready_by" not in ctx:
+        host = _node_internal_ip(k8s("GET", f"/api/v1/nodes/{node}").get("status", {}))
+        if not host:
+            raise RuntimeError("node has no InternalIP to SSH to")
+        auth = _resolve_ssh_auth(body)
+        try:
+            st["msg"] = "rebooting…"
+            _ssh_reboot(auth, int(body.get("port") or 22), body.get("user") or "root", host)
+        finally:
+            if auth.get("cleanup") and auth.get("keypath"):
+                try:
+                    os.unlink(auth["keypath"])
+                except OSError:
+                    pass
+        ctx["up_after"], ctx["ready_by"] = now + 20, now + 600   # still Ready until the kubelet stops
+        return False
+    if now < ctx["up_after"]:
+        return False
+    st["msg"] = "waiting for Ready…"
+    if _node_ready(node):
+        return True
+    if now > ctx["ready_by"]:
+        raise RuntimeError("node did not become Ready after reboot")
+    return False
+
+def _maint_step(pid, node, body, ctx):
+    """Move one in-flight node on: dry run → drain (a "drain" job, so it shares
+    the drain limit, reserved workers and the manual drain's claim on the node)
+    → displaced GPU workloads Ready elsewhere → hook → uncordon. Returns without
+    waiting; `ctx` holds the node's progress between calls."""
+    plan = MAINT_PLANS[pid]
+    st = plan["nodes"][node]
+    if st["phase"] == "starting":
+        ctx["workloads"] = set() if DEMO else _gpu_workloads_on(node)
+        dry = drain_check(node)
+        if not dry["feasible"]:                                  # fail now, not at DRAIN_TIMEOUT
+            raise RuntimeError(f"dry run: {dry['msg']}")
+        if not _claim_drain(node):
+            raise RuntimeError("a drain of this node is already running")
+        DRAINS[node]["plan"] = pid
+        st.update(phase="draining", msg="")
+        JOBS.submit("drain", node, _drain_demo if DEMO else _drain_real, node)
+    elif st["phase"] == "draining":
+        d = DRAINS.get(node) or {}
+        if d.get("phase") not in JOB_DONE:
+            return
+        if d["phase"] != "done":
+            raise RuntimeError(f"drain {d['phase']}: {d.get('msg', '')}")
+        ctx["ready_by"] = time.monotonic() + MAINT_READY_TIMEOUT
+        st.update(phase="rescheduling", msg="")
+    elif st["phase"] == "rescheduling":
+        waiting = sorted(f"{k[1]}/{k[2]}" for k in ctx["workloads"] if not _workload_ready(k))
+        if waiting:
+            if time.monotonic() > ctx["ready_by"]:
+                raise RuntimeError(f"not Ready after {MAINT_READY_TIMEOUT:g}s: {', '.join(waiting)}")
+            st["msg"] = (f"waiting for {', '.join(waiting[:3])}"
+                         + (f" +{len(waiting) - 3}" if len(waiting) > 3 else ""))
+            return
+        st.update(phase="hook" if plan["hook"] != "none" else "uncordoning", msg="")
+        ctx.pop("ready_by")
+    elif st["phase"] == "hook":
+        if _maint_hook(plan, node, st, body, ctx):
+            st.update(phase="uncordoning", msg="")
+    if st["phase"] == "uncordoning":
+        if plan["uncordon"] and not st["was_cordoned"]:       # leave the operator's own cordons
+            act_cordon({"node": node, "on": False})
+        st.update(phase="done", msg="")
+
+def _maint_run(pid, body):
+    """Drive a plan from its one job: start queued nodes, in plan order, whenever
+    fewer than `concurrency` are in flight and taking that node out keeps the
+    tier floor (a node that doesn't fit yet waits while later ones go), and
+    step the in-flight ones; stop starting on the first failure or cancel."""
+    plan = MAINT_PLANS[pid]
+    pending = [n for n in plan["order"] if plan["nodes"][n]["phase"] in ("queued", "waiting")]
+    active, shown = {}, None                               # node -> its _maint_step context
+    while pending or active:
+        for node, ctx in list(active.items()):
+            st = plan["nodes"][node]
+            try:
+                _maint_step(pid, node, body, ctx)
+            except Exception as e:
+                st.update(phase="error", msg=str(e))
+            if st["phase"] in ("done", "error"):
+                st["took_s"] = round(time.monotonic() - ctx["t0"], 1)
+                del active[node]
+                if st["phase"] == "error":
+                    plan["failed"] = plan["failed"] or node
+                _on_cluster_change()
+        if pending and (plan["cancel"] or plan["failed"]):
+            for n in pending:
+                plan["nodes"][n].update(phase="skipped", msg="")
+            pending = []
+        for node in list(pending):                         # first fits go; the rest wait a turn
+            if len(active) >= plan["concurrency"]:
+                break
+            st = plan["nodes"][node]
+            try:
+                ok, why = _maint_capacity(plan, node)
+            except Exception as e:
+                ok, why = False, str(e)
+            if not ok:
+                st.update(phase="waiting", msg=why)
+                continue
+            row = next(r for r in SNAPSHOTS.get().data["nodes"] if r["name"] == node)
+            st.update(phase="starting", msg="", tier=row.get("tier") or "-", gpus=row.get("gpu_used") or 0,
+                      was_cordoned=st["was_cordoned"] if st.pop("resumed", False)
+                      else bool(row.get("unschedulable")))
+            pending.remove(node)
+            active[node] = {"t0": time.monotonic()}
+        done = sum(1 for st in plan["nodes"].values() if st["phase"] == "done")
+        plan["msg"] = f"{done}/{len(plan['order'])} done" + (f", {len(active)} in progress" if active else "")
+        view = [(st["phase"], st["msg"]) for st in plan["nodes"].values()]
+        if view != shown:                                  # the overview shows plan progress
+            shown = view
+            SNAPSHOTS.invalidate(soft=True)
+        if pending or active:
+            time.sleep(1 if DEMO else 2)
+    plan["phase"] = "error" if plan["failed"] else "cancelled" if plan["cancel"] else "done"
+    if plan["failed"]:
+        plan["msg"] = f"stopped: {plan['failed']} failed — {plan['nodes'][plan['failed']]['msg']}"
+
+def act_maintenance(b):
+    nodes = [n.strip() for n in b.get("nodes") or [] if n.strip()]
+    if not nodes:
+        raise ValueError("nodes required")
+    known = _node_names()
+    missing = [n for n in nodes if n not in known]
+    if missing:
+        raise ValueError(f"unknown node(s): {', '.join(missing)}")
+    hook = b.get("hook") or "none"
+    if hook not in MAINT_HOOKS:
+        raise ValueError(f"hook must be one of {', '.join(MAINT_HOOKS)}")
+    if hook == "driver" and _driver_cfg()["operator_manages"]:
+        raise ValueError("GPU_OPERATOR_MANAGES_DRIVER=1 — the operator upgrades drivers itself")
+    with _MLOCK:
+        busy = {n for p in MAINT_PLANS.values() if p["phase"] == "running" for n in p["order"]}
+        if busy & set(nodes):
+            raise ValueError(f"already in a running plan: {', '.join(sorted(busy & set(nodes)))}")
+        pid = f"maint-{int(time.time())}-{os.urandom(2).hex()}"
+        while pid in MAINT_PLANS:                          # never replace a plan, running or not
+            pid = f"maint-{int(time.time())}-{os.urandom(2).hex()}"
+        MAINT_PLANS[pid] = {
+            "id": pid, "phase": "running", "ts": time.time(), "msg": "", "hook": hook,
+            "concurrency": max(1, int(b.get("concurrency") or 1)),
+            "min_free": {str(t): int(k) for t, k in (b.get("min_free") or {}).items()},
+            "uncordon": bool(b.get("uncordon", True)), "cancel": False, "failed": None,
+            "order": list(dict.fromkeys(nodes)),
+            "nodes": {n: {"phase": "queued", "msg": "", "tier": "-", "gpus": 0, "was_cordoned": False,
+                          "took_s": None} for n in nodes}}
+    JOBS.submit("maintenance", pid, _maint_run, pid, b)
+    return {"ok": True, "id": pid}
+
+def _maint_resume(pid, plan):
+    """Plans without a hook restart their unfinished nodes (the hooks need SSH
+    credentials, which were never stored)."""
+    if DEMO or plan.get("hook") != "none":
+        return None
+    for st in plan["nodes"].values():
+        if st["phase"] not in ("queued", "waiting", "done", "error", "skipped"):
+            st.update(phase="queued", msg="", resumed=True)
+    return _maint_run, pid, {}
+
+JOBS.register("maintenance", MAINT_PLANS, _MLOCK, PRIO_LOW, _maint_resume)
+
+def act_maintenance_cancel(b):
+    plan = MAINT_PLANS.get(b.get("id", ""))
+    if not plan:
+        raise ValueError("no such plan")
+    plan["cancel"] = True
+    return {"ok": True}
+
+def act_debug_timings(b):
+    if "on" in b: TIMINGS.on = bool(b["on"])
+    if b.get("clear"): TIMINGS.recent.clear()
+    return {"ok": True, "on": TIMINGS.on}
+
 ACTIONS = {"/api/scale": act_scale, "/api/workload/configure": act_workload_configure,
            "/api/cordon": act_cordon,
            "/api/label": act_label, "/api/drain": act_drain,
            "/api/add-node/ssh": act_add_ssh, "/api/add-node/watch": act_add_watch,
            "/api/add-node/ssh-test": act_ssh_test, "/api/driver/install": act_driver_install,
            "/api/node/rename": act_node_rename, "/api/node/suggest-name": act_suggest_name,
-           "/api/app/deploy": act_app_deploy}
+           "/api/app/deploy": act_app_deploy, "/api/maintenance": act_maintenance,
+           "/api/maintenance/cancel": act_maintenance_cancel, "/api/debug/timings": act_debug_timings}
+
+# ----------------------------------------------------------------- snapshot cache
+# with informers, events invalidate the overview and the TTL is only a backstop for
+# sources nothing announces (Longhorn, the join secret); without them it's the refresh
+SNAPSHOT_TTL = float(os.environ.get("COCKPIT_SNAPSHOT_TTL", "30" if INFORMERS_ON else "2"))
+SNAPSHOT_DEBOUNCE = float(os.environ.get("COCKPIT_SNAPSHOT_DEBOUNCE", "1"))
+GZIP_MIN = 1024                           # smaller JSON bodies go out uncompressed
+_GZ, _GZ_LOCK = collections.OrderedDict(), threading.Lock()
+
+def etag(body):
+    """Weak content-hash validator: equal bodies share it across builds and encodings."""
+    return 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def etag_matches(header, tag):
+    tags = {t.strip().removeprefix("W/") for t in (header or "").split(",")}
+    return "*" in tags or tag.removeprefix("W/") in tags
+
+def accepts_gzip(header):
+    """Accept-Encoding allows gzip: listed (or via *) with a q-value above 0."""
+    q = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        m = re.search(r"q\s*=\s*([0-9.]+)", params)
+        try:
+            q[coding.strip().lower()] = float(m.group(1)) if m else 1.0
+        except ValueError:
+            q[coding.strip().lower()] = 0.0
+    return q.get("gzip", q.get("x-gzip", q.get("*", 0.0))) > 0
+
+def gzip_cached(tag, body):
+    """gzip of a JSON body, kept for the last 64 ETags so unchanged polls of the
+    smaller routes don't recompress."""
+    with _GZ_LOCK:
+        gz = _GZ.get(tag)
+        if gz is not None:
+            _GZ.move_to_end(tag)
+            return gz
+    gz = gzip.compress(body, 6)
+    with _GZ_LOCK:
+        _GZ[tag] = gz
+        while len(_GZ) > 64:
+            _GZ.popitem(last=False)
+    return gz
+
+class Snapshot:
+    """One built overview plus its encodings, produced lazily and at most once."""
+    __slots__ = ("version", "data", "started", "ts", "_json", "_gzip", "_etag", "_lock")
+    def __init__(self, version, data, started):
+        self.version, self.data, self.started = version, data, started
+        self.ts, self._json, self._gzip, self._etag = time.monotonic(), None, None, None
+        self._lock = threading.Lock()
+
+    def etag(self):
+        if self._etag is None:
+            self._etag = etag(self.json())
+        return self._etag
+
+    def json(self):
+        if self._json is None:
+            with self._lock:
+                if self._json is None:
+                    with TIMINGS.span("encode json"):
+                        self._json = encode_json(self.data).encode()
+        return self._json
+
+    def gzip(self):
+        if self._gzip is None:
+            body = self.json()
+            with self._lock:
+                if self._gzip is None:
+                    with TIMINGS.span("encode gzip"):
+                        self._gzip = gzip.compress(body, 6)
+        return self._gzip
+
+class SnapshotCache:
+    """Single-flight cache in front of overview(). Callers arriving during a build
+    wait for it instead of starting their own; a result stays fresh until
+    invalidate() — informer events, a DCGM pass that changed something, drain
+    and plan progress, actions — or for `ttl` seconds at most. Idle clients
+    polling an unchanged cluster cost no builds.
+    A soft invalidation (cluster events) only expires a snapshot at least
+    `debounce` seconds old, so a busy cluster costs at most one build per
+    debounce window; a hard one (actions) expires it at once."""
+    def __init__(self, build, ttl=SNAPSHOT_TTL, debounce=SNAPSHOT_DEBOUNCE):
+        self.build, self.ttl, self.debounce = build, ttl, debounce
+        self._cond = threading.Condition()
+        self._snap, self._building, self._floor, self._soft = None, False, 0.0, 0.0
+        self._gen, self._err, self.version = 0, None, 0
+        self.hits = self.misses = self.coalesced = self.errors = 0
+
+    def _fresh(self, snap, now):
+        return (snap is not None and now - snap.ts < self.ttl and snap.started >= self._floor
+                and (snap.started >= self._soft or now - snap.ts < self.debounce))
+
+    def invalidate(self, soft=False):
+        with self._cond:
+            if soft: self._soft = time.monotonic()
+            else: self._floor = time.monotonic()
+
+    def get(self):
+        with self._cond:
+            while True:
+                if self._fresh(self._snap, time.monotonic()):
+                    self.hits += 1
+                    return self._snap
+                if not self._building:
+                    break
+                gen = self._gen
+                self._cond.wait_for(lambda: self._gen != gen, timeout=60)
+                if self._gen != gen:
+                    self.coalesced += 1
+                    if self._err is not None:
+                        raise self._err
+                    return self._snap
+            self._building, self.misses = True, self.misses + 1
+        started, snap, err = time.monotonic(), None, None
+        try:
+            with TIMINGS.span("overview build"):
+                data = self.build()
+        except Exception as e:
+            err = e
+        with self._cond:
+            self._building, self._gen, self._err = False, self._gen + 1, err
+            if err is None:
+                self.version += 1
+                snap = self._snap = Snapshot(self.version, data, started)
+            else:
+                self.errors += 1
+            self._cond.notify_all()
+        if err is not None:
+            raise err
+        return snap
+
+    def stats(self):
+        with self._cond:
+            snap, total = self._snap, self.hits + self.misses + self.coalesced
+            return {"version": self.version, "ttl_s": self.ttl, "debounce_s": self.debounce,
+                    "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                    "errors": self.errors,
+                    "hit_ratio": round((self.hits + self.coalesced) / total, 3) if total else 0,
+                    "age_s": round(time.monotonic() - snap.ts, 2) if snap else None,
+                    "bytes": len(snap._json) if snap and snap._json else None,
+                    "gzip_bytes": len(snap._gzip) if snap and snap._gzip else None}
+
+SNAPSHOTS = SnapshotCache(lambda: overview())
+
+# ----------------------------------------------------------------- live stream (SSE)
+STREAM_INTERVAL = float(os.environ.get("COCKPIT_STREAM_INTERVAL", "1"))
+_STREAM_KEYED = {"nodes": lambda n: n["name"], "gpus": lambda g: g["id"],
+                 "workloads": lambda w: f"{w['kind']}/{w['ns']}/{w['name']}"}
+_STREAM_MAPS = ("drains", "telemetry", "pods_by_node", "jobs", "exporters")
+
+def jobs_snapshot():
+    out = {}
+    for snap in (add_jobs_snapshot(), driver_jobs_snapshot(),
+                 rename_jobs_snapshot(), app_jobs_snapshot()):
+        out.update(snap)
+    return out
+
+def _stream_state(payload):
+    """Split an overview payload into per-item maps so ticks can be diffed cheaply."""
+    st = {k: v for k, v in payload.items() if k not in _STREAM_KEYED}
+    for sec, key in _STREAM_KEYED.items():
+        st[sec] = {key(x): x for x in payload.get(sec) or []}
+    return st
+
+def _stream_delta(old, new):
+    delta = {}
+    for sec in set(old) | set(new):
+        a, b = old.get(sec), new.get(sec)
+        if sec in _STREAM_KEYED or sec in _STREAM_MAPS:
+            a, b = a or {}, b or {}
+            up = {k: v for k, v in b.items() if a.get(k) != v}
+            gone = [k for k in a if k not in b]
+            if not up and not gone:
+                continue
+            delta[sec] = {"upsert": list(up.values()) if sec in _STREAM_KEYED else up,
+                          "remove": gone}
+        elif a != b:
+            delta[sec] = b
+    return delta
+
+def _stream_payload(st):
+    return {k: list(v.values()) if k in _STREAM_KEYED else v for k, v in st.items()}
+
+def _sse(event, seq, data):
+    return f"event: {event}\nid: {seq}\ndata: {encode_json(data)}\n\n".encode()
+
+class StreamHub:
+    """One background loop reads the cached overview each tick, diffs it against
+    the last one it sent and hands the same encoded delta to every /api/stream
+    subscriber. A tick over an unchanged snapshot costs nothing — builds happen
+    only when the cache was invalidated. A subscriber that can't keep up is
+    dropped and reconnects."""
+    def __init__(self, interval=STREAM_INTERVAL):
+        self.interval, self.seq, self.state, self._seen = interval, 0, None, None
+        self._subs, self._lock = set(), threading.Condition()
+        self._wake, self._running = threading.Event(), False
+
+    def poke(self):
+        """Tick now rather than at the next interval — for the user's own actions."""
+        self._wake.set()
+
+    def subscribe(self, q=None):
+        q = q or queue.Queue(maxsize=64)
+        with self._lock:
+            self._subs.add(q)
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._run, name="stream-hub", daemon=True).start()
+            self._lock.wait_for(lambda: self.state is not None, timeout=30)
+            first = (_sse("snapshot", self.seq, {**_stream_payload(self.state), "v": self.seq})
+                     if self.state is not None else None)
+        return q, first
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subs.discard(q)
+
+    def clients(self):
+        return len(self._subs)
+
+    def _broadcast(self, msg):
+        with self._lock:
+            subs = list(self._subs)
+        for q in subs:
+            try:
+                q.put_nowait(msg)
+            except queue.Full:
+                self.unsubscribe(q)
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)                    # too slow — close, client resyncs
+
+    def _tick(self):
+        snap, jobs = SNAPSHOTS.get(), jobs_snapshot()
+        if self.state is not None and (snap.version, jobs) == self._seen:
+            return                                     # cached snapshot, same jobs: nothing to diff
+        self._seen = (snap.version, jobs)
+        with TIMINGS.root("stream tick"):
+            st = _stream_state({**snap.data, "jobs": jobs})
+        with self._lock:
+            old, self.state = self.state, st
+            if old is None:
+                self._lock.notify_all()
+                return
+            delta = _stream_delta(old, st)
+            if not delta:
+                return
+            self.seq += 1
+            seq = self.seq
+        self._broadcast(_sse("delta", seq, {**delta, "v": seq}))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subs:
+                    self._running, self.state = False, None
+                    return
+            try:
+                self._tick()
+            except Exception as e:
+                self._broadcast(_sse("fault", self.seq, {"error": str(e)}))
+            self._wake.wait(self.interval)       # cluster churn waits for the tick; actions poke
+            self._wake.clear()
+
+STREAM = StreamHub()
+
+def _on_cluster_change(*_):
+    """Actions and finished jobs: drop the cached overview and wake the stream."""
+    SNAPSHOTS.invalidate()
+    STREAM.poke()
+
+def _rendered(resource, o):
+    """The parts of an object the overview draws. A MODIFIED event that leaves
+    them alone (node heartbeats, probe times, restart counts, condition
+    timestamps) doesn't need a rebuild."""
+    if o is None:
+        return None
+    md, spec, st = o.get("metadata", {}), o.get("spec", {}), o.get("status", {})
+    if resource == "nodes":
+        return (md.get("labels"), spec.get("unschedulable"), spec.get("taints"), st.get("capacity"),
+                st.get("allocatable"), st.get("addresses"),
+                [(c.get("type"), c.get("status"), c.get("reason")) for c in st.get("conditions", [])])
+    if resource == "pods":
+        return (spec.get("nodeName"), st.get("phase"), "deletionTimestamp" in md, gpu_req(o),
+                CKPT + "signal" in md.get("annotations", {}))
+    return (md.get("labels"), md.get("annotations"), spec,
+            {k: v for k, v in st.items() if k not in ("conditions", "observedGeneration")})
+
+def _informer_changed(resource):
+    """Informer subscriber: softly invalidate the overview, and only for events
+    that change what it draws. The stream picks it up on its next tick."""
+    def on(kind, obj, old):
+        if kind == "MODIFIED" and _rendered(resource, obj) == _rendered(resource, old):
+            return
+        SNAPSHOTS.invalidate(soft=True)
+    return on
 
 # ----------------------------------------------------------------- http
 class H(BaseHTTPRequestHandler):
     def log_message(self, *a): pass
-    def _send(self, code, body, ctype="application/json"):
+    def _send(self, code, body, ctype="application/json", headers=None):
         data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        if code == 200 and ctype == "application/json" and self.command == "GET":
+            tag = etag(data)
+            return self._send_json(tag, data, lambda: gzip_cached(tag, data), headers)
+        self._write(code, data, ctype, headers)
+    def _write(self, code, data, ctype, headers=None):
+        self._code = code
         self.send_response(code)
-        self.send_header("Content-Type", ctype); self.send_header("Content-Length", len(data))
+        if code != 304:
+            self.send_header("Content-Type", ctype); self.send_header("Content-Length", len(data))
         if ctype.startswith("text/html"):
             self.send_header("Cache-Control", "no-store")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
         self.end_headers(); self.wfile.write(data)
+    def _send_json(self, tag, data, gz, headers=None):
+        """200 JSON with its ETag; 304 and no body when the client already holds it,
+        gzip (`gz()`, cached by the caller) when accepted and worth it."""
+        headers = {**(headers or {}), "ETag": tag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if etag_matches(self.headers.get("If-None-Match"), tag):
+            return self._write(304, b"", "", headers)
+        if len(data) >= GZIP_MIN and accepts_gzip(self.headers.get("Accept-Encoding")):
+            headers["Content-Encoding"], data = "gzip", gz()
+        self._write(200, data, "application/json", headers)
+    def _send_snapshot(self, snap):
+        self._send_json(snap.etag(), snap.json(), snap.gzip, {"X-Snapshot-Version": str(snap.version)})
     def do_GET(self):
         path = urllib.parse.urlparse(self.path).path
+        if path == "/api/stream":
+            return self._stream()                         # long-lived: not traced
+        t = time.perf_counter()
+        with TIMINGS.root(f"GET {path}"):
+            self._get(path)
+        self._observe("GET", path, t)
+    def _observe(self, method, path, t):
+        route = ("/api/gpu/:node/:idx/history" if _GPU_HISTORY.fullmatch(path)
+                 else path if getattr(self, "_code", 404) != 404 else "other")
+        HTTP_SECONDS.observe((route, method, str(getattr(self, "_code", 0))), time.perf_counter() - t)
+    def _get(self, path):
         if path in ("/", "/index.html"):
             self._send(200, HTML.read_bytes(), "text/html; charset=utf-8")
         elif path == "/healthz":
             self._send(200, {"ok": True})
+        elif path == "/metrics":
+            self._send(200, render_metrics().encode(), "text/plain; version=0.0.4; charset=utf-8")
         elif path == "/api/overview":
-            try: self._send(200, overview())
-            except Exception as e: self._send(502, {"error": str(e)})
+            try:
+                snap = SNAPSHOTS.get()
+            except Exception as e:
+                self._send(502, {"error": str(e)})
+            else:
+                self._send_snapshot(snap)
+        elif _GPU_HISTORY.fullmatch(path):
+            node, idx = _GPU_HISTORY.fullmatch(path).groups()
+            node = urllib.parse.unquote(node)
+            q = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            secs = _parse_window(q.get("window", [""])[0])
+            hist = COLLECTOR.history(node, idx, secs)
+            if hist is None: self._send(404, {"error": "no samples for that GPU"})
+            else: self._send(200, {"node": node, "idx": idx, "window_s": secs,
+                                   "interval_s": COLLECTOR.interval, **hist})
+        elif path == "/api/debug/cache":
+            self._send(200, {"overview": SNAPSHOTS.stats(),
+                             **({"replay": REPLAYER.stats()} if REPLAYER else {})})
+        elif path == "/api/debug/timings":
+            self._send(200, TIMINGS.report())
+        elif path == "/api/debug/profile":
+            q = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            try:
+                out = profile(min(120.0, float(q.get("seconds", ["10"])[0])),
+                              min(1000.0, float(q.get("hz", ["100"])[0])))
+            except RuntimeError as e:
+                self._send(409, {"error": str(e)})
+            else:
+                self._send(200, out.encode(), "text/plain; charset=utf-8")
+        elif path == "/api/exporters":
+            self._send(200, exporter_status(detail=True))
         elif path == "/api/drains":
             self._send(200, drain_snapshot())
+        elif path == "/api/drain/check":
+            q = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            try:
+                self._send(200, drain_check(q.get("node", [""])[0]))
+            except ValueError as e:
+                self._send(404, {"error": str(e)})
+            except Exception as e:
+                self._send(502, {"error": str(e)})
         elif path == "/api/join":
             self._send(200, join_info())
         elif path == "/api/add-node/jobs":
@@ -2085,16 +4774,262 @@ class H(BaseHTTPRequestHandler):
             except Exception as e: self._send(502, {"error": str(e)})
         elif path == "/api/app/jobs":
             self._send(200, app_jobs_snapshot())
+        elif path == "/api/maintenance":
+            self._send(200, maint_snapshot())
+        elif path == "/api/jobs":
+            self._send(200, JOBS.stats())
         else: self._send(404, {"error": "not found"})
+    def _stream(self):
+        q, first = STREAM.subscribe()
+        try:
+            if first is None:
+                return self._send(503, {"error": "no snapshot yet"})
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("X-Accel-Buffering", "no")   # nginx: don't buffer the stream
+            self.end_headers()
+            self.wfile.write(b"retry: 3000\n\n" + first)
+            self.wfile.flush()
+            while True:
+                try:
+                    msg = q.get(timeout=15)
+                except queue.Empty:
+                    msg = b": ping\n\n"                   # keeps proxies from idling us out
+                if msg is None:
+                    break
+                self.wfile.write(msg)
+                self.wfile.flush()
+        except OSError:
+            pass                                          # browser tab went away
+        finally:
+            STREAM.unsubscribe(q)
     def do_POST(self):
-        fn = ACTIONS.get(urllib.parse.urlparse(self.path).path)
-        if not fn: return self._send(404, {"error": "not found"})
+        path = urllib.parse.urlparse(self.path).path
+        fn, t = ACTIONS.get(path), time.perf_counter()
+        if not fn:
+            self._send(404, {"error": "not found"})
+            return self._observe("POST", path, t)
+        with TIMINGS.root(f"POST {path}"):
+            try:
+                n = int(self.headers.get("Content-Length", "0"))
+                self._send(200, fn(json.loads(self.rfile.read(n) or b"{}")))
+            except Exception as e:
+                self._send(400, {"error": str(e)})
+        self._observe("POST", path, t)
+        _on_cluster_change()
+
+# ----------------------------------------------------------------- asyncio server
+SERVER = os.environ.get("COCKPIT_SERVER", "async")                  # "threads": ThreadingHTTPServer
+WORKERS = int(os.environ.get("COCKPIT_WORKERS", "16"))
+ACTION_WORKERS = int(os.environ.get("COCKPIT_ACTION_WORKERS", "4"))
+QUEUE_DEPTH = int(os.environ.get("COCKPIT_QUEUE", "64"))
+MAX_CONNS = int(os.environ.get("COCKPIT_MAX_CONNS", "512"))
+KEEPALIVE = float(os.environ.get("COCKPIT_KEEPALIVE", "15"))
+REQUEST_TIMEOUT = float(os.environ.get("COCKPIT_REQUEST_TIMEOUT", "120"))
+MAX_BODY = 1 << 20
+_INLINE = ("/healthz", "/metrics")        # answered on the loop so probes work with full pools
+HTTPD = None
+
+class Busy(Exception):
+    pass
+
+class Pool:
+    """Bounded executor with admission control: `workers` handlers run and up to
+    `depth` wait; past that run() raises Busy and the client gets a 503 at once
+    instead of another thread. A slot is freed when the handler's thread finishes,
+    not when the client gives up, so timed-out work still counts against it."""
+    def __init__(self, name, workers, depth):
+        self.name, self.limit, self.busy = name, workers + depth, 0
+        self.ex = ThreadPoolExecutor(workers, thread_name_prefix=f"http-{name}")
+
+    def _release(self):
+        self.busy -= 1
+
+    async def run(self, fn, *a):
+        if self.busy >= self.limit:
+            HTTP_REJECTED.inc((self.name,))
+            raise Busy(self.name)
+        loop = asyncio.get_running_loop()
+        self.busy += 1
+        fut = self.ex.submit(fn, *a)
+        fut.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wait_for(asyncio.wrap_future(fut), REQUEST_TIMEOUT)
+
+class Exchange(H):
+    """H run on a request the asyncio server has already read. The response is
+    buffered and written back by the loop, so every route and ACTIONS entry works
+    the same under either server."""
+    protocol_version = "HTTP/1.1"
+    def __init__(self, method, target, version, headers, body, client):
+        self.command, self.path, self.request_version = method, target, version
+        self.requestline = f"{method} {target} {version}"
+        self.headers, self.client_address = headers, client
+        self.rfile, self.wfile = io.BytesIO(body), io.BytesIO()
+        conn = headers.get("Connection", "").lower()
+        self.close_connection = conn == "close" or (version != "HTTP/1.1" and conn != "keep-alive")
+
+    def end_headers(self):
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        elif self.request_version != "HTTP/1.1":
+            self.send_header("Connection", "keep-alive")
+        super().end_headers()
+
+    def respond(self):
         try:
-            n = int(self.headers.get("Content-Length", "0"))
-            self._send(200, fn(json.loads(self.rfile.read(n) or b"{}")))
+            getattr(self, "do_" + self.command)()
         except Exception as e:
-            self._send(400, {"error": str(e)})
+            if not self.wfile.tell():
+                self._send(500, {"error": str(e)})
+        return self.wfile.getvalue()
+
+class LoopQueue(queue.Queue):
+    """StreamHub subscriber queue that also wakes an asyncio consumer."""
+    def __init__(self, loop, maxsize=64):
+        super().__init__(maxsize)
+        self.loop, self.ready = loop, asyncio.Event()
+
+    def _put(self, item):
+        super()._put(item)
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            pass                                           # loop closed at shutdown
+
+    def drain(self):
+        out = []
+        while True:
+            try:
+                out.append(self.get_nowait())
+            except queue.Empty:
+                return out
+
+class AsyncServer:
+    """HTTP/1.1 keep-alive server on one asyncio loop. The loop only parses and
+    writes; handlers run in bounded pools — "api" for GETs, "actions" for POSTs,
+    so slow SSH actions can't starve dashboard polls — and /api/stream clients
+    are served from the loop without holding a thread each."""
+    def __init__(self, port=PORT):
+        self.port, self.conns = port, 0
+        self.pools = {"api": Pool("api", WORKERS, QUEUE_DEPTH),
+                      "actions": Pool("actions", ACTION_WORKERS, max(1, QUEUE_DEPTH // 4))}
+
+    async def serve(self):
+        srv = await asyncio.start_server(self._conn, "0.0.0.0", self.port, backlog=256)
+        async with srv:
+            await srv.serve_forever()
+
+    async def _reply(self, w, code, error, close=True, extra=()):
+        body = json.dumps({"error": error}).encode()
+        head = [f"HTTP/1.1 {code} {http.client.responses.get(code, '')}",
+                "Content-Type: application/json", f"Content-Length: {len(body)}", *extra]
+        if close:
+            head.append("Connection: close")
+        w.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await w.drain()
+        return not close
+
+    async def _conn(self, r, w):
+        if self.conns >= MAX_CONNS:
+            try:
+                await self._reply(w, 503, "too many connections", extra=("Retry-After: 1",))
+            except ConnectionError:
+                pass
+            w.close()
+            return
+        self.conns += 1
+        try:
+            while await self._request(r, w):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError):
+            pass                                           # client went away or stalled mid-request
+        finally:
+            self.conns -= 1
+            w.close()
+
+    async def _request(self, r, w):
+        """Serve one request; True keeps the connection open for the next."""
+        try:
+            head = await asyncio.wait_for(r.readuntil(b"\r\n\r\n"), KEEPALIVE)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False                                   # idle keep-alive expired or clean close
+        line, _, rest = head.partition(b"\r\n")
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            return await self._reply(w, 400, "bad request line")
+        method, target, version = parts
+        headers = http.client.parse_headers(io.BytesIO(rest))
+        if "Transfer-Encoding" in headers:
+            return await self._reply(w, 411, "Content-Length required")
+        try:
+            n = int(headers.get("Content-Length") or 0)
+        except ValueError:
+            return await self._reply(w, 400, "bad Content-Length")
+        if n > MAX_BODY:
+            return await self._reply(w, 413, "request body too large")
+        body = await asyncio.wait_for(r.readexactly(n), REQUEST_TIMEOUT) if n else b""
+        path = urllib.parse.urlparse(target).path
+        if method == "GET" and path == "/api/stream":
+            await self._stream(w)
+            return False
+        if method not in ("GET", "POST"):
+            return await self._reply(w, 501, f"{method} not supported", close=False)
+        ex = Exchange(method, target, version, headers, body, w.get_extra_info("peername"))
+        try:
+            if method == "GET" and path in _INLINE:
+                out = ex.respond()
+            else:
+                out = await self.pools["actions" if method == "POST" else "api"].run(ex.respond)
+        except Busy as e:
+            return await self._reply(w, 503, f"server busy ({e} pool full)", close=False,
+                                     extra=("Retry-After: 1",))
+        except asyncio.TimeoutError:
+            return await self._reply(w, 504, f"handler did not finish in {REQUEST_TIMEOUT:g}s")
+        w.write(out)
+        await w.drain()                                    # backpressure: slow readers pause us
+        return not ex.close_connection
+
+    async def _stream(self, w):
+        q = LoopQueue(asyncio.get_running_loop())
+        try:
+            q, first = await self.pools["api"].run(STREAM.subscribe, q)
+        except Busy:
+            return await self._reply(w, 503, "server busy", extra=("Retry-After: 3",))
+        try:
+            if first is None:
+                return await self._reply(w, 503, "no snapshot yet")
+            w.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-store\r\n"
+                    b"X-Accel-Buffering: no\r\nConnection: close\r\n\r\nretry: 3000\n\n" + first)
+            await w.drain()
+            while True:
+                try:
+                    await asyncio.wait_for(q.ready.wait(), 15)
+                except asyncio.TimeoutError:
+                    w.write(b": ping\n\n")                 # keeps proxies from idling us out
+                else:
+                    q.ready.clear()
+                    for msg in q.drain():
+                        if msg is None:
+                            return                         # too slow — dropped by the hub
+                        w.write(msg)
+                await w.drain()
+        finally:
+            STREAM.unsubscribe(q)
 
 if __name__ == "__main__":
-    print(f"Fleet Command on :{PORT}  [{'DEMO (fake data)' if DEMO else 'live cluster'}]", flush=True)
-    ThreadingHTTPServer(("0.0.0.0", PORT), H).serve_forever()
+    mode = "DEMO (fake data)" if DEMO else f"replaying {REPLAY}" if REPLAYER else "live cluster"
+    print(f"Fleet Command on :{PORT}  [{mode}{f', recording to {RECORD}' if RECORDER else ''}]", flush=True)
+    if RECORDER or JOBS.store.spec != "off":   # SIGTERM (pod stop) exits cleanly: trace closed, jobs saved
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if RECORDER:
+        atexit.register(RECORDER.close)
+    start_informers()
+    COLLECTOR.start()
+    JOBS.start()
+    if SERVER == "threads":
+        ThreadingHTTPServer(("0.0.0.0", PORT), H).serve_forever()
+    else:
+        HTTPD = AsyncServer(PORT)
+        asyncio.run(HTTPD.serve())
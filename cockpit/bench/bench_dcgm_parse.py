@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Microbenchmark: the original str/regex DCGM parser vs app.parse_dcgm over an
+8-GPU dcgm-exporter payload. The payload is synthesized to match what
+dcgm-exporter 3.x serves with the default counters CSV (HELP/TYPE pairs, ~35
+DCGM series per GPU, Go/process runtime series), since captures from the lab
+can't ship with the repo. Pass --file to time a real `curl :9400/metrics` dump.
+
+  python3 cockpit/bench/bench_dcgm_parse.py [--gpus 8] [--iters 2000] [--file metrics.txt]
+"""
+import argparse, json, re, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+
+# default-counters.csv field set; the ones in app.DCGM are a subset
+FIELDS = ["DCGM_FI_DEV_SM_CLOCK", "DCGM_FI_DEV_MEM_CLOCK", "DCGM_FI_DEV_MEMORY_TEMP",
+          "DCGM_FI_DEV_GPU_TEMP", "DCGM_FI_DEV_POWER_USAGE", "DCGM_FI_DEV_TOTAL_ENERGY_CONSUMPTION",
+          "DCGM_FI_DEV_PCIE_REPLAY_COUNTER", "DCGM_FI_DEV_GPU_UTIL", "DCGM_FI_DEV_MEM_COPY_UTIL",
+          "DCGM_FI_DEV_ENC_UTIL", "DCGM_FI_DEV_DEC_UTIL", "DCGM_FI_DEV_XID_ERRORS",
+          "DCGM_FI_DEV_FB_FREE", "DCGM_FI_DEV_FB_USED", "DCGM_FI_DEV_FB_RESERVED",
+          "DCGM_FI_DEV_NVLINK_BANDWIDTH_TOTAL", "DCGM_FI_DEV_VGPU_LICENSE_STATUS",
+          "DCGM_FI_DEV_UNCORRECTABLE_REMAPPED_ROWS", "DCGM_FI_DEV_CORRECTABLE_REMAPPED_ROWS",
+          "DCGM_FI_DEV_ROW_REMAP_FAILURE", "DCGM_FI_PROF_GR_ENGINE_ACTIVE",
+          "DCGM_FI_PROF_PIPE_TENSOR_ACTIVE", "DCGM_FI_PROF_DRAM_ACTIVE",
+          "DCGM_FI_PROF_PCIE_TX_BYTES", "DCGM_FI_PROF_PCIE_RX_BYTES"]
+
+def synth_payload(gpus):
+    out = []
+    for f in FIELDS:
+        out.append(f"# HELP {f} {f.split('_FI_')[1].replace('_', ' ').lower()}.")
+        out.append(f"# TYPE {f} {'counter' if 'ENERGY' in f or 'ERRORS' in f else 'gauge'}")
+        for g in range(gpus):
+            pod = (f',container="vllm",namespace="default",pod="llama-nexus-7f9c{g // 2}"'
+                   if g % 3 else "")
+            out.append(f'{f}{{gpu="{g}",UUID="GPU-{g:08x}-3c1e-8d6a-4b0f-9e2d5a7c1b{g:02d}",'
+                       f'device="nvidia{g}",modelName="NVIDIA GeForce RTX 3090 Ti",'
+                       f'Hostname="trx40-beast",DCGM_FI_DRIVER_VERSION="550.90.07"{pod}}} '
+                       f'{(g * 37 + len(f)) % 100 + 0.0}')
+    for i in range(60):                       # Go runtime / process collectors
+        out.append(f"# HELP go_gc_duration_seconds_{i} runtime stat.")
+        out.append(f'go_gc_duration_seconds_{i}{{quantile="0.5"}} 1.2e-05')
+    return ("\n".join(out) + "\n").encode()
+
+_LINE = re.compile(r'^(\w+)\{([^}]*)\}\s+([0-9.eE+-]+)')
+def legacy_parse(body):
+    """The pre-change scrape_dcgm() body, verbatim after the HTTP read."""
+    text = body.decode(errors="replace")
+    gpus = {}
+    for line in text.splitlines():
+        m = _LINE.match(line)
+        if not m or m.group(1) not in app.DCGM: continue
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', m.group(2)))
+        idx = labels.get("gpu", "0")
+        slot = gpus.setdefault(idx, {"idx": idx})
+        slot[app.DCGM[m.group(1)]] = float(m.group(3))
+        if labels.get("UUID"):
+            slot["uuid"] = labels["UUID"]
+        if labels.get("modelName"):
+            slot["model"] = labels["modelName"]
+        for k in ("pod", "namespace", "container"):
+            if labels.get(k):
+                slot[k] = labels[k]
+    return gpus
+
+def _time(fn, iters):
+    t = time.process_time()
+    for _ in range(iters): fn()
+    return 1e6 * (time.process_time() - t) / iters
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--gpus", type=int, default=8)
+    ap.add_argument("--iters", type=int, default=2000)
+    ap.add_argument("--file", help="parse a captured exporter body instead of the synthetic one")
+    a = ap.parse_args()
+    body = Path(a.file).read_bytes() if a.file else synth_payload(a.gpus)
+    assert legacy_parse(body) == app.parse_dcgm(body.splitlines()), "parsers disagree"
+    old = _time(lambda: legacy_parse(body), a.iters)
+    new = _time(lambda: app.parse_dcgm(body.splitlines()), a.iters)
+    print(json.dumps({"payload_bytes": len(body), "lines": body.count(b"\n"),
+                      "legacy_us": round(old, 1), "parse_dcgm_us": round(new, 1),
+                      "speedup": round(old / new, 2)}))
+
+if __name__ == "__main__":
+    main()
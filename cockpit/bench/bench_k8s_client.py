@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Microbenchmark: per-call urllib (the old k8s()) vs the pooled K8sClient, both
+against a local fake API server. Uses TLS with a throwaway self-signed cert when
+openssl is on PATH — the handshake is the cost we care about — else plain HTTP.
+
+  python3 cockpit/bench/bench_k8s_client.py [--calls 300] [--threads 4] [--nodes 50]
+"""
+import argparse, json, os, shutil, ssl, subprocess, sys, tempfile, threading, time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+def _nodes_body(n):
+    return json.dumps({"kind": "NodeList", "items": [
+        {"metadata": {"name": f"node-{i}", "labels": {"gpu.homelab/tier": "training"}},
+         "spec": {}, "status": {"conditions": [{"type": "Ready", "status": "True"}],
+                                "allocatable": {"cpu": "32", "nvidia.com/gpu": "4"}}}
+        for i in range(n)]}).encode()
+
+def _serve(body, tls_dir):
+    class Fake(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"           # keep-alive, like the real API server
+        disable_nagle_algorithm = True
+        def log_message(self, *a): pass
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Fake)
+    srv.daemon_threads = True
+    if tls_dir:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(tls_dir / "ca.crt", tls_dir / "tls.key")
+        srv.socket = ctx.wrap_socket(srv.socket, server_side=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def _self_signed(d):
+    if not shutil.which("openssl"):
+        return False
+    r = subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+                        "-keyout", str(d / "tls.key"), "-out", str(d / "ca.crt")],
+                       capture_output=True)
+    return r.returncode == 0
+
+def _legacy_k8s(api, sa):
+    """Verbatim shape of the pre-pool k8s(): token read, new context, new TLS socket."""
+    def call(method, path):
+        token = Path(f"{sa}/token").read_text().strip()
+        ctx = ssl.create_default_context(cafile=f"{sa}/ca.crt") if api.startswith("https") else None
+        req = urllib.request.Request(api + path, method=method,
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+        with urllib.request.urlopen(req, context=ctx, timeout=15) as r:
+            return json.loads(r.read() or b"{}")
+    return call
+
+def _run(fn, calls, threads):
+    lat = []
+    def one(_):
+        t = time.perf_counter()
+        fn("GET", "/api/v1/nodes")
+        lat.append(time.perf_counter() - t)
+    cpu, wall = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(one, range(calls)))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    lat.sort()
+    return {"calls_per_s": round(calls / wall), "p50_ms": round(1000 * lat[len(lat) // 2], 2),
+            "p99_ms": round(1000 * lat[int(len(lat) * .99) - 1], 2),
+            "cpu_ms_per_call": round(1000 * cpu / calls, 3)}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--calls", type=int, default=300)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--nodes", type=int, default=50, help="items in the fake NodeList")
+    a = ap.parse_args()
+    sa = Path(tempfile.mkdtemp(prefix="cockpit-bench-sa-"))
+    (sa / "token").write_text("bench-token\n")
+    tls = _self_signed(sa)
+    srv = _serve(_nodes_body(a.nodes), sa if tls else None)
+    api = f"{'https' if tls else 'http'}://localhost:{srv.server_address[1]}"
+    os.environ.update(COCKPIT_K8S_API=api, COCKPIT_SA_DIR=str(sa))
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import app
+    print(f"fake API {api}  ({a.nodes} nodes, {a.calls} calls, {a.threads} threads)")
+    for name, fn in (("urllib per call", _legacy_k8s(api, sa)), ("K8sClient pool", app.k8s)):
+        print(f"  {name:<16} {json.dumps(_run(fn, a.calls, a.threads))}")
+    srv.shutdown()
+    shutil.rmtree(sa, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
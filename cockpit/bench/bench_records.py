@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Memory and encoding benchmark: slotted records with cached JSON fragments vs the
+plain row dicts they replaced, at 50 nodes x 8 GPUs (override with flags). Rows
+come from app.flatten_gpus() over a synthetic fleet; the "dict" side is the same
+rows as plain dicts encoded with json.dumps, i.e. what /api/overview used to do
+(its snapshot figure includes a to_dict() per row, so it is an upper bound).
+
+  python3 cockpit/bench/bench_records.py [--nodes 50] [--gpus 8] [--churn 0.1]
+"""
+import argparse, json, random, sys, time, tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+
+def fleet(n_nodes, n_gpus, rnd):
+    nodes = [app.NodeRow(name=f"gpu-{i:03d}", internal_ip=f"10.0.{i // 250}.{i % 250}", ready=True,
+                         offline=False, offline_reason="", control=False, unschedulable=False,
+                         cpu="64", ram="256", gpu_product="RTX-3090-Ti", gpus=n_gpus,
+                         gpu_allocatable=n_gpus, vram="24", cc="8.6", tier="training",
+                         cpu_tier="performance", gpu_used=n_gpus // 2, driver_pending=False,
+                         gpu_registering=False, gpu_status_msg="",
+                         storage={"longhorn": None, "ephemeral_gib": 931.5, "disk_pressure": False})
+             for i in range(n_nodes)]
+    tel = {n.name: [{"idx": str(g), "util": float(rnd.randint(0, 100)), "temp": 60.0, "power": 250.0,
+                     "vram_used": 12000.0, "vram_free": 12576.0, "sm_clock": 1860.0,
+                     "mem_clock": 10501.0, "mem_util": 30.0, "uuid": f"GPU-{i:04d}-{g}",
+                     "model": "NVIDIA GeForce RTX 3090 Ti"} for g in range(n_gpus)]
+           for i, n in enumerate(nodes)}
+    pods = {n.name: [{"ns": "ml", "name": f"train-{n.name}-{k}", "gpus": 2} for k in range(n_gpus // 4)]
+            for n in nodes}
+    return nodes, tel, pods
+
+def churn(tel, frac, rnd):
+    for gpus in tel.values():
+        for g in gpus:
+            if rnd.random() < frac: g["util"] = float(rnd.randint(0, 100))
+
+def payload(nodes, gpus):
+    return {"nodes": nodes, "gpus": gpus}
+
+def _per_call(fn, iters):
+    t = time.perf_counter()
+    for _ in range(iters): fn()
+    return round(1e3 * (time.perf_counter() - t) / iters, 3)
+
+def _size(build):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return keep, size
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--nodes", type=int, default=50)
+    ap.add_argument("--gpus", type=int, default=8)
+    ap.add_argument("--churn", type=float, default=0.1, help="share of GPUs whose util changes per tick")
+    ap.add_argument("--iters", type=int, default=200)
+    a = ap.parse_args()
+    rnd = random.Random(7)
+    nodes, tel, pods = fleet(a.nodes, a.gpus, rnd)
+
+    cards = app.flatten_gpus(nodes, tel, pods)
+    as_dicts = lambda: payload([n.to_dict() for n in nodes], [c.to_dict() for c in cards])
+    assert json.loads(app.encode_json(payload(nodes, cards))) == json.loads(json.dumps(as_dicts()))
+
+    _, dict_bytes = _size(lambda: [c.to_dict() for c in cards])
+    _, rec_bytes = _size(lambda: [app.GpuCard(**c.to_dict()) for c in cards])
+    plain = as_dicts()
+    out = {"fleet": f"{a.nodes}x{a.gpus}",
+           "gpu_rows_bytes": {"dict": dict_bytes, "record": rec_bytes},
+           "encode_ms": {"json.dumps dicts": _per_call(lambda: json.dumps(plain), a.iters)}}
+
+    def cold():
+        for c in cards: c._json = None
+        for n in nodes: n._json = None
+        return app.encode_json(payload(nodes, cards))
+    out["encode_ms"]["records, cold"] = _per_call(cold, a.iters)
+    out["encode_ms"]["records, cached"] = _per_call(lambda: app.encode_json(payload(nodes, cards)), a.iters)
+
+    def tick():
+        churn(tel, a.churn, rnd)
+        return app.encode_json(payload(nodes, app.flatten_gpus(nodes, tel, pods)))
+    def tick_dicts():
+        churn(tel, a.churn, rnd)
+        return json.dumps(payload([n.to_dict() for n in nodes],
+                                  [c.to_dict() for c in app.flatten_gpus(nodes, tel, pods)]))
+    out["snapshot_ms"] = {f"flatten+encode, {a.churn:.0%} churn": _per_call(tick, a.iters // 4),
+                          "same via dicts + json.dumps": _per_call(tick_dicts, a.iters // 4)}
+    print(json.dumps(out, indent=1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Backend benchmark suite over synthetic fleets (fleet.py) at 10/100/1000 nodes:
+flatten_gpus, cluster_summary, the owner index
+build that replaced _deployment_pod_nodes, the whole overview(), and encoding its
+payload (encode_json vs plain json.dumps). overview() runs in-process against
+synced informer stores, a filled Longhorn/join-secret cache and a collector
+holding one DCGM pass per node — the steady state of a live cockpit, no network.
+
+Writes machine-readable results; with --baseline prints per-case ratios and exits
+1 when any median is more than --threshold slower (a regression gate). Every timed run
+is paired with a run of a fixed pure-Python reference and medians are compared
+relative to it, so a baseline recorded on one machine gates on another.
+
+  python3 cockpit/bench/bench_suite.py [--sizes 10,100,1000] [--gpus 8] [--out results.json]
+  python3 cockpit/bench/bench_suite.py --baseline cockpit/bench/baseline.json [--threshold 0.25]
+  python3 cockpit/bench/bench_suite.py --out cockpit/bench/baseline.json   # refresh the baseline
+"""
+import argparse, json, platform, random, statistics, sys, time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+import app, fleet
+
+RESOURCES = {"nodes": "/api/v1/nodes", "pods": "/api/v1/pods", "deployments": "/apis/apps/v1/deployments",
+             "replicasets": "/apis/apps/v1/replicasets", "statefulsets": "/apis/apps/v1/statefulsets",
+             "jobs": "/apis/batch/v1/jobs"}
+
+def install(f):
+    """Point the app's module state at fleet `f`: synced informers, owner index,
+    SWR caches, collector sample, drains, and fresh summary/record caches."""
+    by_path = {p.split("?")[0]: f.items[r] for r, p in RESOURCES.items()}
+    by_path["/api/v1/namespaces/cockpit/secrets/cockpit-join"] = f.items["secrets"][0]
+    by_path["/apis/longhorn.io/v1beta2/namespaces/longhorn-system/nodes"] = {"items": f.items["longhorn"]}
+    by_path["/apis/longhorn.io/v1beta2"] = {}
+    def k8s(method, path, body=None, content_type="application/json"):
+        obj = by_path[path.split("?")[0]]
+        return {"items": obj} if isinstance(obj, list) else obj
+    app.k8s = k8s
+    app.INFORMERS.clear()
+    app.OWNERS = app.OwnerIndex()
+    for name, path in RESOURCES.items():
+        inf = app.INFORMERS[name] = app.Informer(name, path)
+        inf.store = {app._obj_key(o): o for o in f.items[name]}
+        inf.synced.set()
+    for rs in f.items["replicasets"]: app.OWNERS.on_replicaset("ADDED", rs)
+    for p in f.items["pods"]: app.OWNERS.on_pod("ADDED", p)
+    for c in app.CACHED.values(): c.invalidate()
+    c = app.COLLECTOR
+    c.latest = {n: sorted(app.parse_dcgm(f.metrics(n).splitlines()).values(), key=lambda g: int(g["idx"]))
+                for n in f.dcgm}
+    c.ts, c._started = time.time(), True
+    c.ready.set()
+    with app._DLOCK:
+        app.DRAINS.clear()
+        app.DRAINS.update({k: dict(v) for k, v in f.drains.items()})
+    app._LIVE_RECORDS.clear()
+
+def timeit(fn, budget=0.5, min_runs=7, max_runs=200):
+    """Median/p95 of fn, plus the median of reference() run just before each
+    call — the same CPU, clocks and neighbours the case saw."""
+    runs, refs, t0 = [], [], time.perf_counter()
+    while len(runs) < min_runs or (len(runs) < max_runs and time.perf_counter() - t0 < budget):
+        t = time.perf_counter()
+        reference()
+        refs.append((time.perf_counter() - t) * 1000)
+        t = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t) * 1000)
+    runs.sort()
+    return {"median_ms": round(statistics.median(runs), 3),
+            "p95_ms": round(runs[min(len(runs) - 1, int(len(runs) * .95))], 3), "runs": len(runs),
+            "ref_ms": round(statistics.median(refs), 3)}
+
+def reference():
+    """Fixed work in the backend's own idiom (build dicts, sort, encode) — a yardstick
+    for how fast this interpreter and machine are, not a measure of the cockpit."""
+    rows = [{"name": f"node-{i:04d}", "gpus": i % 8, "labels": {"tier": str(i % 3), "zone": "a"}}
+            for i in range(300)]
+    rows.sort(key=lambda r: (r["gpus"], r["name"]))
+    json.dumps(rows)
+
+def bench_size(n, gpus, seed):
+    f = fleet.generate(n, gpus, seed=seed)
+    install(f)
+    snap = app.overview()                                      # warms caches, owner index, records
+    nodes, tel, pbn = snap["nodes"], snap["telemetry"], snap["pods_by_node"]
+    gpus_rows, wl, drains = snap["gpus"], snap["workloads"], snap["drains"]
+    running = [p for p in f.items["pods"] if p["status"]["phase"] == "Running"]
+    rnd = random.Random(seed)
+    def tick():                                                # ~5% of GPU samples move, as between scrapes
+        for samples in app.COLLECTOR.latest.values():
+            for g in samples:
+                if rnd.random() < .05: g["util"] = float(rnd.randint(0, 100))
+        app.overview()
+    plain = {"nodes": [r.to_dict() for r in nodes], "gpus": [r.to_dict() for r in gpus_rows],
+             "workloads": [r.to_dict() for r in wl], **{k: v for k, v in snap.items()
+                                                       if k not in ("nodes", "gpus", "workloads")}}
+    cases = {
+        "flatten_gpus": lambda: app.flatten_gpus(nodes, tel, pbn),
+        "cluster_summary": lambda: app.cluster_summary(nodes, gpus_rows, wl, drains, tel),
+        "owner_index_build": lambda: app.OwnerIndex.build(running, f.items["replicasets"]),
+        "overview": app.overview,
+        "encode_json": lambda: app.encode_json(snap),
+        "json_dumps_dicts": lambda: json.dumps(plain),
+        "overview_after_tick": tick,
+    }
+    out = {name: timeit(fn) for name, fn in cases.items()}
+    out["payload_kb"] = round(len(app.encode_json(snap)) / 1024, 1)
+    return out
+
+def compare(results, baseline, threshold):
+    """A case's ratio is divided by its reference ratio, so only slowdowns relative
+    to the machine count. A baseline without reference timings is compared raw.
+    Returns (ok, normalised)."""
+    worst, rows, normalised = 0.0, [], True
+    for size, cases in results.items():
+        for name, r in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if not isinstance(r, dict) or not isinstance(base, dict) or not base.get("median_ms"):
+                continue
+            speed = r["ref_ms"] / base["ref_ms"] if base.get("ref_ms") else 1.0
+            normalised = normalised and bool(base.get("ref_ms"))
+            ratio = r["median_ms"] / base["median_ms"] / speed
+            worst = max(worst, ratio)
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            rows.append(f"  {size:>5} {name:<22} {base['median_ms']:>10.3f} {r['median_ms']:>10.3f} "
+                        f"{ratio:>6.2f}x{flag}")
+    print(f"  {'nodes':>5} {'case':<22} {'base ms':>10} {'now ms':>10} {'ratio':>7}  (relative to the reference)")
+    print("\n".join(rows))
+    return worst <= 1 + threshold, normalised
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="10,100,1000")
+    ap.add_argument("--gpus", type=int, default=8, help="GPUs per worker node")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="compare medians against this results JSON")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    a = ap.parse_args()
+    results = {}
+    for n in (int(s) for s in a.sizes.split(",")):
+        results[str(n)] = r = bench_size(n, a.gpus, a.seed)
+        print(f"{n:>5} nodes  " + "  ".join(f"{k}={v['median_ms']}" for k, v in r.items()
+                                             if isinstance(v, dict)) + f"  payload={r['payload_kb']}KB")
+    doc = {"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                    "gpus_per_node": a.gpus, "seed": a.seed,
+                    "when": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+           "results": results}
+    if a.out:
+        Path(a.out).write_text(json.dumps(doc, indent=1) + "\n")
+    if a.baseline:
+        ok, normalised = compare(results, json.loads(Path(a.baseline).read_text())["results"],
+                                 a.threshold)
+        if not normalised:
+            print("baseline has no reference timing — raw medians compared, warning only "
+                  "(re-record it with --out)")
+        sys.exit(0 if ok or not normalised else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Kubernetes API server (plain HTTP), serving a generated
+fleet (fleet.py) so the cockpit's real request path — K8sClient, informers,
+drains, actions — can be load-tested without a cluster. Also serves one DCGM
+exporter /metrics per GPU node on its 127.0.x.y pod IP (Linux routes all of
+127/8 to loopback), for the cockpit's collector to scrape.
+
+API coverage: list/get/watch for nodes, pods, secrets, deployments, replicasets,
+statefulsets, jobs, PodDisruptionBudgets and Longhorn nodes; fieldSelector (status.phase,
+spec.nodeName, metadata.name) and labelSelector (k=v[,k=v]); PATCH on nodes and
+deployments (merge/strategic patches treated as JSON merge) and deployments/scale;
+pod eviction (429 at --pdb-rate; evicted pods stay terminating for ~--grace
+seconds); pods/exec over the v4.channel.k8s.io WebSocket protocol, run as a local
+`sh` in a per-pod scratch directory (so relative paths stand in for the
+container's filesystem); node DELETE. Watches resume from resourceVersion and answer 410
+when it has aged out of the event log. Every request is counted by verb and
+resource at GET /_fake/stats (POST /_fake/reset zeroes it).
+
+  python3 cockpit/bench/fake_api.py --nodes 100 [--latency 20 --jitter 10 --error-rate .01]
+  # then: COCKPIT_K8S_API=http://127.0.0.1:6443 COCKPIT_SA_DIR=<dir with a token file> \\
+  #       COCKPIT_DCGM_PORT=9400 python3 cockpit/app.py
+"""
+import argparse, base64, collections, copy, hashlib, json, random, re, socket, subprocess, sys, tempfile
+import threading, time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import fleet
+
+# (api group, resource) -> fleet.items key
+KINDS = {("", "nodes"): "nodes", ("", "pods"): "pods", ("", "secrets"): "secrets", ("", "configmaps"): "configmaps",
+         ("apps", "deployments"): "deployments", ("apps", "replicasets"): "replicasets",
+         ("apps", "statefulsets"): "statefulsets", ("batch", "jobs"): "jobs",
+         ("policy", "poddisruptionbudgets"): "pdbs",
+         ("longhorn.io", "nodes"): "longhorn"}
+_PATH = re.compile(r"/(?:api/v1|apis/([^/]+)/[^/]+)(?:/namespaces/([^/]+))?/([^/]+)(?:/([^/]+))?(?:/([^/]+))?")
+EVENT_LOG = 20000                 # watch history kept; older resourceVersions get 410
+
+def _merge(dst, patch):
+    for k, v in patch.items():
+        if v is None: dst.pop(k, None)
+        elif isinstance(v, dict) and isinstance(dst.get(k), dict): _merge(dst[k], v)
+        else: dst[k] = copy.deepcopy(v)
+
+def _field(obj, path):
+    for part in path.split("."):
+        obj = obj.get(part) if isinstance(obj, dict) else None
+    return "" if obj is None else str(obj)
+
+def _selector(q):
+    """Query string -> predicate over objects (field and label selectors ANDed)."""
+    tests = []
+    for expr in filter(None, q.get("fieldSelector", [""])[0].split(",")):
+        k, _, v = expr.partition("=")
+        neg = k.endswith("!")
+        tests.append(lambda o, k=k.rstrip("!"), v=v, neg=neg: (_field(o, k) == v) != neg)
+    for expr in filter(None, q.get("labelSelector", [""])[0].split(",")):
+        k, _, v = expr.partition("=")
+        tests.append(lambda o, k=k, v=v: o["metadata"].get("labels", {}).get(k) == v)
+    return lambda o: all(t(o) for t in tests)
+
+class Cluster:
+    """Mutable fleet state + the event log that watches read from. One lock; a
+    Condition wakes watchers on every change."""
+    def __init__(self, f, latency=0.0, jitter=0.0, error_rate=0.0, pdb_rate=0.0, seed=0, grace=0.0):
+        self.f, self.rnd = f, random.Random(seed)
+        self.latency, self.jitter, self.error_rate, self.pdb_rate = latency, jitter, error_rate, pdb_rate
+        self.grace = grace
+        self.objs = {k: {self.key(o): o for o in items} for k, items in f.items.items()}
+        self.log = collections.deque(maxlen=EVENT_LOG)        # (rv, kind, type, obj)
+        self.cond = threading.Condition()
+        self.calls, self.dcgm_scrapes = collections.Counter(), collections.Counter()
+        self._count_lock = threading.Lock()
+        self.started, self._scratch = time.time(), None
+
+    def scratch(self, ns, name):
+        """Working directory standing in for pod ns/name's filesystem under exec."""
+        with self._count_lock:
+            self._scratch = self._scratch or Path(tempfile.mkdtemp(prefix="fake-api-exec-"))
+        d = self._scratch / ns / name
+        d.mkdir(parents=True, exist_ok=True)
+        return d
+
+    @staticmethod
+    def key(o):
+        md = o["metadata"]
+        return (md.get("namespace", ""), md["name"])
+
+    def rv(self):
+        return str(self.f.rv)
+
+    def emit(self, kind, type_, obj):
+        """Record a change (caller holds cond)."""
+        obj["metadata"]["resourceVersion"] = self.f.next_rv()
+        self.log.append((self.f.rv, kind, type_, copy.deepcopy(obj)))
+        self.cond.notify_all()
+
+    def terminate(self, kind, key):
+        """Evicted pod: marked terminating now, DELETED after ~`grace` seconds (caller holds cond)."""
+        obj = self.objs[kind][key]
+        if not self.grace:
+            del self.objs[kind][key]
+            return self.emit(kind, "DELETED", obj)
+        if "deletionTimestamp" not in obj["metadata"]:
+            obj["metadata"]["deletionTimestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            self.emit(kind, "MODIFIED", obj)
+            threading.Timer(self.grace * self.rnd.uniform(.5, 1.5), self._remove, (kind, key)).start()
+
+    def _remove(self, kind, key):
+        with self.cond:
+            obj = self.objs[kind].pop(key, None)
+            if obj is not None:
+                self.emit(kind, "DELETED", obj)
+
+    def list(self, kind, ns, pred):
+        with self.cond:
+            items = [o for (ons, _), o in self.objs[kind].items() if (not ns or ons == ns) and pred(o)]
+            return json.dumps({"kind": "List", "apiVersion": "v1",
+                               "metadata": {"resourceVersion": self.rv()}, "items": items}).encode()
+
+    def events_after(self, kind, rv):
+        """Events for `kind` newer than rv, or None when rv predates the log."""
+        if self.log and rv < self.log[0][0] - 1:
+            return None
+        return [e for e in self.log if e[0] > rv and e[1] == kind]
+
+    def churn(self, rate, stop):
+        """Background MODIFIED events (`rate` per second) on random nodes and pods,
+        plus DCGM sample drift — keeps informers and snapshot invalidation busy."""
+        while not stop.wait(1 / rate if rate else 1):
+            self.f.tick(self.rnd, 0.1)
+            if not rate: continue
+            with self.cond:
+                kind = self.rnd.choice(("nodes", "pods"))
+                obj = self.rnd.choice(list(self.objs[kind].values()))
+                obj["metadata"].setdefault("annotations", {})["fake/touched"] = str(time.time())
+                self.emit(kind, "MODIFIED", obj)
+
+    def count(self, counter, key):
+        with self._count_lock: counter[key] += 1
+
+    def stats(self):
+        with self._count_lock:
+            calls, scrapes = dict(self.calls), sum(self.dcgm_scrapes.values())
+        return {"calls": calls, "total": sum(calls.values()), "dcgm_scrapes": scrapes, "rv": self.f.rv,
+                "uptime_s": round(time.time() - self.started, 1)}
+
+def api_handler(c):
+    class Api(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        def log_message(self, *a): pass
+
+        def _json(self, code, body):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _status(self, code, reason, msg):
+            self._json(code, {"kind": "Status", "apiVersion": "v1", "status": "Failure",
+                              "message": msg, "reason": reason, "code": code})
+
+        def _route(self, verb):
+            u = urllib.parse.urlsplit(self.path)
+            q = urllib.parse.parse_qs(u.query)
+            if u.path.startswith("/_fake/"):
+                if u.path == "/_fake/reset":
+                    with c._count_lock:
+                        c.calls.clear()
+                        c.dcgm_scrapes.clear()
+                return self._json(200, c.stats())
+            m = _PATH.fullmatch(u.path)
+            if u.path.startswith("/apis/") and u.path.count("/") == 3:      # group discovery
+                c.count(c.calls, f"{verb} discovery")
+                return self._json(200 if u.path.split("/")[2] in {g for g, _ in KINDS} else 404,
+                                  {"kind": "APIResourceList", "groupVersion": u.path[6:]})
+            kind = m and KINDS.get((m.group(1) or "", m.group(3)))
+            watch = q.get("watch", [""])[0] in ("1", "true")
+            c.count(c.calls, f"{'WATCH' if watch else verb} {kind or u.path}")
+            if c.latency or c.jitter:
+                time.sleep(max(0.0, c.latency + c.rnd.uniform(-c.jitter, c.jitter)) / 1000)
+            if not kind:
+                return self._status(404, "NotFound", f"the server could not find {u.path}")
+            if not watch and c.rnd.random() < c.error_rate:
+                return self._status(500, "InternalError", "injected failure")
+            ns, name, sub = m.group(2) or "", m.group(4), m.group(5)
+            if kind == "pods" and sub == "exec" and verb == "GET":
+                return self._exec(ns, name, q)
+            if watch:
+                return self._watch(kind, ns, _selector(q), q)
+            body = None
+            if verb in ("POST", "PATCH", "PUT"):
+                n = int(self.headers.get("Content-Length", "0") or 0)
+                body = json.loads(self.rfile.read(n) or b"{}")
+            if name is None and verb == "POST" and kind == "configmaps":
+                with c.cond:
+                    key = (ns, body["metadata"]["name"])
+                    if key in c.objs[kind]:
+                        return self._status(409, "AlreadyExists", f'{kind} "{key[1]}" already exists')
+                    c.objs[kind][key] = body
+                    c.emit(kind, "ADDED", body)
+                    return self._json(201, body)
+            if name is None:
+                if verb != "GET": return self._status(405, "MethodNotAllowed", verb)
+                return self._json(200, c.list(kind, ns, _selector(q)))
+            with c.cond:
+                obj = c.objs[kind].get((ns, name))
+                if obj is None:
+                    return self._status(404, "NotFound", f'{kind} "{name}" not found')
+                if verb == "GET" and not sub:
+                    return self._json(200, obj)
+                if verb == "DELETE" and not sub:
+                    del c.objs[kind][(ns, name)]
+                    c.emit(kind, "DELETED", obj)
+                    return self._json(200, obj)
+                if verb == "PATCH" and sub == "scale" and kind in ("deployments", "statefulsets"):
+                    n = int(body.get("spec", {}).get("replicas", 0))
+                    obj["spec"]["replicas"] = n
+                    obj["status"].update(replicas=n, readyReplicas=n)
+                    c.emit(kind, "MODIFIED", obj)
+                    return self._json(200, {"kind": "Scale", "spec": {"replicas": n}})
+                if verb == "PUT" and not sub:
+                    c.objs[kind][(ns, name)] = body
+                    c.emit(kind, "MODIFIED", body)
+                    return self._json(200, body)
+                if verb == "PATCH" and not sub:
+                    _merge(obj, body)
+                    c.emit(kind, "MODIFIED", obj)
+                    return self._json(200, obj)
+                if verb == "POST" and sub == "eviction" and kind == "pods":
+                    if c.rnd.random() < c.pdb_rate:
+                        return self._status(429, "TooManyRequests",
+                                            "Cannot evict pod as it would violate the pod's disruption budget.")
+                    c.terminate(kind, (ns, name))
+                    return self._json(201, {"kind": "Status", "status": "Success"})
+            return self._status(405, "MethodNotAllowed", f"{verb} {u.path}")
+
+        def _exec(self, ns, name, q):
+            with c.cond:
+                if (ns, name) not in c.objs["pods"]:
+                    return self._status(404, "NotFound", f'pods "{name}" not found')
+            if self.headers.get("Upgrade", "").lower() != "websocket":
+                return self._status(400, "BadRequest", "exec needs a websocket upgrade")
+            accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] +
+                                                    "258EAFA5-E914-47DA-95CA-C5AB0DC85B11").encode()).digest())
+            self.send_response(101)
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept.decode())
+            self.send_header("Sec-WebSocket-Protocol", "v4.channel.k8s.io")
+            self.end_headers()
+            def frame(chan, data, op=2):
+                data = (bytes([chan]) if op == 2 else b"") + data
+                n = len(data)
+                size = bytes([n]) if n < 126 else bytes([126]) + n.to_bytes(2, "big") if n < 65536 \
+                    else bytes([127]) + n.to_bytes(8, "big")
+                self.wfile.write(bytes([0x80 | op]) + size + data)
+            try:
+                r = subprocess.run(q.get("command", ["true"]), cwd=c.scratch(ns, name), capture_output=True,
+                                   timeout=120)
+                status = {"status": "Success"} if r.returncode == 0 else {
+                    "status": "Failure", "reason": "NonZeroExitCode",
+                    "message": f"command terminated with non-zero exit code: {r.returncode}",
+                    "details": {"causes": [{"reason": "ExitCode", "message": str(r.returncode)}]}}
+                if r.stdout: frame(1, r.stdout)
+                if r.stderr: frame(2, r.stderr)
+            except (OSError, subprocess.SubprocessError) as e:
+                status = {"status": "Failure", "message": str(e)}
+            try:
+                frame(3, json.dumps(status).encode())
+                frame(0, b"", op=8)
+                self.wfile.flush()
+            except OSError:
+                pass
+            self.close_connection = True
+
+        def _watch(self, kind, ns, pred, q):
+            timeout = min(float(q.get("timeoutSeconds", ["300"])[0]), 300)
+            try:
+                rv = int(q.get("resourceVersion", ["0"])[0] or 0)
+            except ValueError:
+                rv = 0
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            def send(ev):
+                d = (json.dumps(ev) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(d), d))
+                self.wfile.flush()
+            end = time.time() + timeout
+            try:
+                while time.time() < end:
+                    with c.cond:                  # wake on changes; a bookmark after 5s idle
+                        evs, idle = c.events_after(kind, rv), min(end, time.time() + 5)
+                        while evs == [] and time.time() < idle:
+                            c.cond.wait(idle - time.time())
+                            evs = c.events_after(kind, rv)
+                    if evs is None:
+                        send({"type": "ERROR", "object": {"kind": "Status", "code": 410,
+                                                           "reason": "Expired", "message": "too old resource version"}})
+                        break
+                    for erv, _, typ, obj in evs:
+                        rv = max(rv, erv)
+                        if (not ns or obj["metadata"].get("namespace") == ns) and pred(obj):
+                            send({"type": typ, "object": obj})
+                    if not evs and q.get("allowWatchBookmarks", [""])[0] == "true":
+                        send({"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": c.rv()}}})
+                        rv = max(rv, c.f.rv)
+                self.wfile.write(b"0\r\n\r\n")
+            except OSError:
+                pass
+
+        def do_GET(self): self._route("GET")
+        def do_POST(self): self._route("POST")
+        def do_PATCH(self): self._route("PATCH")
+        def do_PUT(self): self._route("PUT")
+        def do_DELETE(self): self._route("DELETE")
+    return Api
+
+def dcgm_handler(c, down=(), latency=0.0):
+    by_ip = {ip: node for node, ip in c.f.exporter_ip.items()}
+    class Dcgm(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        def log_message(self, *a): pass
+        def do_GET(self):
+            node = by_ip.get(self.connection.getsockname()[0])
+            if node in down:                     # a dead exporter: hang up without answering
+                self.close_connection = True
+                return self.connection.shutdown(socket.SHUT_RDWR)
+            if node is None or self.path != "/metrics":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            c.count(c.dcgm_scrapes, node)
+            if latency: time.sleep(latency / 1000)
+            with c.cond:
+                body = c.f.metrics(node)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return Dcgm
+
+def _serve(addr, handler):
+    srv = ThreadingHTTPServer(addr, handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True, name=f"fake-{addr[1]}").start()
+    return srv
+
+def start(nodes=10, gpus=8, seed=0, port=0, dcgm_port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+          pdb_rate=0.0, churn=0.0, dcgm_down=0.0, dcgm_latency=0.0, host="127.0.0.1", grace=0.0):
+    """Start the fake API (and DCGM exporters unless dcgm_port is None). Returns
+    (cluster, api_server, dcgm_server_or_None); servers run on daemon threads."""
+    c = Cluster(fleet.generate(nodes, gpus, loopback_exporters=True, seed=seed),
+                latency, jitter, error_rate, pdb_rate, seed, grace)
+    api = _serve((host, port), api_handler(c))
+    dcgm = None
+    if dcgm_port is not None:
+        down = set(random.Random(seed).sample(sorted(c.f.exporter_ip), int(len(c.f.exporter_ip) * dcgm_down)))
+        dcgm = _serve(("0.0.0.0", dcgm_port), dcgm_handler(c, down, dcgm_latency))
+    threading.Thread(target=c.churn, args=(churn, threading.Event()), daemon=True, name="fake-churn").start()
+    return c, api, dcgm
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--nodes", type=int, default=10)
+    ap.add_argument("--gpus", type=int, default=8, help="GPUs per worker node")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--port", type=int, default=6443)
+    ap.add_argument("--dcgm-port", type=int, default=9400)
+    ap.add_argument("--latency", type=float, default=0, help="added ms per API request")
+    ap.add_argument("--jitter", type=float, default=0, help="± ms around --latency")
+    ap.add_argument("--error-rate", type=float, default=0, help="share of API requests answered 500")
+    ap.add_argument("--pdb-rate", type=float, default=0, help="share of evictions answered 429")
+    ap.add_argument("--grace", type=float, default=0, help="seconds an evicted pod stays terminating")
+    ap.add_argument("--churn", type=float, default=0, help="node/pod MODIFIED events per second")
+    ap.add_argument("--dcgm-down", type=float, default=0, help="share of exporters that hang up")
+    ap.add_argument("--dcgm-latency", type=float, default=0, help="added ms per /metrics scrape")
+    a = ap.parse_args()
+    c, api, _ = start(a.nodes, a.gpus, a.seed, a.port, a.dcgm_port, a.latency, a.jitter, a.error_rate,
+                      a.pdb_rate, a.churn, a.dcgm_down, a.dcgm_latency, grace=a.grace)
+    print(f"fake API http://127.0.0.1:{api.server_address[1]}  ({a.nodes} nodes × {a.gpus} GPUs, "
+          f"{len(c.objs['pods'])} pods; DCGM on 127.0.x.y:{a.dcgm_port})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Synthetic fleet generator: Kubernetes-shaped objects (nodes, pods, deployments,
+replicasets, statefulsets, jobs, PodDisruptionBudgets, Longhorn nodes, the cockpit-join secret) plus
+DCGM samples and exporter bodies for any size of cluster. Deterministic per seed.
+Used by the benchmark suite (in-process) and the fake API server (over HTTP).
+
+  python3 cockpit/bench/fleet.py --nodes 100 --gpus 8 > fleet.json   # inspect one
+"""
+import argparse, base64, json, random
+
+PRODUCTS = (("NVIDIA GeForce RTX 3090 Ti", "24", "8.6"), ("NVIDIA GeForce RTX 4090", "24", "8.9"),
+            ("NVIDIA GeForce RTX 5060 Ti", "16", "12.0"), ("NVIDIA RTX A6000", "48", "8.6"))
+TIERS = ("training", "inference", "dev")
+# Training jobs opt into the checkpoint-aware drain. The "trainer" answers the
+# signal in the background; under fake_api's exec the paths live in the pod's
+# scratch directory.
+CHECKPOINT = {"checkpoint.homelab/signal": "exec:(sleep 2; touch ckpt.done) >/dev/null 2>&1 &",
+              "checkpoint.homelab/done": "file:ckpt.done", "checkpoint.homelab/timeout": "60"}
+
+class Fleet:
+    """One generated cluster. `items[resource]` holds the list-able objects keyed
+    like API paths use them; `dcgm[node]` the per-GPU samples for that node."""
+    def __init__(self):
+        self.items = {"nodes": [], "pods": [], "deployments": [], "replicasets": [],
+                      "statefulsets": [], "jobs": [], "pdbs": [], "longhorn": [], "secrets": [],
+                      "configmaps": []}
+        self.dcgm, self.exporter_ip, self.drains = {}, {}, {}
+        self.rv = 1
+
+    def next_rv(self):
+        self.rv += 1
+        return str(self.rv)
+
+    def metrics(self, node):
+        """dcgm-exporter /metrics body for one node (bytes)."""
+        fields = (("DCGM_FI_DEV_SM_CLOCK", "sm_clock"), ("DCGM_FI_DEV_MEM_CLOCK", "mem_clock"),
+                  ("DCGM_FI_DEV_GPU_TEMP", "temp"), ("DCGM_FI_DEV_POWER_USAGE", "power"),
+                  ("DCGM_FI_DEV_GPU_UTIL", "util"), ("DCGM_FI_DEV_MEM_COPY_UTIL", "mem_util"),
+                  ("DCGM_FI_DEV_FB_FREE", "vram_free"), ("DCGM_FI_DEV_FB_USED", "vram_used"),
+                  ("DCGM_FI_DEV_XID_ERRORS", None), ("DCGM_FI_PROF_PIPE_TENSOR_ACTIVE", None))
+        out = []
+        for metric, key in fields:
+            out.append(f"# HELP {metric} {metric[8:].lower()}.\n# TYPE {metric} gauge")
+            for g in self.dcgm.get(node, []):
+                pod = (f',container="main",namespace="{g["namespace"]}",pod="{g["pod"]}"'
+                       if g.get("pod") else "")
+                out.append(f'{metric}{{gpu="{g["idx"]}",UUID="{g["uuid"]}",device="nvidia{g["idx"]}",'
+                           f'modelName="{g["model"]}",Hostname="{node}"{pod}}} '
+                           f'{g.get(key, 0) if key else 0}')
+        return ("\n".join(out) + "\n").encode()
+
+    def tick(self, rnd, frac=0.2):
+        """Random-walk a share of GPU samples, like a live exporter between scrapes."""
+        for gpus in self.dcgm.values():
+            for g in gpus:
+                if rnd.random() < frac:
+                    g["util"] = float(max(0, min(100, g["util"] + rnd.randint(-15, 15))))
+                    g["power"] = float(max(40, min(450, g["power"] + rnd.randint(-30, 30))))
+
+    def as_dict(self):
+        return {"items": self.items, "dcgm": self.dcgm, "drains": self.drains}
+
+def _meta(fleet, name, ns=None, **extra):
+    md = {"name": name, "uid": f"uid-{name}-{fleet.rv}", "resourceVersion": fleet.next_rv(),
+          "creationTimestamp": "2026-01-01T00:00:00Z", **extra}
+    if ns: md["namespace"] = ns
+    return md
+
+def _container(gpus, cpu="2", mem="8Gi"):
+    return {"name": "main", "image": "registry.local/app:1",
+            "resources": {"requests": {"cpu": cpu, "memory": mem},
+                          "limits": {"cpu": cpu, "memory": mem,
+                                     **({"nvidia.com/gpu": str(gpus)} if gpus else {})}}}
+
+def generate(nodes=10, gpus_per_node=8, deployments=None, pods_per_node=6, longhorn_disks=1,
+             drains=0, statefulsets=None, jobs=None, not_ready=0.02, cordoned=0.03,
+             loopback_exporters=False, seed=0):
+    """A Fleet of `nodes` workers (+1 control plane). Deployment replicas are
+    packed onto GPU nodes until their GPUs are claimed; every node also carries
+    `pods_per_node` CPU-only/daemonset pods so pod lists have realistic bulk.
+    loopback_exporters=True gives exporters 127.0.x.y IPs for the fake server."""
+    rnd, f = random.Random(seed), Fleet()
+    deployments = max(1, nodes * gpus_per_node // 4) if deployments is None else deployments
+    statefulsets = max(1, nodes // 20) if statefulsets is None else statefulsets
+    jobs = max(1, nodes // 10) if jobs is None else jobs
+    names = ["ctrl-0"] + [f"gpu-{i:04d}" for i in range(nodes)]
+    free = {}
+    for i, name in enumerate(names):
+        control, gpus = i == 0, 0 if i == 0 else gpus_per_node
+        product, vram, cc = PRODUCTS[i % len(PRODUCTS)]
+        ready = control or rnd.random() >= not_ready
+        labels = {"kubernetes.io/hostname": name,
+                  "homelab/cpu-tier": "cheap" if control else rnd.choice(("standard", "performance"))}
+        if control:
+            labels["node-role.kubernetes.io/control-plane"] = "true"
+        else:
+            labels.update({"gpu.homelab/tier": TIERS[i % len(TIERS)], "gpu.homelab/product": product.replace(" ", "-"),
+                           "gpu.homelab/vram-gb": vram, "gpu.homelab/compute-cap": cc,
+                           "nvidia.com/gpu.present": "true"})
+        f.items["nodes"].append({
+            "metadata": _meta(f, name, labels=labels),
+            "spec": {"unschedulable": (not control and rnd.random() < cordoned)},
+            "status": {"conditions": [{"type": "Ready", "status": "True" if ready else "Unknown",
+                                       "reason": "KubeletReady" if ready else "NodeStatusUnknown"}],
+                       "allocatable": {"cpu": "64" if gpus else "8", "memory": "263855616Ki",
+                                       "nvidia.com/gpu": str(gpus), "ephemeral-storage": "1000Gi"},
+                       "capacity": {"ephemeral-storage": "1000Gi"},
+                       "addresses": [{"type": "InternalIP", "address": f"10.0.{i // 250}.{i % 250 + 1}"}]}})
+        disks = {f"disk-{d}": {"diskPath": f"/var/lib/longhorn{d or ''}",
+                               "storageMaximum": str(2 * 1024 ** 4),
+                               "storageAvailable": str(int(2 * 1024 ** 4 * rnd.uniform(.1, .9))),
+                               "storageScheduled": str(int(1024 ** 4 * rnd.uniform(0, 1.5)))}
+                 for d in range(longhorn_disks)}
+        f.items["longhorn"].append({"metadata": _meta(f, name, "longhorn-system"),
+                                    "status": {"diskStatus": disks}})
+        for k in range(pods_per_node):                         # daemonsets + cpu pods
+            f.items["pods"].append({
+                "metadata": _meta(f, f"ds-{k}-{name}", "kube-system",
+                                  ownerReferences=[{"kind": "DaemonSet", "name": f"ds-{k}", "uid": f"ds-{k}"}]),
+                "spec": {"nodeName": name, "containers": [_container(0, "100m", "128Mi")]},
+                "status": {"phase": "Running", "podIP": f"10.42.{i % 250}.{k + 10}"}})
+        if gpus:
+            free[name] = gpus
+            ip = f"127.0.{1 + i // 250}.{1 + i % 250}" if loopback_exporters else f"10.42.{i % 250}.2"
+            f.exporter_ip[name] = ip
+            f.items["pods"].append({
+                "metadata": _meta(f, f"nvidia-dcgm-exporter-{name}", "gpu-operator",
+                                  labels={"app": "nvidia-dcgm-exporter"},
+                                  ownerReferences=[{"kind": "DaemonSet", "name": "nvidia-dcgm-exporter",
+                                                    "uid": "ds-dcgm"}]),
+                "spec": {"nodeName": name, "containers": [_container(0, "100m", "256Mi")]},
+                "status": {"phase": "Running", "podIP": ip}})
+            f.dcgm[name] = [{"idx": str(g), "uuid": f"GPU-{i:04x}{g:04x}-0000-4000-8000-000000000000",
+                             "model": product, "util": float(rnd.randint(0, 100)),
+                             "temp": float(rnd.randint(35, 85)), "power": float(rnd.randint(60, 400)),
+                             "vram_used": float(rnd.randint(0, int(vram) * 1024)),
+                             "vram_free": 0.0, "sm_clock": 1860.0, "mem_clock": 10501.0,
+                             "mem_util": float(rnd.randint(0, 60))} for g in range(gpus)]
+            for g in f.dcgm[name]:
+                g["vram_free"] = int(vram) * 1024 - g["vram_used"]
+
+    def place(owner_refs, base, ns, replicas, g, app, annotations=None):
+        placed = 0
+        for r in range(replicas):
+            node = next((n for n in rnd.sample(list(free), len(free)) if free[n] >= g), None) if g else \
+                rnd.choice(names[1:] or names)
+            if node is None: break
+            if g: free[node] -= g
+            pod = f"{base}-{r}"
+            f.items["pods"].append({
+                "metadata": _meta(f, pod, ns, labels={"app": app}, ownerReferences=owner_refs,
+                                  **({"annotations": dict(annotations)} if annotations else {})),
+                "spec": {"nodeName": node, "containers": [_container(g)]},
+                "status": {"phase": "Running", "podIP": f"10.43.{rnd.randint(0, 250)}.{rnd.randint(2, 250)}"}})
+            for s in f.dcgm.get(node, []):
+                if g and not s.get("pod"):
+                    s.update(pod=pod, namespace=ns)
+                    g -= 1
+                    if not g: break
+            placed += 1
+        return placed
+
+    tmpl = lambda g, app: {"metadata": {"labels": {"app": app}}, "spec": {"containers": [_container(g)]}}
+    def pdb(name, ns, want, ready, **spec):
+        """PDB over app=name; status filled in as the disruption controller would."""
+        allowed = (max(0, ready - spec["minAvailable"]) if "minAvailable" in spec
+                   else max(0, spec["maxUnavailable"] - (want - ready)))
+        f.items["pdbs"].append({"metadata": _meta(f, name, ns),
+                                "spec": {"selector": {"matchLabels": {"app": name}}, **spec},
+                                "status": {"currentHealthy": ready, "expectedPods": want,
+                                           "desiredHealthy": ready - allowed, "disruptionsAllowed": allowed}})
+    for d in range(deployments):
+        ns, name = ("ml", "default", "inference")[d % 3], f"svc-{d:04d}"
+        g, replicas = rnd.choice((0, 1, 1, 2)), rnd.choice((1, 1, 2, 3))
+        dep = {"metadata": _meta(f, name, ns), "spec": {"replicas": replicas, "template": tmpl(g, name),
+                                                        "strategy": {"type": "RollingUpdate"}},
+               "status": {"replicas": replicas}}
+        rs = {"metadata": _meta(f, f"{name}-7d4b9", ns, ownerReferences=[
+            {"kind": "Deployment", "name": name, "uid": dep["metadata"]["uid"]}]), "spec": {"replicas": replicas}}
+        ready = place([{"kind": "ReplicaSet", "name": rs["metadata"]["name"], "uid": rs["metadata"]["uid"]}],
+                      f"{name}-7d4b9", ns, replicas, g, name)
+        dep["status"]["readyReplicas"] = ready
+        if replicas > 1 and d % 4 == 0:
+            pdb(name, ns, replicas, ready, maxUnavailable=1)
+        f.items["deployments"].append(dep)
+        f.items["replicasets"].append(rs)
+    for s in range(statefulsets):
+        name, g = f"db-{s:03d}", rnd.choice((0, 1))
+        sts = {"metadata": _meta(f, name, "data"), "spec": {"replicas": 2, "template": tmpl(g, name),
+                                                            "updateStrategy": {"type": "RollingUpdate"}},
+               "status": {}}
+        sts["status"]["readyReplicas"] = place([{"kind": "StatefulSet", "name": name,
+                                                 "uid": sts["metadata"]["uid"]}], name, "data", 2, g, name)
+        pdb(name, "data", 2, sts["status"]["readyReplicas"], minAvailable=2)    # quorum: never voluntarily
+        f.items["statefulsets"].append(sts)
+    for j in range(jobs):
+        name = f"train-{j:03d}"
+        job = {"metadata": _meta(f, name, "ml"), "spec": {"parallelism": 1, "template": tmpl(2, name)}, "status": {}}
+        job["status"]["active"] = place([{"kind": "Job", "name": name, "uid": job["metadata"]["uid"]}],
+                                        f"{name}-x", "ml", 1, 2, name, CHECKPOINT)
+        f.items["jobs"].append(job)
+
+    secret = {"server_host": "10.0.0.1", "token": "K10fleet::server:bench", "server_port": "6443",
+              "gpu_operator_manages_driver": "0"}
+    f.items["secrets"].append({"metadata": _meta(f, "cockpit-join", "cockpit"),
+                               "data": {k: base64.b64encode(v.encode()).decode() for k, v in secret.items()}})
+    for name in rnd.sample(names[1:], min(drains, nodes)):
+        f.drains[name] = {"phase": rnd.choice(("evicting", "done")), "evicted": 2, "failed": 0,
+                          "total": 4, "msg": "", "started": 0}
+    return f
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--nodes", type=int, default=10)
+    ap.add_argument("--gpus", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+    print(json.dumps(generate(a.nodes, a.gpus, seed=a.seed).as_dict(), indent=1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Load driver: N concurrent dashboard clients against a real cockpit process
+backed by the fake API server (fake_api.py), reporting request latency
+percentiles and API-server amplification (k8s calls per dashboard request).
+
+By default it starts both: the fake API + DCGM exporters in this process and
+`cockpit/app.py` as a subprocess pointed at them. With --url it drives an
+already-running cockpit instead (pass --fake to still read the call counters).
+Exits 1 when --max-p95 or --max-calls-per-req is exceeded, for CI.
+
+  python3 cockpit/bench/load.py [--nodes 100] [--clients 16] [--duration 20] [--think 0]
+  python3 cockpit/bench/load.py --latency 30 --error-rate .02 --churn 20 --out load.json
+  python3 cockpit/bench/load.py --revalidate --think 1     # browser-like polling with ETags
+"""
+import argparse, gzip, json, os, socket, subprocess, sys, tempfile, threading, time
+import urllib.error, urllib.request
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+import fake_api
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _get(url, timeout=30, tags=None):
+    """GET with gzip. With a `tags` dict it revalidates like the browser does: sends
+    the last ETag for the URL and returns None on 304."""
+    hdr = {"Accept-Encoding": "gzip"}
+    if tags is not None and url in tags:
+        hdr["If-None-Match"] = tags[url]
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=hdr), timeout=timeout) as r:
+            body = r.read()
+            if tags is not None and r.headers.get("ETag"):
+                tags[url] = r.headers["ETag"]
+            return gzip.decompress(body) if r.headers.get("Content-Encoding") == "gzip" else body
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and tags is not None:
+            return None
+        raise
+
+def _pct(xs, p):
+    return round(xs[min(len(xs) - 1, int(len(xs) * p))], 2) if xs else None
+
+def spawn(a):
+    """Fake API + exporters here, cockpit as a child. Returns (url, fake_url, proc)."""
+    dcgm_port = _free_port()
+    c, api, _ = fake_api.start(a.nodes, a.gpus, a.seed, 0, dcgm_port, a.latency, a.jitter,
+                               a.error_rate, 0.0, a.churn, a.dcgm_down)
+    sa = Path(tempfile.mkdtemp(prefix="cockpit-load-sa-"))
+    (sa / "token").write_text("load-token\n")
+    fake, port = f"http://127.0.0.1:{api.server_address[1]}", _free_port()
+    env = {**os.environ, "PORT": str(port), "COCKPIT_K8S_API": fake, "COCKPIT_SA_DIR": str(sa),
+           "COCKPIT_DCGM_PORT": str(dcgm_port), "COCKPIT_INFORMERS": a.informers,
+           **({"COCKPIT_RECORD": str(Path(a.record).resolve())} if a.record else {})}
+    env.pop("HOMELAB_DEMO", None)
+    proc = subprocess.Popen([sys.executable, str(HERE.parent / "app.py")], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url, deadline = f"http://127.0.0.1:{port}", time.time() + 60
+    while True:
+        try:
+            _get(url + "/api/overview")
+            break
+        except Exception:
+            if proc.poll() is not None or time.time() > deadline:
+                proc.kill()
+                sys.exit("cockpit did not come up")
+            time.sleep(0.2)
+    return url, fake, proc
+
+def drive(url, paths, clients, duration, think, revalidate=False):
+    lat, errors, sizes, not_modified, lock = [], 0, 0, 0, threading.Lock()
+    stop = time.time() + duration
+    def client(i):
+        nonlocal errors, sizes, not_modified
+        k, tags = i, {} if revalidate else None
+        while time.time() < stop:
+            path = paths[k % len(paths)]
+            k += 1
+            t = time.perf_counter()
+            try:
+                body = _get(url + path, tags=tags)
+                ok = True
+            except (urllib.error.URLError, OSError):
+                body, ok = b"", False
+            ms = (time.perf_counter() - t) * 1000
+            with lock:
+                if ok:
+                    lat.append(ms)
+                    sizes += len(body or b"")
+                    not_modified += body is None
+                else: errors += 1
+            if think: time.sleep(think)
+    ts = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in ts: t.start()
+    for t in ts: t.join()
+    return sorted(lat), errors, sizes, not_modified, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--nodes", type=int, default=100)
+    ap.add_argument("--gpus", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20, help="seconds of measured load")
+    ap.add_argument("--warmup", type=float, default=3, help="seconds before counters are reset")
+    ap.add_argument("--think", type=float, default=0, help="seconds each client waits between requests")
+    ap.add_argument("--paths", default="/api/overview", help="comma list, round-robin per client")
+    ap.add_argument("--revalidate", action="store_true", help="send If-None-Match like the dashboard")
+    ap.add_argument("--informers", default="1", choices=("0", "1"), help="COCKPIT_INFORMERS for the child")
+    ap.add_argument("--latency", type=float, default=0, help="fake API: added ms per request")
+    ap.add_argument("--jitter", type=float, default=0, help="fake API: ± ms around --latency")
+    ap.add_argument("--error-rate", type=float, default=0, help="fake API: share answered 500")
+    ap.add_argument("--churn", type=float, default=0, help="fake API: MODIFIED events per second")
+    ap.add_argument("--dcgm-down", type=float, default=0, help="share of exporters that hang up")
+    ap.add_argument("--record", help="child records a COCKPIT_RECORD trace here (for replay.py)")
+    ap.add_argument("--url", help="drive this running cockpit instead of spawning one")
+    ap.add_argument("--fake", help="fake API base URL for call counters (with --url)")
+    ap.add_argument("--out", help="write the report JSON here")
+    ap.add_argument("--max-p95", type=float, help="fail when p95 latency (ms) is above this")
+    ap.add_argument("--max-calls-per-req", type=float, help="fail when k8s calls per request exceed this")
+    a = ap.parse_args()
+    proc = None
+    if a.url:
+        url, fake = a.url.rstrip("/"), a.fake and a.fake.rstrip("/")
+    else:
+        url, fake, proc = spawn(a)
+    try:
+        drive(url, a.paths.split(","), a.clients, a.warmup, a.think)
+        if fake: _get(fake + "/_fake/reset")
+        lat, errors, size, n304, wall = drive(url, a.paths.split(","), a.clients, a.duration, a.think,
+                                              a.revalidate)
+        stats = json.loads(_get(fake + "/_fake/stats")) if fake else {}
+        try:
+            cache = json.loads(_get(url + "/api/debug/cache"))
+        except Exception:
+            cache = None
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(10)
+    n = len(lat)
+    calls = {k: v for k, v in stats.get("calls", {}).items() if not k.startswith("WATCH")}
+    report = {"clients": a.clients, "duration_s": round(wall, 1), "requests": n, "errors": errors,
+              "req_per_s": round(n / wall, 1) if wall else 0,
+              "p50_ms": _pct(lat, .50), "p95_ms": _pct(lat, .95), "p99_ms": _pct(lat, .99),
+              "max_ms": round(lat[-1], 2) if lat else None,
+              "avg_kb": round(size / n / 1024, 1) if n else 0, "not_modified": n304,
+              "k8s_calls": sum(calls.values()) if fake else None,
+              "k8s_calls_per_req": round(sum(calls.values()) / n, 3) if fake and n else None,
+              "k8s_calls_by_kind": dict(sorted(calls.items(), key=lambda kv: -kv[1])),
+              "watches": sum(v for k, v in stats.get("calls", {}).items() if k.startswith("WATCH")),
+              "dcgm_scrapes": stats.get("dcgm_scrapes"), "cache": cache,
+              "fleet": {"nodes": a.nodes, "gpus": a.gpus, "informers": a.informers == "1",
+                        "latency_ms": a.latency, "error_rate": a.error_rate, "churn": a.churn}}
+    print(json.dumps(report, indent=1))
+    if a.out:
+        Path(a.out).write_text(json.dumps(report, indent=1) + "\n")
+    bad = []
+    if a.max_p95 is not None and (report["p95_ms"] or 0) > a.max_p95:
+        bad.append(f"p95 {report['p95_ms']}ms > {a.max_p95}ms")
+    if a.max_calls_per_req is not None and (report["k8s_calls_per_req"] or 0) > a.max_calls_per_req:
+        bad.append(f"{report['k8s_calls_per_req']} k8s calls/request > {a.max_calls_per_req}")
+    if bad:
+        sys.exit("FAIL: " + "; ".join(bad))
+
+if __name__ == "__main__":
+    main()
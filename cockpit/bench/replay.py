@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Replay a COCKPIT_RECORD trace through the backend in-process and time it:
+overview() (first build with informers syncing from the trace, then steady
+state), apps_snapshot(), and optionally a drain of one node. Recorded API/DCGM
+latencies are waited out divided by --speed (1 = as recorded, 0 = no waits), so
+the same production workload can be rerun before and after an optimization.
+
+  COCKPIT_RECORD=/tmp/prod.trace.gz python3 cockpit/app.py     # capture (or load.py --record)
+  python3 cockpit/bench/replay.py /tmp/prod.trace.gz [--speed 0] [--runs 20] [--drain gpu-0003]
+"""
+import argparse, json, os, statistics, sys, time
+from pathlib import Path
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("trace")
+    ap.add_argument("--speed", type=float, default=1, help="replay speed; 0 skips recorded waits")
+    ap.add_argument("--runs", type=int, default=20, help="overview() builds to time after the first")
+    ap.add_argument("--drain", help="also drain this node against the trace")
+    ap.add_argument("--out", help="write the report JSON here")
+    a = ap.parse_args()
+    os.environ.update(COCKPIT_REPLAY=str(Path(a.trace).resolve()), COCKPIT_REPLAY_SPEED=str(a.speed))
+    os.environ.pop("HOMELAB_DEMO", None)
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import app
+
+    t = time.perf_counter()
+    app.start_informers()
+    for inf in app.INFORMERS.values():
+        inf.synced.wait(30)
+    app.COLLECTOR.start()
+    app.COLLECTOR.ready.wait(30)
+    report = {"trace": a.trace, "speed": a.speed, "informers": bool(app.INFORMERS),
+              "startup_ms": round((time.perf_counter() - t) * 1000, 1)}
+    t = time.perf_counter()
+    snap = app.overview()
+    report["overview_first_ms"] = round((time.perf_counter() - t) * 1000, 2)
+    runs = []
+    for _ in range(a.runs):
+        t = time.perf_counter()
+        app.overview()
+        runs.append((time.perf_counter() - t) * 1000)
+    if runs:
+        report["overview_ms"] = {"median": round(statistics.median(runs), 2), "max": round(max(runs), 2)}
+    try:
+        t = time.perf_counter()
+        app.apps_snapshot()
+        report["apps_snapshot_ms"] = round((time.perf_counter() - t) * 1000, 2)
+    except Exception as e:
+        report["apps_snapshot_error"] = str(e)
+    if a.drain:
+        t = time.perf_counter()
+        app.act_drain({"node": a.drain})
+        while app.drain_snapshot()[a.drain]["phase"] in ("starting", "evicting"):
+            time.sleep(0.05)
+        report["drain"] = {**app.drain_snapshot()[a.drain], "ms": round((time.perf_counter() - t) * 1000, 1)}
+    report.update(nodes=len(snap["nodes"]), gpus=len(snap["gpus"]), replay=app.REPLAYER.stats())
+    print(json.dumps(report, indent=1, default=str))
+    if a.out:
+        Path(a.out).write_text(json.dumps(report, indent=1, default=str) + "\n")
+
+if __name__ == "__main__":
+    main()
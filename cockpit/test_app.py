@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Unit tests for the cockpit backend's stateful pieces: the job executor, informer
+resume/relist, the owner index, the drain dry run and the DCGM parser. Stdlib only,
+no cluster — the k8s calls they make are patched out.
+
+  cd cockpit && python3 -m unittest test_app -v
+"""
+import json, os, tempfile, threading, time, unittest, urllib.error
+from unittest import mock
+
+os.environ.setdefault("COCKPIT_JOB_STORE", "off")
+import app
+
+def wait_for(cond, timeout=5):
+    end = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > end:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.01)
+
+# ----------------------------------------------------------------- job executor
+class JobExecutorTest(unittest.TestCase):
+    def executor(self, workers=4, limits=None, depth=10, store=None):
+        ex = app.JobExecutor(workers, limits or {}, depth, store or app.JobStore("off"))
+        self.gate, self.running, self.peak = threading.Event(), {}, {}
+        self.addCleanup(self.gate.set)                   # never leave workers parked
+        return ex
+
+    def kind(self, ex, kind, priority=app.PRIO_NORMAL, resume=None):
+        jobs = {}
+        ex.register(kind, jobs, threading.Lock(), priority, resume)
+        return jobs
+
+    def job(self, jobs, kind):
+        """Blocks until self.gate opens; counts how many of `kind` run at once."""
+        def run(key):
+            self.running[kind] = self.running.get(kind, 0) + 1
+            self.peak[kind] = max(self.peak.get(kind, 0), self.running[kind])
+            jobs[key]["phase"] = "running"
+            self.gate.wait(5)
+            self.running[kind] -= 1
+            jobs[key]["phase"] = "done"
+        return run
+
+    def submit(self, ex, jobs, kind, key):
+        jobs[key] = {"phase": "starting"}
+        ex.submit(kind, key, self.job(jobs, kind), key)
+
+    def test_kind_limit(self):
+        ex = self.executor(limits={"join": 2})
+        jobs = self.kind(ex, "join")
+        for i in range(5):
+            self.submit(ex, jobs, "join", f"j{i}")
+        wait_for(lambda: self.running.get("join") == 2)
+        self.assertEqual(sum(j.get("msg") == app.JOB_QUEUED for j in jobs.values()), 3)
+        self.gate.set()
+        wait_for(lambda: all(j["phase"] == "done" for j in jobs.values()))
+        self.assertEqual(self.peak["join"], 2)
+
+    def test_drains_are_reserved(self):
+        ex = self.executor(workers=3, limits={"drain": 2, "join": 5})
+        drains = self.kind(ex, "drain", app.PRIO_HIGH)
+        joins = self.kind(ex, "join")
+        self.assertEqual(ex.size(), 4)                   # grown so joins keep two workers
+        for i in range(4):
+            self.submit(ex, joins, "join", f"j{i}")
+        wait_for(lambda: self.running.get("join") == 2)
+        self.submit(ex, drains, "drain", "n1")
+        wait_for(lambda: drains["n1"]["phase"] == "running")
+        self.assertEqual(self.running["join"], 2)
+        self.gate.set()
+        wait_for(lambda: all(j["phase"] == "done" for j in joins.values()))
+        self.assertEqual(self.peak["join"], 2)
+
+    def test_queue_depth(self):
+        ex = self.executor(limits={"join": 1}, depth=1)
+        jobs = self.kind(ex, "join")
+        self.submit(ex, jobs, "join", "j0")
+        wait_for(lambda: jobs["j0"]["phase"] == "running")
+        self.submit(ex, jobs, "join", "j1")
+        with self.assertRaises(RuntimeError):
+            self.submit(ex, jobs, "join", "j2")
+        self.assertEqual(jobs["j2"]["phase"], "error")
+
+    def test_failed_job_is_marked(self):
+        ex = self.executor()
+        jobs = self.kind(ex, "join")
+        jobs["j0"] = {"phase": "running"}
+        ex.submit("join", "j0", lambda: 1 / 0)
+        wait_for(lambda: jobs["j0"]["phase"] == "error")
+        self.assertIn("division", jobs["j0"]["msg"])
+        self.assertIn("finished", jobs["j0"])
+
+    def test_restore(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "jobs.json")
+            with open(path, "w") as f:
+                json.dump({"drain": {f"n{i}": {"phase": "evicting"} for i in range(6)},
+                           "join": {"j0": {"phase": "running"}, "j1": {"phase": "done"}}}, f)
+            ex = self.executor(limits={"drain": 2}, depth=2, store=app.JobStore(f"file:{path}"))
+            self.gate.set()
+            drains = self.kind(ex, "drain", app.PRIO_HIGH, resume=lambda key, st: (self.job(drains, "drain"), key))
+            joins = self.kind(ex, "join")
+            ex.restore()                                 # six resumed drains, past a depth of 2
+            wait_for(lambda: all(j["phase"] == "done" for j in drains.values()))
+            self.assertEqual(len(drains), 6)
+            self.assertEqual(joins["j0"]["phase"], "interrupted")
+            self.assertEqual(joins["j1"]["phase"], "done")
+
+    def test_prune(self):
+        ex = self.executor()
+        jobs = self.kind(ex, "join")
+        now = time.time()
+        jobs.update({"old": {"phase": "done", "finished": now - app.JOB_TTL - 1},
+                     "new": {"phase": "done", "finished": now},
+                     "live": {"phase": "running", "ts": now - app.JOB_TTL - 1}})
+        ex.prune(now)
+        self.assertEqual(set(jobs), {"new", "live"})
+
+# ----------------------------------------------------------------- informers
+class Stop(BaseException):
+    """Ends Informer._run, which retries every Exception."""
+
+def node(name, rv):
+    return {"metadata": {"name": name, "resourceVersion": rv}}
+
+class InformerTest(unittest.TestCase):
+    def informer(self, lists, watches):
+        """An informer whose lists and watches are served from the given queues."""
+        inf = app.Informer("nodes", "/api/v1/nodes")
+        self.events, self.watched = [], []
+        inf.subscribe(lambda kind, obj, old: self.events.append((kind, obj["metadata"]["name"])))
+        def k8s(method, path, body=None, content_type=None):
+            return lists.pop(0)
+        def k8s_watch(path, timeout=None):
+            self.watched.append(path)
+            if not watches:
+                raise Stop()
+            return iter(watches.pop(0))
+        for name, fn in (("k8s", k8s), ("k8s_watch", k8s_watch)):
+            patcher = mock.patch.object(app, name, fn)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return inf
+
+    def test_watch_resumes(self):
+        inf = self.informer([{"items": [node("a", "1")], "metadata": {"resourceVersion": "5"}}],
+                            [[{"type": "ADDED", "object": node("b", "6")},
+                              {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "9"}}}],
+                             [{"type": "DELETED", "object": node("a", "10")}]])
+        with self.assertRaises(Stop):
+            inf._run()
+        self.assertIn("resourceVersion=5", self.watched[0])
+        self.assertIn("resourceVersion=9", self.watched[1])       # no relist in between
+        self.assertEqual(self.events, [("ADDED", "a"), ("ADDED", "b"), ("DELETED", "a")])
+        self.assertEqual([o["metadata"]["name"] for o in inf.items()], ["b"])
+        self.assertEqual(inf.rv, "10")
+
+    def test_gone_relists(self):
+        inf = self.informer([{"items": [node("a", "1"), node("b", "1")], "metadata": {"resourceVersion": "5"}},
+                             {"items": [node("a", "7")], "metadata": {"resourceVersion": "8"}}],
+                            [[{"type": "ERROR", "object": {"code": 410}}]])
+        with self.assertRaises(Stop):
+            inf._run()
+        self.assertIn("resourceVersion=8", self.watched[1])
+        self.assertEqual(self.events[2:], [("DELETED", "b"), ("MODIFIED", "a")])
+
+    def test_gone_status_relists(self):
+        inf = self.informer([{"items": [], "metadata": {"resourceVersion": "5"}},
+                             {"items": [], "metadata": {"resourceVersion": "8"}}], [])
+        gone = urllib.error.HTTPError("", 410, "Gone", {}, None)
+        real_watch = app.k8s_watch
+        def watch(path, timeout=None):
+            if len(self.watched) == 0:
+                self.watched.append(path)
+                raise gone
+            return real_watch(path, timeout)
+        with mock.patch.object(app, "k8s_watch", watch), self.assertRaises(Stop):
+            inf._run()
+        self.assertIn("resourceVersion=8", self.watched[1])
+
+# ----------------------------------------------------------------- owner index
+def rs(uid, dep):
+    return {"metadata": {"uid": uid, "name": f"{dep}-x", "namespace": "ml",
+                         "ownerReferences": [{"kind": "Deployment", "name": dep}]}}
+
+def pod(name, node, gpus=0, owners=None, ns="ml", phase="Running", labels=None):
+    return {"metadata": {"name": name, "namespace": ns, "labels": labels or {},
+                         "ownerReferences": [{"kind": "ReplicaSet", "uid": "u1"}] if owners is None else owners},
+            "spec": {"nodeName": node,
+                     "containers": [{"resources": {"limits": {"nvidia.com/gpu": str(gpus)}}}]},
+            "status": {"phase": phase}}
+
+class OwnerIndexTest(unittest.TestCase):
+    def test_pod_before_replicaset(self):
+        idx = app.OwnerIndex()
+        idx.on_pod("ADDED", pod("p", "n1", 2))
+        self.assertIsNone(idx.owner_of("ml/p"))
+        idx.on_replicaset("ADDED", rs("u1", "llm"))
+        self.assertEqual(idx.owner_of("ml/p"), ("Deployment", "ml", "llm"))
+        self.assertEqual(idx.placement(("Deployment", "ml", "llm")), [{"node": "n1", "pods": 1, "gpus": 2}])
+
+    def test_replicaset_deleted(self):
+        idx = app.OwnerIndex.build([pod("p", "n1"), pod("q", "n2")], [rs("u1", "llm")])
+        idx.on_replicaset("DELETED", rs("u1", "llm"))
+        self.assertIsNone(idx.owner_of("ml/p"))
+        self.assertEqual(idx.pods_of(("Deployment", "ml", "llm")), {})
+        idx.on_replicaset("ADDED", rs("u1", "llm"))              # relist brings it back
+        self.assertEqual(set(idx.pods_of(("Deployment", "ml", "llm"))), {"ml/p", "ml/q"})
+        idx.on_pod("DELETED", pod("p", "n1"))
+        idx.on_pod("DELETED", pod("q", "n2"))
+        self.assertEqual((idx.owner, idx.pods, idx._via, idx._via_of), ({}, {}, {}, {}))
+
+    def test_finished_pod_unlinks(self):
+        idx = app.OwnerIndex.build([pod("p", "n1", owners=[{"kind": "StatefulSet", "name": "db"}])], [])
+        self.assertEqual(idx.owner_of("ml/p"), ("StatefulSet", "ml", "db"))
+        idx.on_pod("MODIFIED", pod("p", "n1", owners=[{"kind": "StatefulSet", "name": "db"}], phase="Succeeded"))
+        self.assertIsNone(idx.owner_of("ml/p"))
+
+# ----------------------------------------------------------------- drain dry run
+def k8s_node(name, gpus=4, cpu="16", unschedulable=False, ready=True):
+    return {"metadata": {"name": name, "labels": {}},
+            "spec": {"unschedulable": unschedulable},
+            "status": {"conditions": [{"type": "Ready", "status": str(ready)}],
+                       "allocatable": {"cpu": cpu, "memory": "64Gi", "nvidia.com/gpu": str(gpus)}}}
+
+def pdb(name, allowed, healthy, expected, app_label="llm"):
+    return {"metadata": {"name": name, "namespace": "ml"},
+            "spec": {"selector": {"matchLabels": {"app": app_label}}},
+            "status": {"disruptionsAllowed": allowed, "currentHealthy": healthy, "expectedPods": expected}}
+
+class SimulateDrainTest(unittest.TestCase):
+    def test_fits(self):
+        out = app.simulate_drain("n1", [k8s_node("n1"), k8s_node("n2"), k8s_node("n3", unschedulable=True)],
+                                 [pod("p", "n1", 2), pod("q", "n2", 1)], [])
+        self.assertTrue(out["feasible"])
+        self.assertEqual([(r["pod"], r["to"]) for r in out["placed"]], [("ml/p", "n2")])
+
+    def test_short_of_gpus(self):
+        out = app.simulate_drain("n1", [k8s_node("n1"), k8s_node("n2"), k8s_node("n3", unschedulable=True)],
+                                 [pod("p", "n1", 2), pod("q", "n2", 3)], [])
+        self.assertFalse(out["feasible"])
+        self.assertEqual(out["pending"][0]["why"], "0/2 nodes fit: 1 short of GPUs, 1 cordoned")
+
+    def test_tightest_fit(self):
+        out = app.simulate_drain("n1", [k8s_node("n1"), k8s_node("n2", gpus=8), k8s_node("n3", gpus=2)],
+                                 [pod("p", "n1", 2)], [])
+        self.assertEqual(out["placed"][0]["to"], "n3")
+
+    def test_unmanaged(self):
+        out = app.simulate_drain("n1", [k8s_node("n1"), k8s_node("n2")], [pod("p", "n1", owners=[])], [])
+        self.assertEqual(out["unmanaged"], ["ml/p"])
+        self.assertIn("1 unmanaged pod(s) would be deleted", out["msg"])
+
+    def test_pdbs(self):
+        nodes = [k8s_node("n1"), k8s_node("n2", gpus=8)]
+        pods = [pod(f"p{i}", "n1", 1, labels={"app": "llm"}) for i in range(2)]
+        out = app.simulate_drain("n1", nodes, pods, [pdb("all-up", 0, 2, 2)])
+        self.assertFalse(out["feasible"])
+        self.assertEqual(out["budgets"][0]["effect"], "blocks")
+        out = app.simulate_drain("n1", nodes, pods, [pdb("one-at-a-time", 1, 2, 2)])
+        self.assertTrue(out["feasible"])
+        self.assertEqual(out["budgets"][0]["effect"], "slows")
+        out = app.simulate_drain("n1", nodes, pods, [pdb("roomy", 2, 2, 2), pdb("other", 0, 1, 1, "db")])
+        self.assertEqual(out["budgets"], [])
+        out = app.simulate_drain("n1", nodes, pods, None)
+        self.assertFalse(out["pdbs_checked"])
+
+# ----------------------------------------------------------------- DCGM parser
+PAYLOAD = b"""# HELP DCGM_FI_DEV_GPU_UTIL GPU utilization (in %).
+# TYPE DCGM_FI_DEV_GPU_UTIL gauge
+DCGM_FI_DEV_GPU_UTIL{gpu="0",UUID="GPU-a",modelName="NVIDIA RTX 5090",Hostname="n1"} 87
+DCGM_FI_DEV_GPU_UTIL{gpu="1",UUID="GPU-b",modelName="NVIDIA RTX 5090",Hostname="n1",pod="llm-0",namespace="ml"} 3
+DCGM_FI_DEV_GPU_TEMP{gpu="0",UUID="GPU-a",modelName="NVIDIA RTX 5090",Hostname="n1"} 64
+DCGM_FI_DEV_POWER_USAGE{gpu="1",UUID="GPU-b",modelName="NVIDIA RTX 5090",Hostname="n1",pod="llm-0",namespace="ml"} 412.5
+DCGM_FI_DEV_FB_USED{gpu="1",UUID="GPU-b"} NaN
+DCGM_FI_DEV_XID_ERRORS{gpu="0",UUID="GPU-a"} 0
+DCGM_FI_DEV_FB_FREE{gpu="0",UUID="GPU-a"}
+DCGM_FI_DEV_SM_CLOCK 1500
+go_goroutines 42
+"""
+
+class ParseDcgmTest(unittest.TestCase):
+    def test_parse(self):
+        gpus = app.parse_dcgm(PAYLOAD.splitlines())
+        self.assertEqual(gpus, {
+            "0": {"idx": "0", "uuid": "GPU-a", "model": "NVIDIA RTX 5090", "util": 87.0, "temp": 64.0},
+            "1": {"idx": "1", "uuid": "GPU-b", "model": "NVIDIA RTX 5090", "pod": "llm-0",
+                  "namespace": "ml", "util": 3.0, "power": 412.5}})
+
+    def test_labels(self):
+        self.assertEqual(app._dcgm_labels(b'gpu="2", UUID="GPU-c",container="",pod="a,b"'),
+                         {"gpu": "2", "uuid": "GPU-c", "pod": "a,b"})
+
+if __name__ == "__main__":
+    unittest.main()
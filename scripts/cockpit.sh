@@ -3,6 +3,7 @@
 #   make cockpit       -> install/update it in the cluster
 #   make cockpit-ui    -> open via port-forward (also reachable at :30880 on any node)
 #   make cockpit-demo  -> run locally with fake data to preview the UI
+#                         (NODES=100 [GPUS=8 CHURN=5]: a generated fleet behind a fake API)
 source "$(dirname "${BASH_SOURCE[0]}")/lib/common.sh"
 
 ACTION="${1:-open}"
@@ -85,6 +86,10 @@ PY
       warn "No SSH key found — paste a key in Fleet Command or set COCKPIT_SSH_KEY in cluster.env."
     fi
     kc apply -f "${REPO_ROOT}/manifests/cockpit/cockpit.yaml" >/dev/null
+    if kc get crd servicemonitors.monitoring.coreos.com >/dev/null 2>&1; then
+      kc apply -f "${REPO_ROOT}/manifests/cockpit/servicemonitor.yaml" >/dev/null
+      ok "Prometheus will scrape Fleet Command's /metrics."
+    fi
     kc -n cockpit rollout restart deploy/cockpit >/dev/null 2>&1 || true
     kc -n cockpit rollout status deploy/cockpit --timeout=120s >/dev/null 2>&1 || \
       warn "Fleet Command rollout slow — if UI looks stale, run: kubectl -n cockpit delete pod -l app=cockpit"
@@ -101,8 +106,27 @@ PY
     kc -n cockpit port-forward svc/cockpit "${PORT}:80"
     ;;
   demo)
-    title "Fleet Command — local demo with fake data (Ctrl-C to stop)"
-    HOMELAB_DEMO=1 PORT="${PORT}" python3 "${REPO_ROOT}/cockpit/app.py"
+    if [[ -z "${NODES:-}" ]]; then
+      title "Fleet Command — local demo with fake data (Ctrl-C to stop)"
+      HOMELAB_DEMO=1 PORT="${PORT}" python3 "${REPO_ROOT}/cockpit/app.py"
+      exit
+    fi
+    # NODES=N: a generated fleet (cockpit/bench/fleet.py) behind the fake API server,
+    # so the real request path, informers and actions run at that size.
+    title "Fleet Command — local demo, ${NODES} generated nodes (Ctrl-C to stop)"
+    FAKE_PORT="${FAKE_PORT:-16443}"; DCGM_PORT="${DCGM_PORT:-19400}"
+    SA_DIR="$(mktemp -d)"; echo demo-token > "${SA_DIR}/token"
+    python3 "${REPO_ROOT}/cockpit/bench/fake_api.py" --nodes "${NODES}" --gpus "${GPUS:-8}" \
+        --port "${FAKE_PORT}" --dcgm-port "${DCGM_PORT}" --churn "${CHURN:-0}" &
+    FAKE_PID=$!
+    trap 'kill "${FAKE_PID}" 2>/dev/null; rm -rf "${SA_DIR}"' EXIT
+    trap 'exit 130' INT TERM
+    until curl -sf "http://127.0.0.1:${FAKE_PORT}/_fake/stats" >/dev/null; do
+      kill -0 "${FAKE_PID}" 2>/dev/null || die "fake API server did not start"
+      sleep 0.5
+    done
+    PORT="${PORT}" COCKPIT_K8S_API="http://127.0.0.1:${FAKE_PORT}" COCKPIT_SA_DIR="${SA_DIR}" \
+        COCKPIT_DCGM_PORT="${DCGM_PORT}" COCKPIT_JOB_STORE=off python3 "${REPO_ROOT}/cockpit/app.py"
     ;;
   *) die "Usage: cockpit.sh [install|open|demo]" ;;
 esac